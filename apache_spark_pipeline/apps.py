@@ -4,3 +4,9 @@ class GraphPipelineConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apache_spark_pipeline"
 
+    def ready(self):
+        # Load and validate config/table_mappings.yaml at startup, so a bad
+        # mapping fails fast instead of on the first sync
+        from .services.mapping_registry import MAPPING_REGISTRY
+        MAPPING_REGISTRY.current()
+
@@ -0,0 +1,284 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .predicates import Between, IsNotNull, as_range, parse_predicate, sort_key
+
+PARQUET_SUFFIXES = (".parquet",)
+IPC_SUFFIXES = (".arrow", ".feather")
+
+# Rows per record batch when a whole table is collected
+DEFAULT_READ_BATCH_ROWS = 65_536
+
+_NAME_PART = re.compile(r"^\w+$")
+
+
+def _is_parquet(path: Path) -> bool:
+    return path.suffix in PARQUET_SUFFIXES
+
+
+def _open_ipc(path: Path) -> pa.Table:
+    # Zero-copy: the table's buffers point into the mapped file
+    return pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+
+
+def _file_schema(path: Path) -> pa.Schema:
+    if _is_parquet(path):
+        return pq.ParquetFile(path, memory_map=True).schema_arrow
+    return pa.ipc.open_file(pa.memory_map(str(path))).schema
+
+
+def _file_rows(path: Path) -> int:
+    if _is_parquet(path):
+        return pq.ParquetFile(path, memory_map=True).metadata.num_rows
+    return _open_ipc(path).num_rows
+
+
+def _read_file(path: Path, columns: Optional[List[str]], batch_size: int) -> Iterator[pa.RecordBatch]:
+    if _is_parquet(path):
+        # Only the column chunks of `columns` are decoded
+        yield from pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size, columns=columns)
+        return
+
+    table = _open_ipc(path)
+    if columns is not None:
+        table = table.select(columns)
+    yield from table.to_batches(max_chunksize=batch_size)
+
+
+def _range_mask(column: pa.Array, bounds: Between):
+    # Same result as Between.matches on a string column: nulls never match,
+    # and UTF-8 byte order is code point order, as Python compares str
+    mask = pc.is_valid(column)
+    if bounds.lower is not None:
+        op = pc.greater_equal if bounds.include_lower else pc.greater
+        mask = pc.and_(mask, op(column, sort_key(bounds.lower)))
+    if bounds.upper is not None:
+        op = pc.less_equal if bounds.include_upper else pc.less
+        mask = pc.and_(mask, op(column, sort_key(bounds.upper)))
+    return mask
+
+
+class ArrowDataFrame:
+    """
+    SparkDataFrame stand-in over the Parquet / Arrow IPC files of one table.
+
+    Files are memory-mapped and read one record batch at a time, limited to
+    `columns` when a projection is given, so a table never has to fit in
+    memory as dicts. IsNotNull filters, and range filters on string
+    columns, run on the Arrow batches before rows are converted; other
+    filters are checked per row.
+    """
+
+    def __init__(self, files: Sequence[Path], columns: Optional[Sequence[str]] = None,
+                 predicates: Tuple = ()):
+        self.files = list(files)
+        self.schema = _file_schema(self.files[0]) if self.files else pa.schema([])
+        for path in self.files[1:]:
+            if not _file_schema(path).equals(self.schema):
+                raise ValueError(f"{path}: schema differs from {self.files[0].name}")
+
+        if columns is not None:
+            unknown = [c for c in columns if c not in self.schema.names]
+            if unknown:
+                raise ValueError(f"Unknown columns {unknown}; table has {self.schema.names}")
+            columns = list(columns)
+        self.columns = columns
+        self.predicates = tuple(predicates)
+
+    def filter(self, predicate):
+        """Same predicates as SparkDataFrame.filter; applied lazily, as batches are read."""
+        if isinstance(predicate, str):
+            predicate = parse_predicate(predicate)
+        return ArrowDataFrame(self.files, self.columns, self.predicates + (predicate,))
+
+    def _split_predicates(self):
+        # Masks computed on Arrow batches (batch -> boolean array), and the
+        # predicates left to check on Python values
+        pushed, residual = [], []
+        for predicate in self.predicates:
+            if predicate.column not in self.schema.names:
+                residual.append(predicate)
+            elif isinstance(predicate, IsNotNull):
+                pushed.append(lambda batch, column=predicate.column: batch.column(column).is_valid())
+            else:
+                bounds = as_range(predicate)
+                column_type = self.schema.field(predicate.column).type
+                if bounds is not None and (pa.types.is_string(column_type) or pa.types.is_large_string(column_type)):
+                    pushed.append(lambda batch, bounds=bounds: _range_mask(batch.column(bounds.column), bounds))
+                else:
+                    residual.append(predicate)
+        return pushed, residual
+
+    def _filter_columns(self) -> List[str]:
+        return sorted({p.column for p in self.predicates} & set(self.schema.names))
+
+    def _apply_filters(self, batch: pa.RecordBatch, pushed, residual) -> pa.RecordBatch:
+        for mask in pushed:
+            keep = mask(batch)
+            # Filtering copies the batch, so skip it when every row stays
+            if keep.true_count != batch.num_rows:
+                batch = batch.filter(keep)
+        if residual:
+            # Only the filter columns are converted to check the rest
+            keys = batch.select(sorted({p.column for p in residual} & set(self.schema.names))).to_pylist()
+            batch = batch.filter(pa.array([all(p.matches(k) for p in residual) for k in keys], pa.bool_()))
+        return batch
+
+    def _file_count(self, path: Path, pushed, residual) -> int:
+        # Rows of one file left by the filters: from the footer without any,
+        # else from the filter columns alone
+        if not self.predicates:
+            return _file_rows(path)
+        return sum(
+            self._apply_filters(batch, pushed, residual).num_rows
+            for batch in _read_file(path, self._filter_columns(), DEFAULT_READ_BATCH_ROWS)
+        )
+
+    def _record_batches(self, batch_size: int, skip: int = 0) -> Iterator[List[dict]]:
+        pushed, residual = self._split_predicates()
+        read_columns = self.columns
+        if read_columns is not None:
+            # Filter columns are read too, and dropped once applied
+            extra = set(self._filter_columns()) - set(read_columns)
+            read_columns = read_columns + sorted(extra)
+
+        for path in self.files:
+            if skip:
+                # Whole files are skipped from their footers, or by counting
+                # the rows their filter columns keep
+                file_rows = self._file_count(path, pushed, residual)
+                if skip >= file_rows:
+                    skip -= file_rows
+                    continue
+
+            for batch in _read_file(path, read_columns, batch_size):
+                batch = self._apply_filters(batch, pushed, residual)
+                if self.columns is not None and len(read_columns) != len(self.columns):
+                    batch = batch.select(self.columns)
+                if skip:
+                    if batch.num_rows <= skip:
+                        skip -= batch.num_rows
+                        continue
+                    batch, skip = batch.slice(skip), 0
+
+                if batch.num_rows:
+                    yield batch.to_pylist()
+
+    def iter_batches(self, batch_size: int, offset: int = 0):
+        """Batches of batch_size rows, starting at row `offset` of the filtered table."""
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+        # Filters and file boundaries leave short batches; rows are carried
+        # over so every batch but the last holds batch_size rows
+        pending: List[dict] = []
+        for rows in self._record_batches(batch_size, offset):
+            if not pending and len(rows) == batch_size:
+                yield rows
+                continue
+            pending.extend(rows)
+            while len(pending) >= batch_size:
+                yield pending[:batch_size]
+                pending = pending[batch_size:]
+        if pending:
+            yield pending
+
+    def collect(self) -> List[dict]:
+        records = []
+        for rows in self._record_batches(DEFAULT_READ_BATCH_ROWS):
+            records.extend(rows)
+        return records
+
+    def count(self) -> int:
+        """Rows left by the filters; only filter columns are read, and pushed ones are never converted."""
+        pushed, residual = self._split_predicates()
+        return sum(self._file_count(path, pushed, residual) for path in self.files)
+
+
+class ArrowWarehouse:
+    """
+    Local catalog over a directory laid out like an Iceberg warehouse: the
+    data files of main.sales.users are <root>/main/sales/users/data/*.parquet
+    (or Arrow IPC *.arrow / *.feather), read in file name order.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def data_dir(self, table_name: str) -> Path:
+        parts = table_name.split(".")
+        if not all(_NAME_PART.match(p) for p in parts):
+            raise ValueError(f"Invalid table name: {table_name}")
+        return self.root.joinpath(*parts, "data")
+
+    def data_files(self, table_name: str) -> List[Path]:
+        directory = self.data_dir(table_name)
+        files = sorted(
+            p for p in directory.glob("*") if p.suffix in PARQUET_SUFFIXES + IPC_SUFFIXES
+        ) if directory.is_dir() else []
+        if not files:
+            raise ValueError(f"Table not found in {self.root}: {table_name}")
+        return files
+
+    def table(self, table_name: str, columns: Optional[Sequence[str]] = None,
+              required: Sequence[str] = ()) -> ArrowDataFrame:
+        """
+        Projects onto the given columns the table has; the others read as
+        missing, like absent keys of a mock row. Missing `required` columns
+        raise ValueError.
+        """
+        files = self.data_files(table_name)
+        names = _file_schema(files[0]).names
+        missing = [c for c in required if c not in names]
+        if missing:
+            raise ValueError(f"{table_name}: missing columns {missing}; table has {names}")
+        if columns is not None:
+            columns = [c for c in columns if c in names]
+        return ArrowDataFrame(files, columns)
+
+    def table_version(self, table_name: str) -> str:
+        """Changes whenever a data file is added, removed or rewritten."""
+        digest = hashlib.blake2b(digest_size=16)
+        for path in self.data_files(table_name):
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()
+
+
+def write_table(root, table_name: str, records: Sequence[Dict], rows_per_file: Optional[int] = None,
+                file_format: str = "parquet") -> List[Path]:
+    """
+    Writes records as the data files of table_name under warehouse root,
+    replacing any files already there. Column types are inferred by Arrow,
+    so each column must hold one Python type (or None).
+    """
+    if file_format not in ("parquet", "arrow"):
+        raise ValueError(f"Unknown file format '{file_format}'")
+    if rows_per_file is not None and rows_per_file < 1:
+        raise ValueError(f"rows_per_file must be positive, got {rows_per_file}")
+
+    directory = ArrowWarehouse(root).data_dir(table_name)
+    directory.mkdir(parents=True, exist_ok=True)
+    for old in directory.glob("*"):
+        if old.suffix in PARQUET_SUFFIXES + IPC_SUFFIXES:
+            old.unlink()
+
+    table = pa.Table.from_pylist(list(records))
+    step = rows_per_file or max(table.num_rows, 1)
+    paths = []
+    for i, start in enumerate(range(0, max(table.num_rows, 1), step)):
+        part = table.slice(start, step)
+        path = directory / f"part-{i:05d}.{file_format}"
+        if file_format == "parquet":
+            pq.write_table(part, path)
+        else:
+            with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, part.schema) as writer:
+                writer.write_table(part)
+        paths.append(path)
+    return paths
@@ -0,0 +1,112 @@
+import operator
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Optional
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "=": operator.eq,
+}
+
+# column op 'literal'  |  column op literal
+_EXPRESSION = re.compile(r"^\s*(\w+)\s*(>=|<=|==|=|>|<)\s*'?([^']*?)'?\s*$")
+
+
+def sort_key(value: Any) -> Optional[str]:
+    # Timestamps are compared as ISO strings, the way they are stored in the
+    # mock tables, so datetimes and strings order consistently.
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+@dataclass(frozen=True)
+class Comparison:
+    """column <op> value, e.g. Comparison("updated_at", ">", "2026-01-01")."""
+    column: str
+    op: str
+    value: Any
+
+    def __post_init__(self):
+        if self.op not in OPERATORS:
+            raise ValueError(f"Unsupported operator '{self.op}'")
+
+    def matches(self, row: dict) -> bool:
+        actual = sort_key(row.get(self.column))
+        if actual is None:
+            return False
+        return OPERATORS[self.op](actual, sort_key(self.value))
+
+
+@dataclass(frozen=True)
+class Between:
+    """Range on one column; lower bound inclusive and upper exclusive by default."""
+    column: str
+    lower: Any = None
+    upper: Any = None
+    include_lower: bool = True
+    include_upper: bool = False
+
+    def matches(self, row: dict) -> bool:
+        actual = sort_key(row.get(self.column))
+        if actual is None:
+            return False
+
+        if self.lower is not None:
+            lower = sort_key(self.lower)
+            if actual < lower or (actual == lower and not self.include_lower):
+                return False
+
+        if self.upper is not None:
+            upper = sort_key(self.upper)
+            if actual > upper or (actual == upper and not self.include_upper):
+                return False
+
+        return True
+
+
+@dataclass(frozen=True)
+class IsNotNull:
+    """Rows where column is present and not None."""
+    column: str
+
+    def matches(self, row: dict) -> bool:
+        return row.get(self.column) is not None
+
+
+def as_range(predicate) -> Optional[Between]:
+    """Expresses a single-column predicate as a Between, for index lookups."""
+    if isinstance(predicate, Between):
+        return predicate
+
+    if isinstance(predicate, Comparison):
+        if predicate.op == ">":
+            return Between(predicate.column, lower=predicate.value, include_lower=False)
+        if predicate.op == ">=":
+            return Between(predicate.column, lower=predicate.value)
+        if predicate.op == "<":
+            return Between(predicate.column, upper=predicate.value)
+        if predicate.op == "<=":
+            return Between(predicate.column, upper=predicate.value, include_upper=True)
+        return Between(predicate.column, predicate.value, predicate.value, True, True)
+
+    return None
+
+
+@lru_cache(maxsize=256)
+def parse_predicate(expr: str) -> Comparison:
+    """Parses "updated_at > '2026-01-01T00:00:00'" style filter strings."""
+    match = _EXPRESSION.match(expr)
+    if not match:
+        raise ValueError(f"Unsupported filter expression: {expr}")
+
+    column, op, value = match.groups()
+    return Comparison(column, op, value)
@@ -0,0 +1,93 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence
+
+
+def row_hash(row: dict) -> str:
+    # Stable across processes: keys sorted, non-JSON values (datetimes) as str
+    encoded = json.dumps(row, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def table_fingerprint(hashes: Sequence[str]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for h in sorted(hashes):
+        digest.update(h.encode())
+    return digest.hexdigest()
+
+
+def row_key(row: dict, key_columns: Sequence[str]) -> str:
+    """A row's key columns as a JSON list, the form snapshot keys are stored in."""
+    return json.dumps([row.get(c) for c in key_columns], default=str)
+
+
+def key_record(key: str, key_columns: Sequence[str]) -> dict:
+    """Inverse of row_key: a record holding only the key columns."""
+    return dict(zip(key_columns, json.loads(key)))
+
+
+@dataclass
+class Snapshot:
+    """A table's current rows plus their content hashes."""
+    snapshot_id: int
+    fingerprint: str
+    rows: List[dict]
+    hashes: List[str]
+
+
+@dataclass
+class SnapshotDiff:
+    from_snapshot_id: Optional[int]
+    to_snapshot_id: int
+    added: List[dict] = field(default_factory=list)
+    # Key records (see key_record) of the keys the new snapshot lacks
+    removed: List[dict] = field(default_factory=list)
+    changed: List[dict] = field(default_factory=list)
+    # row_key -> content hash of the new snapshot, to store for the next diff
+    keys: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def upserts(self) -> List[dict]:
+        return self.added + self.changed
+
+
+def take_snapshot(snapshot_id: int, records: Sequence[dict],
+                  columns: Optional[Sequence[str]] = None) -> Snapshot:
+    """
+    columns, when given, limits the rows (and so their hashes) to those
+    columns: changes to other columns do not make a row differ.
+    """
+    if columns is None:
+        rows = [dict(r) for r in records]
+    else:
+        rows = [{c: r.get(c) for c in columns} for r in records]
+    hashes = [row_hash(r) for r in rows]
+    return Snapshot(snapshot_id, table_fingerprint(hashes), rows, hashes)
+
+
+def diff_snapshots(previous: Mapping[str, str], new: Snapshot, key_columns: Sequence[str],
+                   previous_id: Optional[int] = None) -> SnapshotDiff:
+    """
+    Compares new against the row_key -> content hash map stored for the
+    previous snapshot. Rows sharing a key (repeated edges) hash together,
+    so a change to any of them resends all of them; keys present on one
+    side only are added or removed.
+    """
+    keys = [row_key(row, key_columns) for row in new.rows]
+    grouped: Dict[str, List[str]] = {}
+    for key, h in zip(keys, new.hashes):
+        grouped.setdefault(key, []).append(h)
+
+    diff = SnapshotDiff(previous_id, new.snapshot_id)
+    diff.keys = {key: hs[0] if len(hs) == 1 else table_fingerprint(hs) for key, hs in grouped.items()}
+
+    for key, row in zip(keys, new.rows):
+        before = previous.get(key)
+        if before is None:
+            diff.added.append(row)
+        elif before != diff.keys[key]:
+            diff.changed.append(row)
+
+    diff.removed = [key_record(key, key_columns) for key in previous if key not in diff.keys]
+    return diff
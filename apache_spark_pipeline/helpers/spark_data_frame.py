@@ -1,26 +1,103 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, List
+
+from .predicates import as_range, parse_predicate, sort_key
+
+# Columns that get a sorted index the first time they are filtered on
+INDEXED_COLUMNS = ("updated_at",)
+
+
+class SortedIndex:
+    """Rows ordered by one column, so range filters are two bisects and a slice."""
+
+    def __init__(self, records: List[dict], column: str):
+        values = [r.get(column) for r in records]
+        entries = sorted(
+            (
+                (key, i)
+                for i, key in enumerate(map(sort_key, values))
+                if key is not None  # HARD SKIP rows without the column
+            ),
+        )
+        self.column = column
+        self.keys = [key for key, _ in entries]
+        self.rows = [records[i] for _, i in entries]
+
+    def range(self, bounds) -> List[dict]:
+        start, stop = 0, len(self.keys)
+
+        if bounds.lower is not None:
+            lower = sort_key(bounds.lower)
+            bisect = bisect_left if bounds.include_lower else bisect_right
+            start = bisect(self.keys, lower)
+
+        if bounds.upper is not None:
+            upper = sort_key(bounds.upper)
+            bisect = bisect_right if bounds.include_upper else bisect_left
+            stop = bisect(self.keys, upper)
+
+        return self.rows[start:stop]
+
+
 class SparkDataFrame:
+    """
+    Rows are changed through append / replace / update, which drop the
+    sorted indexes, so reads never re-check them. Editing `records` or a
+    row dict directly leaves the indexes stale.
+    """
+
     def __init__(self, records):
         self.records = records or []
+        self._indexes: Dict[str, SortedIndex] = {}
+
+    def append(self, row: dict):
+        self.records.append(row)
+        self._indexes.clear()
+
+    def replace(self, i: int, row: dict):
+        self.records[i] = row
+        self._indexes.clear()
 
-    def filter(self, expr: str):
-        # supports: updated_at > 'timestamp'
-        if "updated_at >" not in expr:
-            return self
+    def update(self, i: int, values: dict):
+        """Edits row i in place; rows handed out before keep the change."""
+        self.records[i].update(values)
+        self._indexes.clear()
 
-        ts = expr.split(">")[1].strip().strip("'")
+    def filter(self, predicate):
+        """
+        Accepts a predicate object (Comparison / Between) or a simple
+        "column op 'value'" string. Ranges on indexed columns are answered
+        from a sorted index built once per dataframe; anything else falls
+        back to a scan.
+        """
+        if isinstance(predicate, str):
+            predicate = parse_predicate(predicate)
 
-        filtered = []
-        for r in self.records:
-            updated_at = r.get("updated_at")
-            if not updated_at:
-                continue  # HARD SKIP
-            
-            print("TIMESTAMP", updated_at, ts)
-            if updated_at > ts:
-                filtered.append(r)
+        bounds = as_range(predicate)
+        if bounds is not None and bounds.column in INDEXED_COLUMNS:
+            return SparkDataFrame(self.index(bounds.column).range(bounds))
 
-        # print("Filtered", filtered)
-        return SparkDataFrame(filtered)
+        return SparkDataFrame([r for r in self.records if predicate.matches(r)])
+
+    def index(self, column: str) -> SortedIndex:
+        index = self._indexes.get(column)
+        if index is None:
+            index = SortedIndex(self.records, column)
+            self._indexes[column] = index
+        return index
 
     def collect(self):
         return self.records
+
+    def count(self):
+        return len(self.records)
+
+    def iter_batches(self, batch_size: int, offset: int = 0):
+        # Yields consecutive slices of at most batch_size rows, starting at row
+        # offset, so callers can process a table without holding a
+        # transformed copy of all of it.
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+        for start in range(offset, len(self.records), batch_size):
+            yield self.records[start:start + batch_size]
@@ -1,8 +1,10 @@
 # -------------------------
 # Mapping Definitions
 # -------------------------
+import sys
+from collections.abc import Mapping, Sequence
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 @dataclass
 class VertexMapping:
@@ -25,3 +27,339 @@ class EdgeMapping:
     attributes: List[str]
     # Iceberg field -> TigerGraph type
     type_conversions: Optional[Dict[str, str]] = None
+    # Rows of one chunk with the same (from_id, to_id) are merged into one
+    # edge before sending, see EdgeBatch.merged
+    latest_by: Optional[str] = None
+    # attribute -> MERGE_POLICIES key; other attributes come from the latest row
+    aggregations: Optional[Dict[str, str]] = None
+
+
+# How EdgeBatch.merged combines an attribute over the rows of one edge.
+# Merging only sees one chunk and each chunk overwrites the edge in
+# TigerGraph, so a policy must give the same result when applied again to
+# its own output (no "sum": the stored total would depend on chunk_size).
+MERGE_POLICIES = {
+    "min": min,
+    "max": max,
+}
+
+
+# -------------------------
+# Upsert Payload Batches
+# -------------------------
+# MappingEngine emits {"vertices": {type: VertexBatch}} / {"edges": {type: EdgeBatch}}.
+# Attributes are stored as columns (attr -> values, None = not set) instead
+# of a dict per row; per-row dicts are only built while a client sends them.
+
+def _intern_columns(columns: Optional[Dict[str, List]]) -> Dict[str, List]:
+    return {sys.intern(attr): values for attr, values in (columns or {}).items()}
+
+
+def _attribute_rows(columns: Dict[str, List], num_rows: int) -> Iterator[Dict]:
+    names = list(columns)
+    values = list(columns.values())
+
+    if not values:
+        return ({} for _ in range(num_rows))
+
+    # Dense columns zip straight into dicts; only filter when there are gaps
+    if not any(None in column for column in values):
+        return (dict(zip(names, row)) for row in zip(*values))
+
+    return (
+        {attr: value for attr, value in zip(names, row) if value is not None}
+        for row in zip(*values)
+    )
+
+
+def _columns_from_rows(rows: List[Dict]) -> Dict[str, List]:
+    columns: Dict[str, List] = {}
+    for i, attrs in enumerate(rows):
+        for attr, value in (attrs or {}).items():
+            column = columns.get(attr)
+            if column is None:
+                column = columns[attr] = [None] * len(rows)
+            column[i] = value
+    return columns
+
+
+def _take(values: List, rows: List[int]) -> List:
+    return [values[i] for i in rows]
+
+
+def _concat_columns(batches: List, lengths: List[int]) -> Dict[str, List]:
+    # Attributes missing from some batches are filled with None
+    names = dict.fromkeys(attr for batch in batches for attr in batch.columns)
+    columns = {}
+    for attr in names:
+        column = []
+        for batch, n in zip(batches, lengths):
+            column.extend(batch.columns.get(attr) or [None] * n)
+        columns[attr] = column
+    return columns
+
+
+class VertexBatch(Mapping):
+    """
+    Vertices of one type: ids[i] has the attributes in row i of columns.
+    Reads like the {id: attributes} dict it replaces (len, iteration over
+    ids, items()); lookup by id scans the ids and is meant for tests.
+    """
+    __slots__ = ("vertex_type", "ids", "columns")
+
+    def __init__(self, vertex_type: str, ids: List[str], columns: Optional[Dict[str, List]] = None):
+        self.vertex_type = sys.intern(vertex_type)
+        self.ids = ids
+        self.columns = _intern_columns(columns)
+
+    @classmethod
+    def from_dict(cls, vertex_type: str, vertices: Dict[str, Dict]) -> "VertexBatch":
+        return cls(vertex_type, list(vertices), _columns_from_rows(list(vertices.values())))
+
+    @classmethod
+    def concat(cls, batches: List["VertexBatch"]) -> "VertexBatch":
+        """Rows of all batches (of one vertex type), in order."""
+        return cls(
+            batches[0].vertex_type,
+            [v_id for batch in batches for v_id in batch.ids],
+            _concat_columns(batches, [len(batch) for batch in batches]),
+        )
+
+    def __reduce__(self):
+        # Rebuilt through __init__, so names are interned again after pickling
+        return (type(self), (self.vertex_type, self.ids, self.columns))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids)
+
+    def __getitem__(self, v_id: str) -> Dict:
+        try:
+            i = self.ids.index(v_id)
+        except ValueError:
+            raise KeyError(v_id) from None
+        return {attr: values[i] for attr, values in self.columns.items() if values[i] is not None}
+
+    def attribute_rows(self) -> Iterator[Dict]:
+        return _attribute_rows(self.columns, len(self.ids))
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        return zip(self.ids, self.attribute_rows())
+
+    def values(self) -> Iterator[Dict]:
+        return self.attribute_rows()
+
+    def slice(self, start: int, stop: int) -> "VertexBatch":
+        return VertexBatch(
+            self.vertex_type,
+            self.ids[start:stop],
+            {attr: values[start:stop] for attr, values in self.columns.items()},
+        )
+
+    def take(self, rows: List[int]) -> "VertexBatch":
+        return VertexBatch(
+            self.vertex_type,
+            _take(self.ids, rows),
+            {attr: _take(values, rows) for attr, values in self.columns.items()},
+        )
+
+    def deduplicated(self) -> "VertexBatch":
+        """Keeps the last row of each id, like assigning the rows into a dict."""
+        if len(set(self.ids)) == len(self.ids):
+            return self
+        last = {v_id: i for i, v_id in enumerate(self.ids)}
+        return self.take(sorted(last.values()))
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"VertexBatch({self.vertex_type!r}, {len(self.ids)} vertices, attributes={list(self.columns)})"
+
+
+class EdgeBatch(Sequence):
+    """
+    Edges of one type between one pair of vertex types, as parallel
+    from_ids / to_ids / attribute columns. Indexing and iteration produce
+    the {"from_type", "from_id", "to_type", "to_id", "attributes"} dicts the
+    list form held, built on demand.
+    """
+    __slots__ = ("edge_type", "from_type", "to_type", "from_ids", "to_ids", "columns")
+
+    def __init__(self, edge_type: str, from_type: str, to_type: str,
+                 from_ids: List[str], to_ids: List[str], columns: Optional[Dict[str, List]] = None):
+        if len(from_ids) != len(to_ids):
+            raise ValueError(f"{edge_type}: {len(from_ids)} source ids but {len(to_ids)} target ids")
+
+        self.edge_type = sys.intern(edge_type)
+        self.from_type = sys.intern(from_type)
+        self.to_type = sys.intern(to_type)
+        self.from_ids = from_ids
+        self.to_ids = to_ids
+        self.columns = _intern_columns(columns)
+
+    @classmethod
+    def from_dicts(cls, edge_type: str, edges: Iterable[Dict]) -> "EdgeBatch":
+        edges = list(edges)
+        if not edges:
+            return cls(edge_type, "", "", [], [])
+
+        from_type, to_type = edges[0]["from_type"], edges[0]["to_type"]
+        for e in edges:
+            if e["from_type"] != from_type or e["to_type"] != to_type:
+                raise ValueError(
+                    f"{edge_type}: edges of one batch must share vertex types, "
+                    f"got {from_type}->{to_type} and {e['from_type']}->{e['to_type']}"
+                )
+
+        return cls(
+            edge_type, from_type, to_type,
+            [e["from_id"] for e in edges],
+            [e["to_id"] for e in edges],
+            _columns_from_rows([e.get("attributes") for e in edges]),
+        )
+
+    @classmethod
+    def concat(cls, batches: List["EdgeBatch"]) -> "EdgeBatch":
+        """Rows of all batches (of one edge and vertex type pair), in order."""
+        first = batches[0]
+        return cls(
+            first.edge_type, first.from_type, first.to_type,
+            [v_id for batch in batches for v_id in batch.from_ids],
+            [v_id for batch in batches for v_id in batch.to_ids],
+            _concat_columns(batches, [len(batch) for batch in batches]),
+        )
+
+    def __reduce__(self):
+        return (type(self), (self.edge_type, self.from_type, self.to_type,
+                             self.from_ids, self.to_ids, self.columns))
+
+    def __len__(self) -> int:
+        return len(self.from_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(list(range(len(self)))[index])
+        return {
+            "from_type": self.from_type,
+            "from_id": self.from_ids[index],
+            "to_type": self.to_type,
+            "to_id": self.to_ids[index],
+            "attributes": {
+                attr: values[index] for attr, values in self.columns.items() if values[index] is not None
+            },
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for from_id, to_id, attributes in self.triples():
+            yield {
+                "from_type": self.from_type,
+                "from_id": from_id,
+                "to_type": self.to_type,
+                "to_id": to_id,
+                "attributes": attributes,
+            }
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (EdgeBatch, list)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def attribute_rows(self) -> Iterator[Dict]:
+        return _attribute_rows(self.columns, len(self.from_ids))
+
+    def triples(self) -> Iterator[Tuple[str, str, Dict]]:
+        """(from_id, to_id, attributes) per edge, the form upsertEdges takes."""
+        return zip(self.from_ids, self.to_ids, self.attribute_rows())
+
+    def slice(self, start: int, stop: int) -> "EdgeBatch":
+        return EdgeBatch(
+            self.edge_type, self.from_type, self.to_type,
+            self.from_ids[start:stop], self.to_ids[start:stop],
+            {attr: values[start:stop] for attr, values in self.columns.items()},
+        )
+
+    def take(self, rows: List[int]) -> "EdgeBatch":
+        return EdgeBatch(
+            self.edge_type, self.from_type, self.to_type,
+            _take(self.from_ids, rows), _take(self.to_ids, rows),
+            {attr: _take(values, rows) for attr, values in self.columns.items()},
+        )
+
+    def merged(self, discriminator: Optional[str] = None, latest_by: Optional[str] = None,
+               aggregations: Optional[Dict[str, str]] = None) -> "EdgeBatch":
+        """
+        One edge per (from_id, to_id[, discriminator value]). Attributes come
+        from the row with the greatest `latest_by` value (the last row on ties
+        or without latest_by, as if the rows were upserted in order), except
+        `aggregations` columns, which combine the non-null values of all the
+        rows. Grouping is a single pass over a hash index.
+        """
+        n = len(self.from_ids)
+        if discriminator is not None:
+            keys = zip(self.from_ids, self.to_ids, self.columns.get(discriminator) or [None] * n)
+        else:
+            keys = zip(self.from_ids, self.to_ids)
+        rank = self.columns.get(latest_by) if latest_by is not None else None
+
+        groups: Dict[Tuple, int] = {}
+        group_of: List[int] = []
+        winners: List[int] = []
+        for i, key in enumerate(keys):
+            g = groups.setdefault(key, len(winners))
+            if g == len(winners):
+                winners.append(i)
+            elif rank is None or not _older(rank[i], rank[winners[g]]):
+                winners[g] = i
+            group_of.append(g)
+
+        if len(winners) == n:
+            return self
+
+        batch = self.take(winners)
+        for attr, policy in (aggregations or {}).items():
+            values = self.columns.get(attr)
+            if values is None:
+                continue
+            combine = MERGE_POLICIES[policy]
+            combined = [None] * len(winners)
+            for g, value in zip(group_of, values):
+                if value is not None:
+                    current = combined[g]
+                    combined[g] = value if current is None else combine(current, value)
+            batch.columns[attr] = combined
+        return batch
+
+    def to_list(self) -> List[Dict]:
+        return list(self)
+
+    def __repr__(self) -> str:
+        return (
+            f"EdgeBatch({self.edge_type!r}, {self.from_type}->{self.to_type}, "
+            f"{len(self.from_ids)} edges, attributes={list(self.columns)})"
+        )
+
+
+def _older(value, than) -> bool:
+    # Unset values rank below any set one
+    if value is None:
+        return than is not None
+    return than is not None and value < than
+
+
+def as_vertex_batch(vertex_type: str, vertices) -> VertexBatch:
+    """Accepts a VertexBatch or the {id: attributes} dict form."""
+    if isinstance(vertices, VertexBatch):
+        return vertices
+    return VertexBatch.from_dict(vertex_type, vertices)
+
+
+def as_edge_batch(edge_type: str, edges) -> EdgeBatch:
+    """Accepts an EdgeBatch or the list-of-dicts form."""
+    if isinstance(edges, EdgeBatch):
+        return edges
+    return EdgeBatch.from_dicts(edge_type, edges)
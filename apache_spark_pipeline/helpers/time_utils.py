@@ -1,29 +1,253 @@
-from datetime import datetime
-from typing import Optional
-
-SUPPORTED_FORMATS = [
-    "%Y-%m-%d",
-    "%Y-%m-%d %H:%M",
-    "%Y-%m-%d %H:%M:%S",
-    "%Y-%m-%dT%H:%M",
-    "%Y-%m-%dT%H:%M:%S",
-]
-
-def parse_timestamp(value: Optional[str]) -> Optional[str]:
-    if not value:
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Timestamps are normalized to naive ISO 8601 in UTC, the way
+# datetime.isoformat() prints them: aware values are converted to UTC,
+# epoch numbers are read as UTC and naive values are taken as UTC already.
+
+# Numbers at or above this are epoch milliseconds, below it epoch seconds
+# (1e11 seconds is the year 5138; 1e11 milliseconds is March 1973)
+EPOCH_MILLIS_THRESHOLD = 10 ** 11
+
+EPOCH = datetime(1970, 1, 1)
+
+# Epoch offsets in microseconds that datetime can represent; the column
+# path rejects others like the per-value path does
+_MIN_EPOCH_MICROS = (datetime.min - EPOCH) // timedelta(microseconds=1)
+_MAX_EPOCH_MICROS = (datetime.max - EPOCH) // timedelta(microseconds=1)
+
+# Shapes of the accepted strings, with every digit replaced by "d"
+_DIGITS = str.maketrans("0123456789", "dddddddddd")
+_ISO_SHAPE = r"dddd-dd-dd(?:[T ]dd:dd(?::dd(?:\.d{1,6})?)?)?"
+_SHAPES = (
+    ("epoch", re.compile(r"-?d+(?:\.d+)?")),
+    ("iso", re.compile(_ISO_SHAPE)),
+    ("iso_tz", re.compile(_ISO_SHAPE + r"(?:Z|[+-]dd(?::?dd)?)")),
+)
+
+# Each length of an "iso" string has one layout, so a whole column is
+# checked against these in one NumPy pass: a row per string length, one
+# character code per position ("d" any digit, "T" the T or space
+# separator, 0 past the end). Other lengths, and NumPy-only forms like
+# "now", "2026-01" or a UTC offset, go value by value.
+_ISO_WIDTH = 26
+_DIGIT, _SEPARATOR = 1, 2
+
+
+def _iso_layouts() -> np.ndarray:
+    layouts = np.zeros((_ISO_WIDTH + 1, _ISO_WIDTH), dtype=np.uint8)
+    codes = {"d": _DIGIT, "T": _SEPARATOR}
+    for layout in ("dddd-dd-dd", "dddd-dd-ddTdd:dd", "dddd-dd-ddTdd:dd:dd"):
+        layouts[len(layout), :len(layout)] = [codes.get(c, ord(c)) for c in layout]
+    for digits in range(1, 7):
+        layout = "dddd-dd-ddTdd:dd:dd." + "d" * digits
+        layouts[len(layout), :len(layout)] = [codes.get(c, ord(c)) for c in layout]
+    return layouts
+
+
+_ISO_LAYOUTS = _iso_layouts()
+
+
+@lru_cache(maxsize=256)
+def _shape_format(shape: str) -> Optional[str]:
+    for name, pattern in _SHAPES:
+        if pattern.fullmatch(shape):
+            return name
+    return None
+
+
+def timestamp_format(text: str) -> Optional[str]:
+    """
+    "epoch", "iso" (naive ISO date or date-time) or "iso_tz" (with Z or a
+    UTC offset); None when the string is not a supported timestamp.
+    Cached per digit pattern, so a column of one format is classified once.
+    """
+    return _shape_format(text.translate(_DIGITS))
+
+
+def _datetime_string(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _epoch_string(value) -> str:
+    if abs(value) >= EPOCH_MILLIS_THRESHOLD:
+        return (EPOCH + timedelta(milliseconds=value)).isoformat()
+    return (EPOCH + timedelta(seconds=value)).isoformat()
+
+
+def parse_timestamp(value: Any) -> Optional[str]:
+    """
+    Normalizes one timestamp: a datetime, epoch seconds or milliseconds
+    (number or digit string), or an ISO 8601 string with or without time,
+    seconds, fraction and UTC offset. None and blank strings give None.
+    """
+    if value is None:
         return None
+    if isinstance(value, datetime):
+        return _datetime_string(value)
 
-    value = value.strip()
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return _epoch_string(value)
 
-    # Epoch seconds
-    if value.isdigit():
-        return datetime.fromtimestamp(int(value)).isoformat()
+        text = str(value).strip()
+        if not text:
+            return None
+        if text.isdigit():
+            return _epoch_string(int(text))
 
-    # Try known formats
-    for fmt in SUPPORTED_FORMATS:
-        try:
-            return datetime.strptime(value, fmt).isoformat()
-        except ValueError:
-            continue
+        kind = timestamp_format(text)
+        if kind == "epoch":
+            return _epoch_string(float(text) if "." in text else int(text))
+        if kind is not None:
+            return _datetime_string(datetime.fromisoformat(text))
+    except (ValueError, OverflowError):
+        pass
 
     raise ValueError(f"Invalid timestamp format: {value}")
+
+
+def _iso_strings(stamps: np.ndarray) -> List[Optional[str]]:
+    # datetime64[us] -> isoformat() strings: seconds precision unless the
+    # value has a sub-second part; NaT -> None
+    seconds = stamps.astype("datetime64[s]")
+    strings = np.datetime_as_string(seconds, unit="s").tolist()
+
+    missing = np.isnat(stamps)
+    fractional = (stamps != seconds) & ~missing
+    for i in np.flatnonzero(fractional):
+        strings[i] = str(np.datetime_as_string(stamps[i], unit="us"))
+    for i in np.flatnonzero(missing):
+        strings[i] = None
+    return strings
+
+
+def _byte_strings(values: Sequence) -> np.ndarray:
+    # ASCII bytes, None and "" both as b""; anything else raises
+    # UnicodeEncodeError, a ValueError
+    if None in values:
+        values = [v or "" for v in values]
+    return np.array(values, dtype=bytes)
+
+
+def _check_iso_layout(values: Sequence):
+    # Raises ValueError unless every value has an "iso" layout
+    strings = _byte_strings(values)
+    codes = strings.view(np.uint8).reshape(len(strings), -1)
+    if codes.shape[1] > _ISO_WIDTH:
+        raise ValueError("ISO column has values longer than a timestamp")
+    lengths = np.char.str_len(strings)
+    if lengths.min() == lengths.max():
+        expected = _ISO_LAYOUTS[lengths[0], :codes.shape[1]]
+    else:
+        expected = _ISO_LAYOUTS[lengths, :codes.shape[1]]
+    digits = (codes >= ord("0")) & (codes <= ord("9"))
+    separators = (codes == ord("T")) | (codes == ord(" "))
+    matches = np.where(expected == _DIGIT, digits, np.where(expected == _SEPARATOR, separators, codes == expected))
+    if not matches.all():
+        raise ValueError("ISO column has values of another format")
+
+
+def _parse_iso_column(values: Sequence) -> List[Optional[str]]:
+    _check_iso_layout(values)
+    stamps = np.array(values, dtype="datetime64[us]")
+    # Already canonical: parsing above validated them, nothing to rewrite
+    if all(v is None or (len(v) == 19 and v[10] == "T") for v in values):
+        return list(values)
+    return _iso_strings(stamps)
+
+
+def _parse_epoch_strings(values: Sequence) -> List[Optional[str]]:
+    # Digit strings only; signs, fractions and anything float() would
+    # also take ("1e5", "nan") go value by value
+    strings = _byte_strings(values)
+    codes = strings.view(np.uint8)
+    # Digits, or the zero padding of shorter strings
+    if not (((codes - ord("0")) <= 9) | (codes == 0)).all():
+        raise ValueError("epoch column has values of another format")
+    return _parse_epoch_column(np.where(strings == b"", b"nan", strings).astype(np.float64))
+
+
+def _parse_epoch_column(values: Sequence) -> List[Optional[str]]:
+    numbers = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(numbers)
+    scale = np.where(np.abs(numbers) >= EPOCH_MILLIS_THRESHOLD, 1e3, 1e6)
+    micros = np.round(np.where(missing, 0, numbers) * scale)
+    # Out of range (or infinite): the per-value path records which rows
+    if not ((micros >= _MIN_EPOCH_MICROS) & (micros <= _MAX_EPOCH_MICROS)).all():
+        raise ValueError("epoch column has values outside the datetime range")
+    micros = micros.astype(np.int64)
+    stamps = micros.astype("datetime64[us]")
+    stamps[missing] = np.datetime64("NaT")
+    return _iso_strings(stamps)
+
+
+def _parse_datetime_column(values: Sequence) -> List[Optional[str]]:
+    if None not in values and set(map(attrgetter("tzinfo"), values)) == {None}:
+        return list(map(datetime.isoformat, values))
+    return [None if v is None else _datetime_string(v) for v in values]
+
+
+def _column_parser(values: Sequence):
+    value_types = set(map(type, values))
+    value_types.discard(type(None))
+
+    if value_types <= {int, float}:
+        return _parse_epoch_column
+
+    if value_types == {str}:
+        first = next((v for v in values if v), None)
+        if first is None:
+            return None
+        # Both parsers check every value and raise ValueError on another format
+        kind = timestamp_format(first)
+        if kind == "epoch":
+            return _parse_epoch_strings
+        if kind == "iso":
+            return _parse_iso_column
+
+    if value_types == {datetime}:
+        return _parse_datetime_column
+
+    return None
+
+
+def parse_timestamps(values: Sequence, errors: Optional[Dict[int, Exception]] = None) -> List[Optional[str]]:
+    """
+    parse_timestamp over a whole column. The format is guessed from the
+    first value; epoch digit strings and naive ISO columns are then checked
+    and parsed by NumPy in one call. Columns where any value has another
+    format, and columns NumPy rejects, fall back to parsing value by value.
+
+    Without `errors` the first invalid value raises ValueError; with it,
+    invalid values become None and errors[i] records why.
+    """
+    values = values if isinstance(values, list) else list(values)
+    if not values:
+        return []
+
+    parser = _column_parser(values)
+    if parser is not None:
+        try:
+            return parser(values)
+        except (ValueError, TypeError, OverflowError):
+            pass
+
+    if errors is None:
+        return list(map(parse_timestamp, values))
+
+    parsed = []
+    for i, value in enumerate(values):
+        try:
+            parsed.append(parse_timestamp(value))
+        except (ValueError, OverflowError) as e:
+            errors.setdefault(i, e)
+            parsed.append(None)
+    return parsed
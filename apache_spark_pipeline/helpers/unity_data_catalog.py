@@ -1,13 +1,76 @@
+import hashlib
+import os
+import pickle
+from typing import Dict, Optional, Sequence
+
 from .mock_iceberg_data import MOCK_ICEBERG_DATA
+from .snapshots import Snapshot, take_snapshot
 from .spark import Spark
+from .spark_data_frame import SparkDataFrame
 
 class UnityCatalog:
-    def __init__(self):
+    # Dataframes (and the indexes they build) are shared across catalog
+    # instances, so each poll of a table does not re-sort it.
+    _frames: Dict[str, SparkDataFrame] = {}
+
+    def __init__(self, warehouse: Optional[str] = None):
+        """
+        Tables are served from MOCK_ICEBERG_DATA, or from the Parquet / Arrow
+        files of a local warehouse directory when one is given (or set in
+        UNITY_CATALOG_WAREHOUSE); that needs pyarrow.
+        """
         self.spark = Spark()
+        self.warehouse = None
+
+        warehouse = warehouse or os.environ.get("UNITY_CATALOG_WAREHOUSE")
+        if warehouse:
+            from .arrow_catalog import ArrowWarehouse
+
+            self.warehouse = ArrowWarehouse(warehouse)
+
+    def table(self, table_name: str, columns: Optional[Sequence[str]] = None,
+              required: Sequence[str] = ()):
+        """
+        columns limits the warehouse read to those of them the table has;
+        a warehouse table without one of the `required` columns raises
+        ValueError. Mock tables are already in memory and always return
+        every column.
+        """
+        if self.warehouse is not None:
+            return self.warehouse.table(table_name, columns, required)
 
-    def table(self, table_name: str):
         if table_name not in MOCK_ICEBERG_DATA:
             raise ValueError(f"Mock table not found: {table_name}")
 
         records = MOCK_ICEBERG_DATA[table_name]
-        return self.spark.create_dataframe(records)
+
+        frame = self._frames.get(table_name)
+        if frame is None or frame.records is not records:
+            frame = self.spark.create_dataframe(records)
+            self._frames[table_name] = frame
+
+        return frame
+
+    def table_version(self, table_name: str) -> str:
+        """
+        Identifies the table's current content: the data files of a
+        warehouse table, a hash of the rows of a mock table. Mock rows are
+        hashed on every call, so in-place edits change the version too.
+        """
+        if self.warehouse is not None:
+            return self.warehouse.table_version(table_name)
+
+        records = self.table(table_name).collect()
+        return hashlib.blake2b(pickle.dumps(records, protocol=5), digest_size=16).hexdigest()
+
+    def current_snapshot(self, table_name: str, columns: Optional[Sequence[str]] = None) -> Snapshot:
+        """
+        Returns the table's current rows and their content hashes, over
+        `columns` only when given. Snapshot ids are derived from the content
+        fingerprint, so they stay meaningful across processes. Nothing is
+        retained: what a snapshot sync needs of the previous one is stored
+        with its checkpoint.
+        """
+        snapshot = take_snapshot(0, self.table(table_name, columns).collect(), columns)
+        snapshot.snapshot_id = int(snapshot.fingerprint[:15], 16)
+        return snapshot
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apache_spark_pipeline', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synccheckpoint',
+            name='snapshot_id',
+            field=models.BigIntegerField(null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apache_spark_pipeline', '0002_synccheckpoint_snapshot_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChunkCommit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=255)),
+                ('version', models.CharField(max_length=64)),
+                ('start', models.BigIntegerField()),
+                ('stop', models.BigIntegerField()),
+                ('high_watermark', models.CharField(max_length=64, null=True)),
+                ('committed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('table', 'version', 'start'), name='unique_chunk_commit')],
+            },
+        ),
+    ]
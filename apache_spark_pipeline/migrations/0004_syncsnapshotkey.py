@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apache_spark_pipeline', '0003_syncchunkcommit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncSnapshotKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=255)),
+                ('key', models.CharField(max_length=512)),
+                ('row_hash', models.CharField(max_length=32)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('table', 'key'), name='unique_snapshot_key')],
+            },
+        ),
+    ]
@@ -14,3 +14,44 @@ class Purchase(models.Model):
     product_id = models.OneToOneField(Product, on_delete=models.CASCADE)
     amount = models.FloatField()
     order_date = models.DateTimeField()
+
+class SyncCheckpoint(models.Model):
+    # Catalog table name, e.g. "main.sales.users"
+    table = models.CharField(max_length=255, unique=True)
+    # Highest updated_at successfully upserted, as an ISO 8601 string
+    high_watermark = models.CharField(max_length=64, null=True)
+    # Catalog snapshot whose rows were last fully upserted
+    snapshot_id = models.BigIntegerField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class SyncChunkCommit(models.Model):
+    # One chunk of a full-table read acknowledged by TigerGraph; a retried
+    # sync of the same table version skips the committed rows
+    table = models.CharField(max_length=255)
+    # Catalog content plus read plan the offsets refer to
+    version = models.CharField(max_length=64)
+    # Row offsets [start, stop) in read order
+    start = models.BigIntegerField()
+    stop = models.BigIntegerField()
+    # Highest updated_at in the chunk, as an ISO 8601 string
+    high_watermark = models.CharField(max_length=64, null=True)
+    committed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["table", "version", "start"], name="unique_chunk_commit"),
+        ]
+
+class SyncSnapshotKey(models.Model):
+    # One key of the snapshot last synced (SyncCheckpoint.snapshot_id); the
+    # next snapshot sync diffs the table against these instead of old rows
+    table = models.CharField(max_length=255)
+    # Key columns of the row(s) as a JSON list
+    key = models.CharField(max_length=512)
+    # Content hash of the row(s) with that key
+    row_hash = models.CharField(max_length=32)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["table", "key"], name="unique_snapshot_key"),
+        ]
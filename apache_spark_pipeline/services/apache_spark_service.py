@@ -1,19 +1,67 @@
 # from pyspark.sql import SparkSession
+import hashlib
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+from ..helpers.predicates import Comparison, IsNotNull
 from ..helpers.unity_data_catalog import UnityCatalog
 
+
+@dataclass(frozen=True)
+class ReadPlan:
+    """
+    Columns to read from a table and filters applied by the catalog read.
+    Columns the table lacks are left out of the read, except `required`
+    ones, which the catalog rejects with ValueError.
+    """
+    columns: Optional[Tuple[str, ...]] = None
+    predicates: Tuple = ()
+    required: Tuple[str, ...] = ()
+
+    @classmethod
+    def for_mapping(cls, plan, keep: Sequence[str] = ()) -> "ReadPlan":
+        """
+        Reads only the fields a compiled mapping uses (plus `keep`) and
+        skips rows with an id field unset, which the mapping would drop.
+        Only the id fields have to exist in the table.
+        """
+        columns = tuple(dict.fromkeys(tuple(plan.fields) + tuple(keep)))
+        ids = tuple(name for name, _ in plan.id_fields)
+        return cls(columns, tuple(IsNotNull(name) for name in ids), ids)
+
+
 class SparkService:
-    def __init__(self):
-        self.unity_catalog = UnityCatalog()
-
-    def read_batch(self, table):
-        return self.unity_catalog.table(table)
-
-    def read_microbatch(self, table, last_ts):
-        return (
-            self.unity_catalog
-            .table(table)
-            .filter(f"updated_at > '{last_ts}'")
-        )
+    def __init__(self, warehouse=None):
+        self.unity_catalog = UnityCatalog(warehouse)
+
+    def _table(self, table, read_plan: Optional[ReadPlan]):
+        if read_plan is None:
+            return self.unity_catalog.table(table)
+        return self.unity_catalog.table(table, read_plan.columns, read_plan.required)
+
+    def _apply(self, dataframe, read_plan: Optional[ReadPlan]):
+        for predicate in read_plan.predicates if read_plan else ():
+            dataframe = dataframe.filter(predicate)
+        return dataframe
+
+    def read_batch(self, table, read_plan: Optional[ReadPlan] = None):
+        return self._apply(self._table(table, read_plan), read_plan)
+
+    def read_microbatch(self, table, last_ts, read_plan: Optional[ReadPlan] = None):
+        # The watermark range goes first: it is answered from an index
+        dataframe = self._table(table, read_plan).filter(Comparison("updated_at", ">", last_ts))
+        return self._apply(dataframe, read_plan)
+
+    def table_version(self, table, read_plan: Optional[ReadPlan] = None) -> str:
+        """Changes when the rows a read with read_plan returns may have."""
+        key = f"{self.unity_catalog.table_version(table)}:{read_plan!r}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def dataframe(self, records):
+        return self.unity_catalog.spark.create_dataframe(records)
+
+    def current_snapshot(self, table, columns=None):
+        return self.unity_catalog.current_snapshot(table, columns)
 
     def stop_service(self):
         self.unity_catalog.spark.stop()
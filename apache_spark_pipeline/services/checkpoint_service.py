@@ -0,0 +1,209 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# (start, stop, high_watermark) of a committed chunk, by row offset
+Chunk = Tuple[int, int, Optional[str]]
+
+# Snapshot keys per query, below SQLite's bound-parameter limit
+SNAPSHOT_KEY_BATCH_SIZE = 500
+
+
+def watermark_value(value: Any) -> Optional[str]:
+    # updated_at arrives as ISO strings or datetimes; checkpoints keep strings
+    # so they compare the same way SparkDataFrame.filter does.
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class CheckpointStore:
+    """
+    Per-table high-watermarks persisted in the Django database
+    (SyncCheckpoint), so micro-batches resume where the last successful
+    upsert stopped without the caller passing a timestamp.
+    """
+
+    def get_watermark(self, table: str) -> Optional[str]:
+        from ..models import SyncCheckpoint
+
+        checkpoint = SyncCheckpoint.objects.filter(table=table).first()
+        return checkpoint.high_watermark if checkpoint else None
+
+    def save_watermark(self, table: str, watermark: Optional[str]):
+        from ..models import SyncCheckpoint
+
+        if watermark is None:
+            return
+
+        checkpoint, _ = SyncCheckpoint.objects.get_or_create(table=table)
+        # Never move backwards, e.g. after a micro-batch with an old last_ts
+        if checkpoint.high_watermark is None or watermark > checkpoint.high_watermark:
+            checkpoint.high_watermark = watermark
+            checkpoint.save()
+
+    def get_snapshot(self, table: str) -> Optional[int]:
+        from ..models import SyncCheckpoint
+
+        checkpoint = SyncCheckpoint.objects.filter(table=table).first()
+        return checkpoint.snapshot_id if checkpoint else None
+
+    def get_snapshot_keys(self, table: str) -> Dict[str, str]:
+        """row_key -> content hash of the snapshot last synced (see snapshots.diff_snapshots)."""
+        from ..models import SyncSnapshotKey
+
+        return dict(SyncSnapshotKey.objects.filter(table=table).values_list("key", "row_hash"))
+
+    def save_snapshot(self, table: str, snapshot_id: int, keys: Optional[Dict[str, str]] = None):
+        """keys, when given, replaces the stored keys; only the ones that differ are written."""
+        from django.db import transaction
+
+        from ..models import SyncCheckpoint, SyncSnapshotKey
+
+        with transaction.atomic():
+            SyncCheckpoint.objects.update_or_create(
+                table=table,
+                defaults={"snapshot_id": snapshot_id},
+            )
+            if keys is None:
+                return
+
+            stored = self.get_snapshot_keys(table)
+            stale = [key for key, h in stored.items() if keys.get(key) != h]
+            for start in range(0, len(stale), SNAPSHOT_KEY_BATCH_SIZE):
+                SyncSnapshotKey.objects.filter(
+                    table=table, key__in=stale[start:start + SNAPSHOT_KEY_BATCH_SIZE]
+                ).delete()
+            SyncSnapshotKey.objects.bulk_create(
+                [SyncSnapshotKey(table=table, key=key, row_hash=h)
+                 for key, h in keys.items() if stored.get(key) != h],
+                batch_size=SNAPSHOT_KEY_BATCH_SIZE,
+            )
+
+    def committed_chunks(self, table: str, version: str) -> List[Chunk]:
+        from ..models import SyncChunkCommit
+
+        rows = SyncChunkCommit.objects.filter(table=table, version=version).order_by("start")
+        return [(c.start, c.stop, c.high_watermark) for c in rows]
+
+    def commit_chunks(self, table: str, version: str, chunks: Iterable[Chunk]):
+        from ..models import SyncChunkCommit
+
+        SyncChunkCommit.objects.bulk_create(
+            [SyncChunkCommit(table=table, version=version, start=start, stop=stop, high_watermark=watermark)
+             for start, stop, watermark in chunks],
+            ignore_conflicts=True,
+        )
+
+    def clear_chunks(self, table: str):
+        from ..models import SyncChunkCommit
+
+        SyncChunkCommit.objects.filter(table=table).delete()
+
+
+class InMemoryCheckpointStore:
+    """Process-local store with the CheckpointStore interface, for benchmarks and tests."""
+
+    def __init__(self):
+        self.watermarks: Dict[str, str] = {}
+        self.snapshots: Dict[str, int] = {}
+        self.snapshot_keys: Dict[str, Dict[str, str]] = {}
+        # table -> (version, {start: chunk})
+        self.chunks: Dict[str, Tuple[str, Dict[int, Chunk]]] = {}
+
+    def get_watermark(self, table: str) -> Optional[str]:
+        return self.watermarks.get(table)
+
+    def save_watermark(self, table: str, watermark: Optional[str]):
+        if watermark is None:
+            return
+
+        current = self.watermarks.get(table)
+        if current is None or watermark > current:
+            self.watermarks[table] = watermark
+
+    def get_snapshot(self, table: str) -> Optional[int]:
+        return self.snapshots.get(table)
+
+    def get_snapshot_keys(self, table: str) -> Dict[str, str]:
+        return dict(self.snapshot_keys.get(table, {}))
+
+    def save_snapshot(self, table: str, snapshot_id: int, keys: Optional[Dict[str, str]] = None):
+        self.snapshots[table] = snapshot_id
+        if keys is not None:
+            self.snapshot_keys[table] = dict(keys)
+
+    def committed_chunks(self, table: str, version: str) -> List[Chunk]:
+        stored_version, chunks = self.chunks.get(table, (None, {}))
+        return sorted(chunks.values()) if stored_version == version else []
+
+    def commit_chunks(self, table: str, version: str, chunks: Iterable[Chunk]):
+        stored_version, stored = self.chunks.get(table, (None, {}))
+        if stored_version != version:
+            stored = {}
+            self.chunks[table] = (version, stored)
+        for chunk in chunks:
+            stored.setdefault(chunk[0], chunk)
+
+    def clear_chunks(self, table: str):
+        self.chunks.pop(table, None)
+
+
+def resume_point(chunks: Iterable[Chunk]) -> Tuple[int, Optional[str]]:
+    """
+    Row offset up to which chunks cover the table without a gap, and the
+    highest watermark among those chunks.
+    """
+    offset, watermark = 0, None
+    for start, stop, chunk_watermark in sorted(chunks):
+        if start > offset:
+            break
+        offset = max(offset, stop)
+        if chunk_watermark and (watermark is None or chunk_watermark > watermark):
+            watermark = chunk_watermark
+    return offset, watermark
+
+
+class ChunkCommitLog:
+    """
+    Chunks of one full-table read that TigerGraph acknowledged, so a sync
+    that failed midway resumes at the first row not committed.
+
+    record() may be called from any thread (upload callbacks); the chunks
+    are written to the store by flush(), which must run on the thread that
+    owns the store, like the other checkpoint writes. Offsets only apply
+    to the same table `version` (content and read plan), so commits of
+    another version are dropped when the log is opened.
+    """
+
+    def __init__(self, store, table: str, version: str):
+        self.store = store
+        self.table = table
+        self.version = version
+
+        committed = store.committed_chunks(table, version)
+        if not committed:
+            store.clear_chunks(table)
+        self.resume_offset, self.resume_watermark = resume_point(committed)
+        self.rows_committed = self.resume_offset
+        self._unsaved: List[Chunk] = []
+        self._lock = threading.Lock()
+
+    def record(self, start: int, stop: int, watermark: Optional[str] = None):
+        with self._lock:
+            self._unsaved.append((start, stop, watermark))
+            self.rows_committed += stop - start
+
+    def flush(self):
+        with self._lock:
+            chunks, self._unsaved = self._unsaved, []
+        if chunks:
+            self.store.commit_chunks(self.table, self.version, chunks)
+
+    def close(self):
+        """The table finished: a later sync starts from the first row again."""
+        with self._lock:
+            self._unsaved = []
+        self.store.clear_chunks(self.table)
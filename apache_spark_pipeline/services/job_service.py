@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .sync_service import run_sync
+
+logger = logging.getLogger(__name__)
+
+# Syncs of the same tables must not interleave (watermarks, snapshot ids),
+# so jobs run one at a time unless a queue is built with more workers.
+DEFAULT_JOB_WORKERS = 1
+
+# Finished jobs kept for status lookups, oldest dropped first
+MAX_FINISHED_JOBS = 100
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+@dataclass
+class SyncJob:
+    job_id: str
+    mode: str
+    params: Dict[str, Any]
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # table -> {"rows", "chunks"} so far
+    progress: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    summary: Optional[Dict] = None
+    error: Optional[str] = None
+    future: Optional[Future] = field(default=None, repr=False, compare=False)
+
+    @property
+    def key(self) -> Tuple:
+        return (self.mode,) + tuple(sorted(self.params.items()))
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def to_dict(self) -> Dict:
+        duration = None
+        if self.started_at is not None:
+            duration = (self.finished_at or time.time()) - self.started_at
+
+        return {
+            "job_id": self.job_id,
+            "mode": self.mode,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": duration,
+            "progress": {table: dict(p) for table, p in self.progress.items()},
+            "tables": self.summary,
+            "error": self.error,
+        }
+
+
+class SyncJobQueue:
+    """
+    Runs run_sync calls on a local worker pool so HTTP views return at once.
+
+    Submitting a job while an identical one (same mode and parameters) is
+    still queued or running returns the existing job instead of starting
+    another sync of the same tables.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS,
+                 runner: Callable[..., Dict] = run_sync):
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be positive, got {max_workers}")
+
+        self.max_workers = max_workers
+        self.runner = runner
+        self.jobs: Dict[str, SyncJob] = {}
+        self._active: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="sync-job"
+            )
+        return self._executor
+
+    def submit(self, mode: str, **params) -> Tuple[SyncJob, bool]:
+        """Returns (job, created); created is False when coalesced into a running job."""
+        params = {k: v for k, v in params.items() if v is not None}
+        job = SyncJob(uuid.uuid4().hex, mode, params)
+
+        with self._lock:
+            existing = self._active.get(job.key)
+            if existing is not None:
+                return self.jobs[existing], False
+
+            self.jobs[job.job_id] = job
+            self._active[job.key] = job.job_id
+            self._expire_finished()
+            job.future = self.executor.submit(self._run, job)
+
+        return job, True
+
+    def get(self, job_id: str) -> Optional[SyncJob]:
+        return self.jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> SyncJob:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Unknown sync job: {job_id}")
+
+        # _run records failures on the job, so result() only raises on timeout
+        job.future.result(timeout)
+        return job
+
+    def _run(self, job: SyncJob):
+        job.status = RUNNING
+        job.started_at = time.time()
+
+        def on_progress(table, stats):
+            job.progress[table] = {"rows": stats["rows"], "chunks": stats["chunks"]}
+            if "resumed_from" in stats:
+                job.progress[table].update(resumed_from=stats["resumed_from"], rows_committed=stats["rows_committed"])
+
+        status = FAILED
+        try:
+            job.summary = self.runner(job.mode, progress=on_progress, **job.params)
+            status = SUCCEEDED
+        except Exception as e:
+            logger.exception("[Sync Job] %s failed", job.job_id)
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.status = status
+            with self._lock:
+                self._active.pop(job.key, None)
+            _close_db_connections()
+
+    def _expire_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:-MAX_FINISHED_JOBS]:
+            del self.jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+def _close_db_connections():
+    # Worker threads open their own Django connections (checkpoints)
+    try:
+        from django.db import connections
+    except ImportError:
+        return
+    connections.close_all()
+
+
+JOB_QUEUE = SyncJobQueue()
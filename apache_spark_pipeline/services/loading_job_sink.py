@@ -0,0 +1,176 @@
+import csv
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..helpers.tigergraph_models import as_edge_batch, as_vertex_batch
+
+# Full-table syncs of at least this many rows go through a loading job
+DEFAULT_BULK_LOAD_THRESHOLD = 100_000
+
+# Files are rotated below pyTigerGraph's 128 MB runLoadingJobWithFile limit
+DEFAULT_MAX_FILE_BYTES = 100 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class LoadingJob:
+    """
+    GSQL loading job for one mapping. CSV files carry a header of `columns`
+    (vertex id, or from/to ids, then the mapped attributes); `values` lists
+    the VALUES expressions in schema attribute order.
+    """
+    name: str
+    kind: str
+    type_name: str
+    columns: Tuple[str, ...]
+    values: Tuple[str, ...]
+    # attribute -> GSQL type, used by the mock to restore types from CSV text
+    attribute_types: Dict[str, str] = field(default_factory=dict, compare=False)
+    from_type: Optional[str] = None
+    to_type: Optional[str] = None
+    file_tag: str = "f"
+    # csv.writer wraps values holding a comma or quote in double quotes, so
+    # the job must strip them: QUOTE="double"
+    quote: str = "double"
+
+    def gsql(self, graph: str) -> str:
+        target = "VERTEX" if self.kind == "vertex" else "EDGE"
+        return (
+            f"CREATE LOADING JOB {self.name} FOR GRAPH {graph} {{\n"
+            f"  DEFINE FILENAME {self.file_tag};\n"
+            f"  LOAD {self.file_tag} TO {target} {self.type_name} VALUES ({', '.join(self.values)})"
+            f' USING SEPARATOR=",", HEADER="true", EOL="\\n", QUOTE="{self.quote}";\n'
+            f"}}"
+        )
+
+
+def build_loading_job(kind: str, mapping, schema) -> LoadingJob:
+    """
+    Builds the job from a mapping and the parsed GSQL schema
+    (mapping_registry.GraphSchema). Schema attributes the mapping does not
+    provide are skipped with "_".
+    """
+    if kind == "vertex":
+        element = schema.vertices[mapping.vertex_type]
+        ids = (mapping.primary_id,)
+        type_name = mapping.vertex_type
+    else:
+        element = schema.edges[mapping.edge_type]
+        ids = (mapping.from_id, mapping.to_id)
+        type_name = mapping.edge_type
+
+    columns = ids + tuple(mapping.attributes)
+    values = tuple(f'$"{c}"' for c in ids) + tuple(
+        f'$"{attr}"' if attr in mapping.attributes else "_"
+        for attr in element.attributes
+    )
+
+    return LoadingJob(
+        name=f"load_{mapping.table}",
+        kind=kind,
+        type_name=type_name,
+        columns=columns,
+        values=values,
+        attribute_types={a: t for a, t in element.attributes.items() if a in mapping.attributes},
+        from_type=getattr(mapping, "from_vertex_type", None),
+        to_type=getattr(mapping, "to_vertex_type", None),
+    )
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class LoadingJobSink:
+    """
+    Sink with the upsert_vertices / upsert_edges interface of the TigerGraph
+    clients that appends each payload to CSV files instead of sending it.
+    Rows are written as they arrive, so only the current chunk is in memory;
+    commit() submits the files through the client's loading job.
+    """
+
+    def __init__(self, client, job: LoadingJob, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+                 directory: Optional[str] = None):
+        self.client = client
+        self.job = job
+        self.max_file_bytes = max_file_bytes
+        self.directory = tempfile.mkdtemp(prefix=f"{job.name}-", dir=directory)
+        self.files: List[str] = []
+        self.rows = 0
+        self._file = None
+        self._writer = None
+
+    def _current_writer(self):
+        # Rotated between payloads, so a file may overshoot by one chunk
+        if self._file is not None and self._file.tell() >= self.max_file_bytes:
+            self._file.close()
+            self._file = None
+
+        if self._file is None:
+            path = os.path.join(self.directory, f"part-{len(self.files):05d}.csv")
+            self._file = open(path, "w", newline="")
+            self._writer = csv.writer(self._file, lineterminator="\n")
+            self._writer.writerow(self.job.columns)
+            self.files.append(path)
+        return self._writer
+
+    def upsert_vertices(self, payload: Dict):
+        attributes = self.job.columns[1:]
+        writer = self._current_writer()
+        count = 0
+        for v_type, vertices in payload.get("vertices", {}).items():
+            batch = as_vertex_batch(v_type, vertices)
+            columns = [batch.columns.get(a) or [None] * len(batch) for a in attributes]
+            writer.writerows(
+                [v_id] + [_csv_value(value) for value in values]
+                for v_id, *values in zip(batch.ids, *columns)
+            )
+            count += len(batch)
+        self.rows += count
+        return {"status": "OK", "count": count}
+
+    def upsert_edges(self, payload: Dict):
+        attributes = self.job.columns[2:]
+        writer = self._current_writer()
+        count = 0
+        for e_type, edges in payload.get("edges", {}).items():
+            batch = as_edge_batch(e_type, edges)
+            columns = [batch.columns.get(a) or [None] * len(batch) for a in attributes]
+            writer.writerows(
+                [from_id, to_id] + [_csv_value(value) for value in values]
+                for from_id, to_id, *values in zip(batch.from_ids, batch.to_ids, *columns)
+            )
+            count += len(batch)
+        self.rows += count
+        return {"status": "OK", "count": count}
+
+    def commit(self) -> Dict:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        loaded = 0
+        if self.rows:
+            self.client.create_loading_job(self.job)
+            for path in self.files:
+                loaded += self.client.run_loading_job(self.job, path).get("count", 0)
+
+        return {"sink": "loading_job", "files": len(self.files), "loaded": loaded}
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,300 @@
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from .mapping_service import CONVERTERS, MappingEngine
+from ..helpers.tigergraph_models import MERGE_POLICIES, EdgeMapping, VertexMapping
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_MAPPINGS_PATH = BASE_DIR / "config" / "table_mappings.yaml"
+DEFAULT_SCHEMA_PATH = BASE_DIR / "schemas" / "tigergraph_schema.gsql"
+
+# Mapping conversion -> GSQL attribute types it can be loaded into
+COMPATIBLE_TYPES = {
+    "string": {"STRING"},
+    "int": {"INT", "UINT"},
+    "double": {"DOUBLE", "FLOAT"},
+    "bool": {"BOOL"},
+    "datetime": {"DATETIME"},
+}
+
+MERGE_KEYS = ("latest_by", "aggregate")
+
+REQUIRED_KEYS = {
+    "vertex": ("table", "source", "vertex_type", "primary_id", "attributes"),
+    "edge": ("table", "source", "edge_type", "from_vertex_type", "to_vertex_type",
+             "from_id", "to_id", "attributes"),
+}
+
+_COMMENT = re.compile(r"//[^\n]*|#[^\n]*")
+_CREATE = re.compile(
+    r"CREATE\s+(VERTEX|(?:DIRECTED\s+|UNDIRECTED\s+)?EDGE)\s+(\w+)\s*\((.*?)\)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+@dataclass
+class SchemaElement:
+    name: str
+    # attribute -> GSQL type, upper-cased
+    attributes: Dict[str, str] = field(default_factory=dict)
+    primary_id: Optional[Tuple[str, str]] = None
+    from_types: List[str] = field(default_factory=list)
+    to_types: List[str] = field(default_factory=list)
+
+
+@dataclass
+class GraphSchema:
+    vertices: Dict[str, SchemaElement]
+    edges: Dict[str, SchemaElement]
+
+
+def parse_gsql_schema(text: str) -> GraphSchema:
+    """Reads the CREATE VERTEX / CREATE EDGE statements of a GSQL schema."""
+    vertices: Dict[str, SchemaElement] = {}
+    edges: Dict[str, SchemaElement] = {}
+
+    for kind, name, body in _CREATE.findall(_COMMENT.sub("", text)):
+        element = SchemaElement(name)
+        for part in (p.split() for p in body.split(",")):
+            if not part:
+                continue
+            keyword = part[0].upper()
+            if keyword == "PRIMARY_ID" and len(part) >= 3:
+                element.primary_id = (part[1], part[2].upper())
+            elif keyword == "FROM" and len(part) >= 2:
+                element.from_types.extend(t.strip() for t in part[1].split("|"))
+            elif keyword == "TO" and len(part) >= 2:
+                element.to_types.extend(t.strip() for t in part[1].split("|"))
+            elif len(part) >= 2:
+                element.attributes[part[0]] = part[1].upper()
+
+        if kind.upper() == "VERTEX":
+            vertices[name] = element
+        else:
+            edges[name] = element
+
+    return GraphSchema(vertices, edges)
+
+
+@dataclass(frozen=True)
+class LoadedMappings:
+    """One validated version of the mapping file, with its compiled engine."""
+    version: str
+    engine: MappingEngine
+    # (catalog table, mapping table) in load order: vertices before edges
+    sync_tables: Tuple[Tuple[str, str], ...]
+    schema: GraphSchema
+
+
+def _check_conversions(entry, element: SchemaElement, schema: GraphSchema, errors: List[str]):
+    table = entry["table"]
+    conversions = entry.get("type_conversions") or {}
+
+    for column, conv in conversions.items():
+        if conv not in CONVERTERS:
+            errors.append(f"{table}: unknown conversion '{conv}' for '{column}'")
+
+    # Columns whose GSQL type is known: attributes, plus the id columns
+    expected = {attr: element.attributes.get(attr) for attr in entry["attributes"]}
+    if entry["type"] == "vertex" and element.primary_id:
+        expected[entry["primary_id"]] = element.primary_id[1]
+    if entry["type"] == "edge":
+        for id_column, vtype in ((entry["from_id"], entry["from_vertex_type"]),
+                                 (entry["to_id"], entry["to_vertex_type"])):
+            vertex = schema.vertices.get(vtype)
+            if vertex and vertex.primary_id:
+                expected[id_column] = vertex.primary_id[1]
+
+    for column, gsql_type in expected.items():
+        conv = conversions.get(column)
+        if conv in COMPATIBLE_TYPES and gsql_type and gsql_type not in COMPATIBLE_TYPES[conv]:
+            errors.append(f"{table}: '{column}' converts to {conv} but the schema type is {gsql_type}")
+
+
+def _check_merge(entry, errors: List[str]):
+    table = entry["table"]
+    merge = entry.get("merge")
+    if merge is None:
+        return
+    if entry["type"] != "edge":
+        errors.append(f"{table}: merge only applies to edge mappings")
+        return
+    if not isinstance(merge, dict):
+        errors.append(f"{table}: merge must be an object")
+        return
+
+    # Edges are stored, deleted and bulk loaded by (from_id, to_id), so
+    # parallel edges kept apart while merging would overwrite each other
+    if "discriminator" in merge:
+        errors.append(f"{table}: merge discriminator is not supported, edges are keyed by (from_id, to_id)")
+    errors.extend(
+        f"{table}: unknown merge key '{key}'" for key in merge if key not in MERGE_KEYS and key != "discriminator"
+    )
+    attr = merge.get("latest_by")
+    if attr is not None and attr not in entry["attributes"]:
+        errors.append(f"{table}: merge latest_by '{attr}' is not a mapped attribute")
+
+    aggregate = merge.get("aggregate") or {}
+    if not isinstance(aggregate, dict):
+        errors.append(f"{table}: merge aggregate must map attributes to policies")
+        return
+    for attr, policy in aggregate.items():
+        if policy not in MERGE_POLICIES:
+            errors.append(f"{table}: unknown merge policy '{policy}' for '{attr}'")
+        elif attr not in entry["attributes"]:
+            errors.append(f"{table}: merge aggregate '{attr}' is not a mapped attribute")
+
+
+def validate_entry(entry, schema: GraphSchema) -> List[str]:
+    if not isinstance(entry, dict):
+        return [f"Mapping entries must be objects, got {entry!r}"]
+
+    kind = entry.get("type")
+    table = entry.get("table", "<unnamed>")
+    if kind not in REQUIRED_KEYS:
+        return [f"{table}: type must be 'vertex' or 'edge', got {kind!r}"]
+
+    errors = [f"{table}: missing '{key}'" for key in REQUIRED_KEYS[kind] if entry.get(key) in (None, "")]
+    if not errors and not isinstance(entry["attributes"], list):
+        errors.append(f"{table}: attributes must be a list")
+    if errors:
+        return errors
+
+    if kind == "vertex":
+        element = schema.vertices.get(entry["vertex_type"])
+        if element is None:
+            return [f"{table}: vertex type '{entry['vertex_type']}' is not in the schema"]
+    else:
+        element = schema.edges.get(entry["edge_type"])
+        if element is None:
+            return [f"{table}: edge type '{entry['edge_type']}' is not in the schema"]
+        if entry["from_vertex_type"] not in element.from_types:
+            errors.append(f"{table}: {entry['edge_type']} does not start at '{entry['from_vertex_type']}'")
+        if entry["to_vertex_type"] not in element.to_types:
+            errors.append(f"{table}: {entry['edge_type']} does not end at '{entry['to_vertex_type']}'")
+
+    for attr in entry["attributes"]:
+        if attr not in element.attributes:
+            errors.append(f"{table}: attribute '{attr}' is not defined on {element.name}")
+
+    _check_conversions(entry, element, schema, errors)
+    _check_merge(entry, errors)
+    return errors
+
+
+def load_mappings(mappings_path, schema_path) -> LoadedMappings:
+    """
+    Parses and validates the mapping file against the GSQL schema and
+    compiles every mapping. All problems are reported in one ValueError.
+    """
+    with open(schema_path) as f:
+        schema = parse_gsql_schema(f.read())
+    with open(mappings_path) as f:
+        config = yaml.safe_load(f) or {}
+
+    entries = config.get("mappings") if isinstance(config, dict) else None
+    if not isinstance(entries, list):
+        raise ValueError(f"{mappings_path}: expected a 'mappings' list")
+
+    errors: List[str] = []
+    for entry in entries:
+        errors.extend(validate_entry(entry, schema))
+
+    for key in ("table", "source"):
+        names = [e.get(key) for e in entries if isinstance(e, dict)]
+        errors.extend(f"duplicate {key} '{n}'" for n in sorted({n for n in names if names.count(n) > 1}))
+
+    if errors:
+        raise ValueError(f"Invalid mappings in {mappings_path}: " + "; ".join(errors))
+
+    engine = MappingEngine()
+    sync_tables = []
+    # Vertices first so edges never arrive ahead of their endpoints
+    for entry in sorted(entries, key=lambda e: e["type"] != "vertex"):
+        common = dict(
+            table=entry["table"],
+            attributes=list(entry["attributes"]),
+            type_conversions=dict(entry.get("type_conversions") or {}),
+        )
+        if entry["type"] == "vertex":
+            engine.add_vertex_mapping(VertexMapping(
+                vertex_type=entry["vertex_type"], primary_id=entry["primary_id"], **common
+            ))
+        else:
+            merge = entry.get("merge") or {}
+            engine.add_edge_mapping(EdgeMapping(
+                edge_type=entry["edge_type"],
+                from_vertex_type=entry["from_vertex_type"],
+                to_vertex_type=entry["to_vertex_type"],
+                from_id=entry["from_id"],
+                to_id=entry["to_id"],
+                latest_by=merge.get("latest_by"),
+                aggregations=dict(merge.get("aggregate") or {}),
+                **common
+            ))
+        sync_tables.append((entry["source"], entry["table"]))
+
+    return LoadedMappings(str(config.get("version", "")), engine, tuple(sync_tables), schema)
+
+
+class MappingRegistry:
+    """
+    Process-wide cache of the compiled mappings. current() reloads when the
+    mapping or schema file changed on disk; a reload that fails validation
+    keeps serving the previous mappings.
+    """
+
+    def __init__(self, mappings_path=DEFAULT_MAPPINGS_PATH, schema_path=DEFAULT_SCHEMA_PATH):
+        self.mappings_path = Path(mappings_path)
+        self.schema_path = Path(schema_path)
+        self._loaded: Optional[LoadedMappings] = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        return tuple(
+            (st.st_mtime_ns, st.st_size)
+            for st in (os.stat(self.mappings_path), os.stat(self.schema_path))
+        )
+
+    def current(self) -> LoadedMappings:
+        stamp = self._file_stamp()
+        if self._loaded is not None and stamp == self._stamp:
+            return self._loaded
+
+        with self._lock:
+            if self._loaded is not None and stamp == self._stamp:
+                return self._loaded
+
+            try:
+                loaded = load_mappings(self.mappings_path, self.schema_path)
+            except (OSError, ValueError, yaml.YAMLError):
+                if self._loaded is None:
+                    raise
+                logger.exception("[Mappings] reload of %s failed; keeping previous mappings", self.mappings_path)
+                # Don't retry the same broken file on every call
+                self._stamp = stamp
+                return self._loaded
+
+            if self._loaded is not None:
+                logger.info("[Mappings] reloaded %s", self.mappings_path)
+            self._loaded, self._stamp = loaded, stamp
+            return loaded
+
+    def engine(self) -> MappingEngine:
+        return self.current().engine
+
+    def sync_tables(self) -> Tuple[Tuple[str, str], ...]:
+        return self.current().sync_tables
+
+
+MAPPING_REGISTRY = MappingRegistry()
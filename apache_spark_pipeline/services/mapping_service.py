@@ -1,143 +1,356 @@
+import logging
+from collections import Counter
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
-from ..helpers.tigergraph_models import VertexMapping, EdgeMapping
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+from ..helpers.tigergraph_models import EdgeBatch, EdgeMapping, VertexBatch, VertexMapping
+from ..helpers.time_utils import parse_timestamp, parse_timestamps
+
+logger = logging.getLogger(__name__)
+
+
+def _default_converter(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# TigerGraph type -> converter, resolved once per field when a mapping is compiled
+CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "string": str,
+    "int": int,
+    "double": float,
+    "bool": bool,
+    "datetime": parse_timestamp,
+}
+
+# Converters with a whole-column counterpart taking (values, errors); the
+# row path defers these fields and converts them a column at a time too
+_COLUMN_CONVERTERS: Dict[Callable[[Any], Any], Callable[[List, Dict[int, Exception]], List]] = {
+    parse_timestamp: parse_timestamps,
+}
+
+
+@dataclass(frozen=True)
+class CompiledMapping:
+    """
+    Converter plan built once per registered mapping.
+
+    id_fields holds (field, converter) for the primary id of a vertex or the
+    (from_id, to_id) pair of an edge; attributes holds (attr, converter) in
+    mapping order.
+    """
+    kind: str
+    mapping: Any
+    id_fields: Tuple[Tuple[str, Callable[[Any], Any]], ...]
+    attributes: Tuple[Tuple[str, Callable[[Any], Any]], ...]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Record fields the mapping reads: id fields first, then attributes."""
+        names = [name for name, _ in self.id_fields] + [attr for attr, _ in self.attributes]
+        return tuple(dict.fromkeys(names))
+
+
+def compile_mapping(kind: str, mapping: Any) -> CompiledMapping:
+    conversions = mapping.type_conversions or {}
+
+    def resolve(field: str):
+        return CONVERTERS.get(conversions.get(field), _default_converter)
+
+    if kind == "vertex":
+        id_names = (mapping.primary_id,)
+    else:
+        id_names = (mapping.from_id, mapping.to_id)
+
+    return CompiledMapping(
+        kind=kind,
+        mapping=mapping,
+        id_fields=tuple((name, resolve(name)) for name in id_names),
+        attributes=tuple((attr, resolve(attr)) for attr in mapping.attributes),
+    )
+
+
+def _as_list(column: Any) -> List:
+    # NumPy arrays and Arrow arrays both know how to hand back Python objects
+    # in one call, which is far cheaper than iterating their scalars.
+    if isinstance(column, list):
+        return column
+    if hasattr(column, "to_pylist"):
+        return column.to_pylist()
+    if hasattr(column, "tolist"):
+        return column.tolist()
+    return list(column)
+
+
+# (converter, column value type) pairs where converting is a no-op for the
+# whole column, or reduces to one C-level method applied across it
+_IDENTITY_COLUMNS = {
+    (str, str), (int, int), (float, float), (bool, bool),
+    (_default_converter, str), (_default_converter, int), (_default_converter, float),
+}
+_COLUMN_METHODS = {
+    (_default_converter, datetime): datetime.isoformat,
+}
+
+
+def _convert_column(values: List, converter: Callable[[Any], Any], errors: Dict[int, Exception]):
+    if converter in _COLUMN_CONVERTERS:
+        return _COLUMN_CONVERTERS[converter](values, errors)
+
+    value_types = set(map(type, values))
+    if len(value_types) == 1:
+        key = (converter, value_types.pop())
+        if key in _IDENTITY_COLUMNS:
+            return values
+        if key in _COLUMN_METHODS:
+            return list(map(_COLUMN_METHODS[key], values))
+
+    try:
+        if None not in values:
+            return list(map(converter, values))
+        return [None if v is None else converter(v) for v in values]
+    except Exception:
+        pass
+
+    # Slow path: find the offending rows so only they get dropped
+    converted = []
+    for i, v in enumerate(values):
+        if v is None:
+            converted.append(None)
+            continue
+        try:
+            converted.append(converter(v))
+        except Exception as e:
+            errors.setdefault(i, e)
+            converted.append(None)
+    return converted
+
+
+def _valid_rows(ids: List[List], errors: Dict[int, Exception]) -> Optional[List[int]]:
+    # Rows to keep: no conversion error and every id set. None means all rows.
+    if not errors and not any(None in column for column in ids):
+        return None
+    return [
+        i for i, row_ids in enumerate(zip(*ids))
+        if i not in errors and None not in row_ids
+    ]
+
+
+def _row_plan(attributes: Tuple[Tuple[str, Callable[[Any], Any]], ...]):
+    # Converters with a column counterpart are skipped (None) per row and run
+    # on the whole column once the chunk is collected
+    return [(attr, None if conv in _COLUMN_CONVERTERS else conv) for attr, conv in attributes]
+
+
+def _transpose(rows: List[List], width: int) -> List[List]:
+    if not rows:
+        return [[] for _ in range(width)]
+    return [list(column) for column in zip(*rows)]
+
+
+def _str_column(values: List) -> List:
+    # Ids are sent as strings; None is kept so the row can be dropped later
+    if all(type(v) is str for v in values):
+        return values
+    return [None if v is None else str(v) for v in values]
+
 
 class MappingEngine:
     def __init__(self):
         # table_name -> ('vertex' | 'edge', mapping)
         self.mappings: Dict[str, Tuple[str, Any]] = {}
+        # table_name -> compiled converter plan
+        self.plans: Dict[str, CompiledMapping] = {}
+        # table_name -> rows dropped because a field failed to convert
+        self.dropped_rows: Counter = Counter()
+        # table_name -> edge rows folded into another row of their chunk
+        self.merged_rows: Counter = Counter()
 
     def add_vertex_mapping(self, mapping: VertexMapping):
         self.mappings[mapping.table] = ("vertex", mapping)
+        self.plans[mapping.table] = compile_mapping("vertex", mapping)
 
     def add_edge_mapping(self, mapping: EdgeMapping):
         self.mappings[mapping.table] = ("edge", mapping)
+        self.plans[mapping.table] = compile_mapping("edge", mapping)
 
-    def transform_records(self, table_name: str, records: List[Dict]):
-        if table_name not in self.mappings:
+    def _plan(self, table_name: str) -> CompiledMapping:
+        if table_name not in self.plans:
             raise ValueError(f"No mapping registered for table '{table_name}'")
+        return self.plans[table_name]
 
-        mapping_type, mapping = self.mappings[table_name]
+    def transform_records(self, table_name: str, records: List[Dict]):
+        plan = self._plan(table_name)
 
-        if mapping_type == "vertex":
-            return self._transform_vertices(mapping, records)
+        if plan.kind == "vertex":
+            return self._transform_vertices(plan, records)
 
-        if mapping_type == "edge":
-            return self._transform_edges(mapping, records)
+        if plan.kind == "edge":
+            return self._transform_edges(plan, records)
 
         raise ValueError("Invalid mapping type")
 
-    def _transform_vertices(self, mapping: VertexMapping, records: List[Dict]):
-        vertices: Dict[str, Dict] = {}
-
-        for rec in records:
-            try:
-                v_id = self._convert(
-                    rec.get(mapping.primary_id),
-                    mapping.type_conversions,
-                    mapping.primary_id
-                )
+    def transform_columns(self, table_name: str, columns: Mapping[str, Sequence]):
+        """
+        Column-at-a-time variant of transform_records.
+
+        `columns` maps field name -> column values (list, NumPy array or Arrow
+        array). Every field is converted in a single pass over its column and
+        the payload is assembled afterwards; the output is identical to
+        transform_records on the equivalent rows.
+        """
+        plan = self._plan(table_name)
+
+        lists = {name: _as_list(col) for name, col in columns.items()}
+        num_rows = len(next(iter(lists.values()))) if lists else 0
+        empty = [None] * num_rows
+
+        errors: Dict[int, Exception] = {}
+        ids = [
+            _convert_column(lists.get(name, empty), conv, errors)
+            for name, conv in plan.id_fields
+        ]
+        attrs = [
+            (attr, _convert_column(lists.get(attr, empty), conv, errors))
+            for attr, conv in plan.attributes
+        ]
+
+        label = "Vertex" if plan.kind == "vertex" else "Edge"
+        for e in errors.values():
+            logger.warning("[%s Error] %s", label, e)
+        self.dropped_rows[table_name] += len(errors)
+
+        if plan.kind == "vertex":
+            return self._assemble_vertices(plan.mapping, ids, dict(attrs), _valid_rows(ids, errors))
+
+        if plan.kind == "edge":
+            return self._assemble_edges(plan.mapping, ids, dict(attrs), _valid_rows(ids, errors))
 
-                if v_id is None:
-                    continue
-
-                attrs = {
-                    attr: self._convert(
-                        rec.get(attr),
-                        mapping.type_conversions,
-                        attr
-                    )
-                    for attr in mapping.attributes
-                    if rec.get(attr) is not None
-                }
-
-                vertices[str(v_id)] = attrs
+        raise ValueError("Invalid mapping type")
 
-            except Exception as e:
-                print(f"[Vertex Error] {e}")
+    def combine_payloads(self, table_name: str, payloads: List[Dict]):
+        """
+        Joins the payloads of consecutive slices of one chunk into the
+        payload the whole chunk would have produced: slices are concatenated
+        in order, then repeated vertices/edges are resolved again across
+        slice boundaries.
+        """
+        plan = self._plan(table_name)
+        mapping = plan.mapping
 
-        return {
-            "vertices": {
-                mapping.vertex_type: vertices
-            }
-        }
+        if plan.kind == "vertex":
+            batch = VertexBatch.concat([p["vertices"][mapping.vertex_type] for p in payloads])
+            return {"vertices": {mapping.vertex_type: batch.deduplicated()}}
 
+        batch = EdgeBatch.concat([p["edges"][mapping.edge_type] for p in payloads])
+        return {"edges": {mapping.edge_type: self._merge_edges(mapping, batch)}}
 
-    def _transform_edges(self, mapping: EdgeMapping, records: List[Dict]):
-        edges: List[Dict] = []
+    def _transform_vertices(self, plan: CompiledMapping, records: List[Dict]):
+        id_field, id_conv = plan.id_fields[0]
+        attr_plan = _row_plan(plan.attributes)
+        rows = []
 
         for rec in records:
             try:
-                from_id = self._convert(
-                    rec.get(mapping.from_id),
-                    mapping.type_conversions,
-                    mapping.from_id
-                )
-
-                to_id = self._convert(
-                    rec.get(mapping.to_id),
-                    mapping.type_conversions,
-                    mapping.to_id
-                )
-
-                if from_id is None or to_id is None:
+                raw_id = rec.get(id_field)
+                if raw_id is None:
                     continue
 
-                attrs = {
-                    attr: self._convert(
-                        rec.get(attr),
-                        mapping.type_conversions,
-                        attr
-                    )
-                    for attr in mapping.attributes
-                    if rec.get(attr) is not None
-                }
-
-                edges.append({
-                    "from_type": mapping.from_vertex_type,
-                    "from_id": str(from_id),
-                    "to_type": mapping.to_vertex_type,
-                    "to_id": str(to_id),
-                    "attributes": attrs
-                })
+                row = [str(id_conv(raw_id))]
+                for attr, conv in attr_plan:
+                    value = rec.get(attr)
+                    row.append(value if value is None or conv is None else conv(value))
+                rows.append(row)
 
             except Exception as e:
-                print(f"[Edge Error] {e}")
+                logger.warning("[Vertex Error] %s", e)
+                self.dropped_rows[plan.mapping.table] += 1
+
+        ids, *columns = _transpose(rows, 1 + len(attr_plan))
+        attributes, keep = self._convert_deferred(plan, columns, "Vertex")
+        batch = VertexBatch(plan.mapping.vertex_type, ids, attributes)
+        if keep is not None:
+            batch = batch.take(keep)
+        return {"vertices": {batch.vertex_type: batch.deduplicated()}}
+
+    def _transform_edges(self, plan: CompiledMapping, records: List[Dict]):
+        mapping = plan.mapping
+        (from_field, from_conv), (to_field, to_conv) = plan.id_fields
+        attr_plan = _row_plan(plan.attributes)
+        rows = []
 
-        return {
-            "edges": {
-                mapping.edge_type: edges
-            }
-        }
-
-    def _convert(self, value: Any, conversions: Optional[Dict], field: str):
-        if value is None:
-            return None
-
-        conv_type = conversions.get(field) if conversions else None
-
-        if conv_type == "string":
-            return str(value)
-
-        if conv_type == "int":
-            return int(value)
-
-        if conv_type == "double":
-            return float(value)
-
-        if conv_type == "bool":
-            return bool(value)
-
-        if conv_type == "datetime":
-            if isinstance(value, datetime):
-                return value.isoformat()
-            return str(value)
+        for rec in records:
+            try:
+                raw_from = rec.get(from_field)
+                raw_to = rec.get(to_field)
+                if raw_from is None or raw_to is None:
+                    continue
 
-        # Default behavior
-        if isinstance(value, datetime):
-            return value.isoformat()
+                row = [str(from_conv(raw_from)), str(to_conv(raw_to))]
+                for attr, conv in attr_plan:
+                    value = rec.get(attr)
+                    row.append(value if value is None or conv is None else conv(value))
+                rows.append(row)
 
-        return value
+            except Exception as e:
+                logger.warning("[Edge Error] %s", e)
+                self.dropped_rows[mapping.table] += 1
+
+        from_ids, to_ids, *columns = _transpose(rows, 2 + len(attr_plan))
+        attributes, keep = self._convert_deferred(plan, columns, "Edge")
+        batch = EdgeBatch(
+            mapping.edge_type, mapping.from_vertex_type, mapping.to_vertex_type,
+            from_ids, to_ids, attributes,
+        )
+        if keep is not None:
+            batch = batch.take(keep)
+        return {"edges": {mapping.edge_type: self._merge_edges(mapping, batch)}}
+
+    def _convert_deferred(self, plan: CompiledMapping, columns: List[List], label: str):
+        """
+        Converts the attribute columns the row path left raw (see _row_plan).
+        Returns (attr -> column, rows to keep or None when all are kept).
+        """
+        errors: Dict[int, Exception] = {}
+        attributes = {}
+        for (attr, conv), column in zip(plan.attributes, columns):
+            if conv in _COLUMN_CONVERTERS:
+                column = _COLUMN_CONVERTERS[conv](column, errors)
+            attributes[attr] = column
+
+        if not errors:
+            return attributes, None
+
+        for e in errors.values():
+            logger.warning("[%s Error] %s", label, e)
+        self.dropped_rows[plan.mapping.table] += len(errors)
+        num_rows = len(columns[0])
+        return attributes, [i for i in range(num_rows) if i not in errors]
+
+    def _assemble_vertices(self, mapping: VertexMapping, ids: List[List], columns: Dict[str, List],
+                           keep: Optional[List[int]]):
+        batch = VertexBatch(mapping.vertex_type, _str_column(ids[0]), columns)
+        if keep is not None:
+            batch = batch.take(keep)
+        return {"vertices": {mapping.vertex_type: batch.deduplicated()}}
+
+    def _assemble_edges(self, mapping: EdgeMapping, ids: List[List], columns: Dict[str, List],
+                        keep: Optional[List[int]]):
+        batch = EdgeBatch(
+            mapping.edge_type, mapping.from_vertex_type, mapping.to_vertex_type,
+            _str_column(ids[0]), _str_column(ids[1]), columns,
+        )
+        if keep is not None:
+            batch = batch.take(keep)
+        return {"edges": {mapping.edge_type: self._merge_edges(mapping, batch)}}
+
+    def _merge_edges(self, mapping: EdgeMapping, batch: EdgeBatch) -> EdgeBatch:
+        # Repeated edges in a chunk would cost a request row each and only
+        # the last would stick; they are merged per the mapping's policy
+        merged = batch.merged(latest_by=mapping.latest_by, aggregations=mapping.aggregations)
+        self.merged_rows[mapping.table] += len(batch) - len(merged)
+        return merged
 
     # def get_summary(self) -> str:
     #     lines = []
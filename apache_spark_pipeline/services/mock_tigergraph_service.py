@@ -1,11 +1,67 @@
-from typing import Dict, List
+import csv
+import threading
+import time
+from bisect import bisect_right
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+from ..helpers.tigergraph_models import EdgeBatch, VertexBatch, as_edge_batch, as_vertex_batch
+
+# (from_type, from_id, to_type, to_id) identifies one edge of a given type
+EdgeKey = Tuple[str, str, str, str]
+# (vertex_type, vertex_id)
+VertexRef = Tuple[str, str]
+
+# GSQL attribute type -> cast applied to loading-job CSV text
+_GSQL_CASTS = {
+    "INT": int,
+    "UINT": int,
+    "DOUBLE": float,
+    "FLOAT": float,
+    "BOOL": lambda v: v.lower() == "true",
+}
+
+def _edge_order(key: EdgeKey) -> Tuple[str, str]:
+    # Cursor order of scan_edges: (from_id, to_id)
+    return key[1], key[3]
 
 class TigerGraphService:
-    def __init__(self):
+    def __init__(self, latency: float = 0.0, latency_per_item: float = 0.0,
+                 max_request_items: Optional[int] = None):
+        # VertexType -> {v_id: vertex}
         self.vertices: Dict[str, Dict[str, Dict]] = {}
 
-        # EdgeType -> List[edge]
-        self.edges: Dict[str, List[Dict]] = {}
+        # EdgeType -> {EdgeKey: edge}
+        self.edges: Dict[str, Dict[EdgeKey, Dict]] = {}
+
+        # EdgeType -> {VertexRef: {EdgeKey: None}}, insertion ordered
+        self.out_index: Dict[str, Dict[VertexRef, Dict[EdgeKey, None]]] = {}
+        self.in_index: Dict[str, Dict[VertexRef, Dict[EdgeKey, None]]] = {}
+
+        # Seconds each upsert call sleeps, to stand in for REST++ round trips,
+        # plus latency_per_item per vertex/edge sent. Requests of more than
+        # max_request_items items fail, like a body over the server's limit.
+        self.latency = latency
+        self.latency_per_item = latency_per_item
+        self.max_request_items = max_request_items
+        self._lock = threading.Lock()
+
+        # Loading job name -> LoadingJob
+        self.loading_jobs: Dict[str, object] = {}
+
+    def _simulate_round_trip(self, items: int = 0):
+        if self.max_request_items is not None and items > self.max_request_items:
+            raise ValueError(f"Request of {items} items exceeds the limit of {self.max_request_items}")
+        delay = self.latency + self.latency_per_item * items
+        if delay:
+            time.sleep(delay)
+
+    def clear(self):
+        with self._lock:
+            self.vertices.clear()
+            self.edges.clear()
+            self.out_index.clear()
+            self.in_index.clear()
 
     def upsert_vertices(self, payload: Dict):
         """
@@ -18,19 +74,30 @@ class TigerGraphService:
             }
           }
         }
+
+        Existing vertices keep their id and have the given attributes merged
+        in, like a REST++ upsert. A VertexBatch may stand in for the
+        {id: attributes} dict.
         """
-        print("Payload", payload)
         vertices_payload = payload.get("vertices", {})
+        self._simulate_round_trip(sum(len(v) for v in vertices_payload.values()))
 
-        for v_type, vertices in vertices_payload.items():
-            self.vertices.setdefault(v_type, [])
+        with self._lock:
+            for v_type, vertices in vertices_payload.items():
+                store = self.vertices.setdefault(v_type, {})
 
-            for v_id, attributes in vertices.items():
-                self.vertices[v_type].append({
-                    'v_type': v_type,
-                    'v_id': v_id,
-                    'attributes': attributes or {}
-                })
+                # Attribute dicts are built fresh per row, so they are stored as is
+                for v_id, attributes in as_vertex_batch(v_type, vertices).items():
+                    existing = store.get(v_id)
+                    if existing is not None:
+                        existing["attributes"].update(attributes)
+                        continue
+
+                    store[v_id] = {
+                        'v_type': v_type,
+                        'v_id': v_id,
+                        'attributes': attributes
+                    }
 
         return {
             "status": "OK",
@@ -54,32 +121,203 @@ class TigerGraphService:
             ]
           }
         }
+
+        An edge is identified by its type and endpoints; re-sending it
+        updates its attributes instead of adding a parallel edge. An
+        EdgeBatch may stand in for the list of edge dicts.
         """
         edges_payload = payload.get("edges", {})
+        self._simulate_round_trip(sum(len(e) for e in edges_payload.values()))
 
-        for etype, edges in edges_payload.items():
-            self.edges.setdefault(etype, [])
+        with self._lock:
+            for etype, edges in edges_payload.items():
+                store = self.edges.setdefault(etype, {})
+                out_index = self.out_index.setdefault(etype, {})
+                in_index = self.in_index.setdefault(etype, {})
 
-            for e in edges:
-                self.edges[etype].append({
-                    "e_type": etype,
-                    "directed": False,
-                    "from_type": e["from_type"],
-                    "from_id": e["from_id"],
-                    "to_type": e["to_type"],
-                    "to_id": e["to_id"],
-                    "attributes": e.get("attributes", {}),
-                })
+                batch = as_edge_batch(etype, edges)
+                from_type, to_type = batch.from_type, batch.to_type
+                for from_id, to_id, attributes in batch.triples():
+                    key = (from_type, from_id, to_type, to_id)
+                    existing = store.get(key)
+                    if existing is not None:
+                        existing["attributes"].update(attributes)
+                        continue
+
+                    store[key] = {
+                        "e_type": etype,
+                        "directed": False,
+                        "from_type": from_type,
+                        "from_id": from_id,
+                        "to_type": to_type,
+                        "to_id": to_id,
+                        "attributes": attributes,
+                    }
+                    out_index.setdefault(key[:2], {})[key] = None
+                    in_index.setdefault(key[2:], {})[key] = None
 
         return {
             "status": "OK",
             "edge_types": list(edges_payload.keys()),
             "count": sum(len(e) for e in edges_payload.values()),
         }
-    
+
+    def create_loading_job(self, job):
+        self.loading_jobs[job.name] = job
+
+    def run_loading_job(self, job, path: str):
+        """
+        Stand-in for runLoadingJobWithFile: parses the CSV written by
+        LoadingJobSink and upserts it like the REST++ path would. Attribute
+        text is cast back using the schema types; empty fields are skipped.
+        Quotes are only stripped when the job declares QUOTE="double", as in
+        TigerGraph.
+        """
+        if job.name not in self.loading_jobs:
+            raise ValueError(f"Loading job not found: {job.name}")
+
+        id_count = 1 if job.kind == "vertex" else 2
+
+        with open(path, newline="") as f:
+            reader = csv.reader(f, quoting=csv.QUOTE_MINIMAL if job.quote == "double" else csv.QUOTE_NONE)
+            header = next(reader)
+            rows = list(reader)
+
+        ids = [[row[i] for row in rows] for i in range(id_count)]
+        columns = {}
+        for offset, name in enumerate(header[id_count:], id_count):
+            cast = _GSQL_CASTS.get(job.attribute_types.get(name), str)
+            columns[name] = [cast(row[offset]) if row[offset] != "" else None for row in rows]
+
+        if job.kind == "vertex":
+            batch = VertexBatch(job.type_name, ids[0], columns).deduplicated()
+            result = self.upsert_vertices({"vertices": {job.type_name: batch}})
+        else:
+            batch = EdgeBatch(job.type_name, job.from_type, job.to_type, ids[0], ids[1], columns)
+            result = self.upsert_edges({"edges": {job.type_name: batch}})
+        return {"status": "OK", "job": job.name, "count": result["count"]}
+
+    def delete_vertices(self, vtype: str, v_ids: List[str]):
+        """Deletes vertices and, like TigerGraph, every edge attached to them."""
+        self._simulate_round_trip(len(v_ids))
+        deleted = 0
+
+        with self._lock:
+            store = self.vertices.get(vtype, {})
+            for v_id in v_ids:
+                if store.pop(v_id, None) is None:
+                    continue
+                deleted += 1
+
+                ref = (vtype, v_id)
+                for etype in list(self.edges):
+                    attached = list(self.out_index.get(etype, {}).get(ref, {}))
+                    attached += list(self.in_index.get(etype, {}).get(ref, {}))
+                    for key in attached:
+                        self._drop_edge(etype, key)
+
+        return {"status": "OK", "vertex_type": vtype, "count": deleted}
+
+    def delete_edges(self, etype: str, edges: List[Dict]):
+        """edges: dicts with from_type, from_id, to_type and to_id."""
+        self._simulate_round_trip(len(edges))
+        deleted = 0
+
+        with self._lock:
+            for e in edges:
+                key = (e["from_type"], e["from_id"], e["to_type"], e["to_id"])
+                deleted += self._drop_edge(etype, key)
+
+        return {"status": "OK", "edge_type": etype, "count": deleted}
+
+    def _drop_edge(self, etype: str, key: EdgeKey) -> int:
+        if self.edges.get(etype, {}).pop(key, None) is None:
+            return 0
+
+        self.out_index.get(etype, {}).get(key[:2], {}).pop(key, None)
+        self.in_index.get(etype, {}).get(key[2:], {}).pop(key, None)
+        return 1
+
     def fetch_vertices(self, vtype: str):
-        print("Vertices", self.vertices)
-        return self.vertices.get(vtype, {})
+        return list(self.vertices.get(vtype, {}).values())
+
+    def get_vertex(self, vtype: str, v_id: str) -> Optional[Dict]:
+        return self.vertices.get(vtype, {}).get(v_id)
+
+    def vertex_count(self, vtype: str) -> int:
+        return len(self.vertices.get(vtype, {}))
+
+    def edge_count(self, etype: str) -> int:
+        return len(self.edges.get(etype, {}))
+
+    def iter_edges(self, etype: str, offset: int = 0, limit: Optional[int] = None):
+        # Same contract as the real service: one bulk export per edge type
+        self._simulate_round_trip()
+        stop = offset + limit if limit is not None else None
+        with self._lock:
+            page = list(islice(self.edges.get(etype, {}).values(), offset, stop))
+        yield from page
+
+    def fetch_edges(self, etype: str, offset: int = 0, limit: Optional[int] = None):
+        return list(self.iter_edges(etype, offset, limit))
+
+    def scan_vertices(self, vtype: str, after: Optional[str] = None, limit: Optional[int] = None):
+        """
+        Vertices of one type in ascending id order, starting after the id
+        `after`. Only the sorted ids are copied; vertices are yielded as the
+        caller consumes them, and ones deleted meanwhile are skipped.
+        """
+        self._simulate_round_trip()
+        with self._lock:
+            store = self.vertices.get(vtype, {})
+            ids = sorted(store)
+
+        start = bisect_right(ids, after) if after is not None else 0
+        stop = start + limit if limit is not None else None
+        for v_id in islice(ids, start, stop):
+            vertex = store.get(v_id)
+            if vertex is not None:
+                yield vertex
+
+    def scan_edges(self, etype: str, after: Optional[Tuple[str, str]] = None,
+                   limit: Optional[int] = None):
+        """
+        Edges of one type in ascending (from_id, to_id) order, starting after
+        the edge `after` = (from_id, to_id). Same streaming as scan_vertices.
+        """
+        self._simulate_round_trip()
+        with self._lock:
+            store = self.edges.get(etype, {})
+            keys = sorted(store, key=_edge_order)
+
+        start = bisect_right(keys, tuple(after), key=_edge_order) if after is not None else 0
+        stop = start + limit if limit is not None else None
+        for key in islice(keys, start, stop):
+            edge = store.get(key)
+            if edge is not None:
+                yield edge
+
+    def get_edges(self, vtype: str, v_id: str, etype: str, direction: str = "out"):
+        """
+        Edges of one type touching a vertex, the analogue of conn.getEdges.
+        direction is "out" (vertex is the source) or "in" (vertex is the target).
+        """
+        self._simulate_round_trip()
+        if direction == "out":
+            index = self.out_index
+        elif direction == "in":
+            index = self.in_index
+        else:
+            raise ValueError(f"Invalid edge direction '{direction}'")
+
+        store = self.edges.get(etype, {})
+        keys = index.get(etype, {}).get((vtype, v_id), {})
+        # Skip keys whose edge was dropped by a direct clear of self.edges
+        return [store[key] for key in list(keys) if key in store]
 
-    def fetch_edges(self, etype: str):
-        return self.edges.get(etype, [])
+    def get_neighbors(self, vtype: str, v_id: str, etype: str, direction: str = "out") -> List[VertexRef]:
+        end = ("to_type", "to_id") if direction == "out" else ("from_type", "from_id")
+        return [
+            (edge[end[0]], edge[end[1]])
+            for edge in self.get_edges(vtype, v_id, etype, direction)
+        ]
@@ -0,0 +1,263 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, Mapping, Optional
+from urllib.parse import urlencode
+
+from .metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# In-process LRU limits; the oldest entries go first when either is exceeded
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# A streamed body is kept only if it ends up smaller than this; larger ones
+# are passed through without being buffered
+DEFAULT_MAX_STREAMED_BYTES = 4 * 1024 * 1024
+
+# Redis entries outlive a generation bump only until they expire
+DEFAULT_REDIS_TTL = 24 * 60 * 60
+DEFAULT_REDIS_PREFIX = "graph-cache:"
+
+
+class MemoryBackend:
+    """
+    LRU of response bodies plus per-type generation counters, private to
+    this process. Sync jobs run in the web process (JOB_QUEUE), so their
+    invalidations reach it directly. Counters restart with the process, so
+    versions carry a per-instance token to keep old ETags from matching.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size = 0
+        self.generations: Dict[str, int] = {}
+        self.token = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def set(self, key: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = body
+            self.size += len(body)
+
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def version(self, types: Iterable[str]) -> Optional[str]:
+        with self._lock:
+            return self.token + ":" + ",".join(f"{t}={self.generations.get(t, 0)}" for t in types)
+
+    def bump(self, types: Iterable[str]):
+        with self._lock:
+            for t in types:
+                self.generations[t] = self.generations.get(t, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+            self.generations.clear()
+            self.token = uuid.uuid4().hex[:8]
+
+
+class RedisBackend:
+    """
+    Bodies and generation counters in Redis, shared by every web worker;
+    counters persist, clear() only drops bodies. A Redis error is logged and
+    treated as a miss (or, for versions, as "don't cache"), so the endpoints
+    keep answering from TigerGraph.
+    """
+
+    def __init__(self, client, prefix: str = DEFAULT_REDIS_PREFIX, ttl: int = DEFAULT_REDIS_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _call(self, name: str, fn: Callable, default=None):
+        from redis import RedisError
+
+        try:
+            return fn()
+        except RedisError as e:
+            logger.warning("[Response Cache] Redis %s failed: %s", name, e)
+            return default
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._call("get", lambda: self.client.get(self.prefix + key))
+
+    def set(self, key: str, body: bytes):
+        self._call("set", lambda: self.client.set(self.prefix + key, body, ex=self.ttl))
+
+    def version(self, types: Iterable[str]) -> Optional[str]:
+        types = list(types)
+        values = self._call("mget", lambda: self.client.mget([f"{self.prefix}gen:{t}" for t in types]))
+        if values is None:
+            return None
+        return ",".join(f"{t}={int(v or 0)}" for t, v in zip(types, values))
+
+    def bump(self, types: Iterable[str]):
+        def incr_all():
+            pipe = self.client.pipeline()
+            for t in types:
+                pipe.incr(f"{self.prefix}gen:{t}")
+            pipe.execute()
+
+        self._call("incr", incr_all)
+
+    def clear(self):
+        def delete_bodies():
+            keys = list(self.client.scan_iter(match=self.prefix + '"*'))
+            if keys:
+                self.client.delete(*keys)
+
+        self._call("clear", delete_bodies)
+
+
+class ResponseCache:
+    """
+    Read-through cache of serialized graph responses.
+
+    Each entry is keyed by endpoint, query parameters and the current
+    generation of every vertex/edge type the endpoint reads. run_sync bumps
+    a type's generation once it has written to it, so later requests miss
+    and rebuild; stale entries are never read again and age out. The same
+    key doubles as the response ETag, which lets clients revalidate without
+    the body being rebuilt or even fetched from the cache.
+    """
+
+    def __init__(self, backend=None, metrics: Optional[MetricsRegistry] = None,
+                 max_streamed_bytes: int = DEFAULT_MAX_STREAMED_BYTES):
+        self.backend = backend
+        self.metrics = metrics or METRICS
+        self.max_streamed_bytes = max_streamed_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def etag(self, endpoint: str, params: Mapping[str, object], types: Iterable[str]) -> Optional[str]:
+        """Strong ETag for the current data, or None when caching is unavailable."""
+        if self.backend is None:
+            return None
+
+        version = self.backend.version(sorted(types))
+        if version is None:
+            return None
+
+        # Escaped, so "&" or "=" inside a value cannot pass for another parameter
+        query = urlencode(sorted((k, str(v)) for k, v in params.items() if v is not None))
+        digest = hashlib.sha1(f"{endpoint}?{query}|{version}".encode()).hexdigest()
+        return f'"{digest}"'
+
+    def lookup(self, endpoint: str, etag: Optional[str]) -> Optional[bytes]:
+        if etag is None:
+            return None
+
+        body = self.backend.get(etag)
+        self._count(endpoint, "hit" if body is not None else "miss")
+        return body
+
+    def get_or_build(self, endpoint: str, etag: Optional[str], build: Callable[[], bytes]) -> bytes:
+        body = self.lookup(endpoint, etag)
+        if body is None:
+            body = build()
+            if etag is not None:
+                self.backend.set(etag, body)
+        return body
+
+    def stream_through(self, etag: Optional[str], chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Passes a body built after a lookup() miss through in chunks, keeping
+        a copy under `etag` only while it stays below max_streamed_bytes. A
+        stream the client abandons is never stored.
+        """
+        kept = [] if etag is not None else None
+        size = 0
+        for chunk in chunks:
+            if kept is not None:
+                size += len(chunk)
+                if size > self.max_streamed_bytes:
+                    kept = None
+                else:
+                    kept.append(chunk)
+            yield chunk
+
+        if kept is not None:
+            self.backend.set(etag, b"".join(kept))
+
+    def not_modified(self, endpoint: str):
+        self._count(endpoint, "not_modified")
+
+    def version(self, types: Iterable[str]) -> Optional[str]:
+        """Generation of the given types, or None when caching is unavailable."""
+        if self.backend is None:
+            return None
+        return self.backend.version(sorted(types))
+
+    def invalidate(self, types: Iterable[str]):
+        types = sorted(set(types))
+        if self.backend is None or not types:
+            return
+        self.backend.bump(types)
+        logger.info("[Response Cache] invalidated %s", ", ".join(types))
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def _count(self, endpoint: str, result: str):
+        self.metrics.counter(
+            "response_cache_requests_total", "Graph endpoint requests by cache result"
+        ).inc(endpoint=endpoint, result=result)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # Weak comparison, as If-None-Match requires
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+
+def create_backend():
+    # RESPONSE_CACHE_BACKEND: memory (default), redis, or none
+    kind = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+
+    if kind == "none":
+        return None
+
+    if kind == "redis":
+        import redis
+
+        client = redis.Redis.from_url(os.environ.get("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0"))
+        return RedisBackend(client)
+
+    if kind == "memory":
+        return MemoryBackend(
+            max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        )
+
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND '{kind}'")
+
+
+RESPONSE_CACHE = ResponseCache(create_backend())
@@ -1,46 +1,444 @@
-from apache_spark_pipeline.services.apache_spark_service import SparkService
-from apache_spark_pipeline.services.mapping_service import MappingEngine
+import logging
+import threading
+import time
+from functools import partial
+
+from apache_spark_pipeline.helpers.snapshots import diff_snapshots
+from apache_spark_pipeline.services.apache_spark_service import ReadPlan, SparkService
+from apache_spark_pipeline.services.checkpoint_service import ChunkCommitLog, CheckpointStore, watermark_value
+from apache_spark_pipeline.services.loading_job_sink import (
+    DEFAULT_BULK_LOAD_THRESHOLD,
+    LoadingJobSink,
+    build_loading_job,
+)
+from apache_spark_pipeline.services.mapping_registry import MAPPING_REGISTRY
+from apache_spark_pipeline.services.metrics import METRICS
+from apache_spark_pipeline.services.response_cache import RESPONSE_CACHE
+from apache_spark_pipeline.services.table_scheduler import (
+    DEFAULT_TABLE_WORKERS,
+    run_in_dependency_order,
+    table_dependencies,
+)
+from apache_spark_pipeline.services.transform_pool import TransformPool
 from apache_spark_pipeline.services.tigergraph_singleton import TIGERGRAPH_CLIENT
-# from ..helpers.tigergraph_models import VertexMapping, EdgeMapping
-from ..helpers.mappers import USER_VERTEX, PRODUCT_VERTEX, PURCHASE_EDGE
+from apache_spark_pipeline.services.tigergraph_uploader import (
+    ConcurrentUploader,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_PENDING,
+    DEFAULT_MAX_WORKERS,
+    payload_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows pulled from a table, transformed and upserted per step
+DEFAULT_CHUNK_SIZE = 1000
+
+# Column whose maximum is checkpointed after each table is upserted
+WATERMARK_COLUMN = "updated_at"
+
+# Seconds between writes of acknowledged chunks to the commit log
+COMMIT_LOG_FLUSH_SECONDS = 0.5
+
+def run_sync(mode="batch", last_ts=None, chunk_size=DEFAULT_CHUNK_SIZE, tg=None,
+             upload_batch_size=DEFAULT_BATCH_SIZE, upload_concurrency=DEFAULT_MAX_WORKERS,
+             checkpoints=None, metrics=None, progress=None, registry=None,
+             table_workers=DEFAULT_TABLE_WORKERS, transform_workers=0,
+             bulk_load_threshold=DEFAULT_BULK_LOAD_THRESHOLD, response_cache=None,
+             upload_queue_size=DEFAULT_MAX_PENDING, resume=True):
+    """
+    Micro-batches without last_ts resume from the table's persisted
+    high-watermark (or read the whole table on the first run). Every mode
+    advances the watermark once all chunks of a table were upserted.
+
+    mode="snapshot" diffs the table's current catalog snapshot against the
+    keys and row hashes stored for the last synced one and only sends
+    added/changed rows plus deletes for removed keys.
+
+    Counters and timings are recorded in metrics (the process-wide
+    registry served by /api/metrics/ by default). progress, if given, is
+    called as progress(table, stats) after every upserted chunk.
+
+    Tables and their compiled mappings come from registry (by default the
+    process-wide one loaded from config/table_mappings.yaml). Up to
+    table_workers tables are synced at once: an edge table starts after the
+    tables loading its endpoint vertex types, independent tables overlap.
+    With transform_workers > 0 chunks large enough to be worth it are split
+    across a process pool of that size (see TransformPool); the payloads
+    are the same as an in-process transform.
+
+    Batch and micro-batch reads ask the catalog for the mapped fields and
+    the watermark column only, and leave out rows with an id field unset;
+    those rows are not counted as read or dropped. Snapshot mode reads and
+    hashes the mapped fields only, so changes to other columns send nothing.
+
+    Upserts go out in batches that start at upload_batch_size items and are
+    resized from request latency, errors and JSON size (AdaptiveBatchSize).
+    Each table queues at most upload_queue_size batches before its reader
+    waits for TigerGraph (UploadStream); 0 sends every chunk synchronously.
+    A table that fails drops the batches it still had queued, and a failed
+    run sends nothing once it has flushed the chunk commits.
+
+    Full-table reads (batch mode, or a micro-batch without a watermark) of
+    at least bulk_load_threshold rows are written to CSV and loaded with a
+    GSQL loading job instead of REST++ upserts, when the client supports it.
+    None disables the bulk path. A bulk load is a single job, so it records
+    no chunk commits and a failed one starts from row 0 again.
+
+    Once a table has written to TigerGraph, the vertex/edge types it touched
+    are invalidated in response_cache (the one behind the graph endpoints by
+    default). A failed run invalidates every type it may have written.
 
-def run_sync(mode="batch", last_ts=None):
+    With resume=True, full-table REST++ syncs record every chunk TigerGraph
+    acknowledged (ChunkCommitLog). When a table fails midway, the next
+    full-table sync of the same table version and mapping starts at the
+    first row not committed instead of row 0; stats["resumed_from"] holds
+    that row offset. Tables that finished keep their log until the whole
+    run succeeded, so a rerun after a later table failed skips their rows
+    too; all logs are cleared together once every table is done.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    if upload_queue_size < 0:
+        raise ValueError(f"upload_queue_size must not be negative, got {upload_queue_size}")
+
+    started = time.perf_counter()
+    metrics = metrics or METRICS
+    response_cache = response_cache or RESPONSE_CACHE
     spark_service = SparkService()
-    tg = TIGERGRAPH_CLIENT
+    checkpoints = checkpoints or CheckpointStore()
+    client = tg or TIGERGRAPH_CLIENT
+    uploader = ConcurrentUploader(
+        client,
+        batch_size=upload_batch_size,
+        max_workers=upload_concurrency,
+        metrics=metrics,
+    )
+
+    mappings = (registry or MAPPING_REGISTRY).current()
+    mapper = mappings.engine
+    sources = {table: source_table for source_table, table in mappings.sync_tables}
 
-    if mode == "batch":
-        users = spark_service.read_batch("main.sales.users")
-        products = spark_service.read_batch("main.sales.products")
-        purchases = spark_service.read_batch("main.sales.purchases")
+    # Checkpoints are only read and written on this thread; table workers
+    # just move rows (Django connections are per thread).
+    if mode == "snapshot":
+        previous_ids = {table: checkpoints.get_snapshot(source) for table, source in sources.items()}
+        previous_keys = {table: checkpoints.get_snapshot_keys(source) for table, source in sources.items()}
+    elif mode == "batch":
+        since = dict.fromkeys(sources)
     else:
-        users = spark_service.read_microbatch("main.sales.users", last_ts)
-        products = spark_service.read_microbatch("main.sales.products", last_ts)
-        purchases = spark_service.read_microbatch("main.sales.purchases", last_ts)
+        since = {table: last_ts or checkpoints.get_watermark(source) for table, source in sources.items()}
+
+    transform_pool = TransformPool(mapper, transform_workers) if transform_workers else None
+
+    read_plans = {table: ReadPlan.for_mapping(mapper.plans[table], keep=(WATERMARK_COLUMN,)) for table in sources}
+    commit_logs = {}
+    if resume and mode != "snapshot":
+        for table, source in sources.items():
+            if since[table] is None:
+                version = spark_service.table_version(source, read_plans[table])
+                commit_logs[table] = ChunkCommitLog(checkpoints, source, version)
+
+    def flush_commit_logs():
+        for log in commit_logs.values():
+            log.flush()
+
+    def sync_one(table):
+        stream = uploader.stream(upload_queue_size) if upload_queue_size else None
+        try:
+            return sync_into(table, stream or uploader)
+        except BaseException:
+            # Don't leave this table's queued batches (and their commits)
+            # running behind the failure
+            if stream is not None:
+                stream.cancel()
+            raise
+
+    def sync_into(table, sink):
+        source_table = sources[table]
+        if mode == "snapshot":
+            return sync_table_snapshot(
+                spark_service, previous_ids[table], previous_keys.pop(table), mapper, source_table, table,
+                sink, chunk_size, metrics, progress, transform_pool,
+            )
+
+        read_plan = read_plans[table]
+        read_started = time.perf_counter()
+        if since[table] is None:
+            dataframe = spark_service.read_batch(source_table, read_plan)
+        else:
+            dataframe = spark_service.read_microbatch(source_table, since[table], read_plan)
+        read_seconds = time.perf_counter() - read_started
+
+        bulk = (
+            since[table] is None
+            and bulk_load_threshold is not None
+            and dataframe.count() >= bulk_load_threshold
+            and hasattr(client, "run_loading_job")
+        )
+        if not bulk:
+            stats = sync_table(
+                mapper, table, dataframe, sink, chunk_size, metrics, progress, transform_pool,
+                commit_logs.get(table),
+            )
+        else:
+            kind, mapping = mapper.mappings[table]
+            with LoadingJobSink(client, build_loading_job(kind, mapping, mappings.schema)) as sink:
+                stats = sync_table(mapper, table, dataframe, sink, chunk_size, metrics, progress, transform_pool)
+                load_started = time.perf_counter()
+                stats.update(sink.commit())
+                load_seconds = time.perf_counter() - load_started
+                stats["timings"]["upsert"] += load_seconds
+                metrics.counter("sync_stage_seconds_total").inc(load_seconds, table=table, stage="upsert")
+
+        stats["timings"]["read"] += read_seconds
+        metrics.counter("sync_stage_seconds_total").inc(read_seconds, table=table, stage="read")
+        return dict(stats, since=since[table])
+
+    def table_done(table, stats):
+        checkpoints.save_watermark(sources[table], stats["high_watermark"])
+        log = commit_logs.get(table)
+        if log is not None:
+            log.flush()
+        if mode == "snapshot":
+            checkpoints.save_snapshot(sources[table], stats["snapshot_id"], stats.pop("snapshot_keys"))
+        if stats["rows"] or stats.get("removed"):
+            response_cache.invalidate(affected_types(mapper, table, bool(stats.get("removed"))))
+
+    try:
+        results = run_in_dependency_order(
+            table_dependencies(mapper, list(sources)), sync_one, table_workers, table_done,
+            on_tick=flush_commit_logs if commit_logs else None, tick_seconds=COMMIT_LOG_FLUSH_SECONDS,
+        )
+    except BaseException:
+        # Nothing may be sent (or committed) after the logs are flushed
+        uploader.close(cancel=True)
+        # Keep what was acknowledged so the next run resumes from there
+        flush_commit_logs()
+        # The failing table may have upserted some chunks already
+        response_cache.invalidate(t for table in sources for t in affected_types(mapper, table, True))
+        raise
+    finally:
+        uploader.close()
+        spark_service.stop_service()
+        if transform_pool is not None:
+            transform_pool.shutdown()
+
+    for log in commit_logs.values():
+        log.close()
+
+    metrics.counter("sync_runs_total", "Completed run_sync calls").inc(mode=mode)
+    metrics.histogram("sync_run_seconds", "Wall time of a run_sync call").observe(
+        time.perf_counter() - started, mode=mode
+    )
+    return {table: results[table] for table in sources}
+
+def sync_table(mapper, table, dataframe, tg, chunk_size=DEFAULT_CHUNK_SIZE, metrics=None,
+               progress=None, transform_pool=None, commit_log=None):
+    """
+    Streams one table into TigerGraph: each chunk is transformed and handed
+    to tg before the next one is pulled. With a plain client that returns
+    once the chunk is upserted, so at most chunk_size rows are in flight;
+    an UploadStream returns once the chunk is queued and bounds the rows in
+    flight by its queue. Either way every upsert was acknowledged when this
+    returns; progress may run for chunks still queued.
+
+    stats["timings"] holds the seconds spent per stage (read, transform,
+    upsert) across all chunks; rows_dropped counts rows the mapping could
+    not convert, rows_merged edge rows merged into another row of their
+    chunk, and bytes_sent the JSON size of the upserted payloads.
+
+    With a commit_log, reading starts at its resume_offset and each chunk
+    is recorded there once tg acknowledged it. stats["rows_committed"] is
+    refreshed before every progress call, and an UploadStream also reports
+    progress from its upload threads as chunks are acknowledged, so a table
+    that fails midway still reports what it committed.
+    """
+    metrics = metrics or METRICS
+    timings = {"read": 0.0, "transform": 0.0, "upsert": 0.0}
+    stats = {
+        "rows": 0, "chunks": 0, "max_chunk_rows": 0, "rows_dropped": 0, "rows_merged": 0, "bytes_sent": 0,
+        "high_watermark": None, "timings": timings,
+    }
+    offset = 0
+    if commit_log is not None:
+        offset = commit_log.resume_offset
+        stats.update(high_watermark=commit_log.resume_watermark, resumed_from=offset, rows_committed=offset)
+    chunks = iter_chunk_ranges(dataframe, chunk_size, offset)
+    streaming = hasattr(tg, "flush")
+    dropped_before = mapper.dropped_rows[table]
+    merged_before = mapper.merged_rows[table]
+    progress_lock = threading.Lock()
+
+    def report():
+        with progress_lock:
+            if commit_log is not None:
+                stats["rows_committed"] = commit_log.rows_committed
+            if progress:
+                progress(table, stats)
+
+    def acknowledged(start, stop, watermark):
+        commit_log.record(start, stop, watermark)
+        report()
+
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        read_done = time.perf_counter()
+        timings["read"] += read_done - started
+        if chunk is None:
+            break
+        start, stop, records = chunk
+
+        if transform_pool is None:
+            payload = mapper.transform_records(table, records)
+        else:
+            payload = transform_pool.transform(table, records)
+        stats["bytes_sent"] += payload_bytes(payload)
+        transformed = time.perf_counter()
+        timings["transform"] += transformed - read_done
+
+        chunk_watermark = max(
+            (w for w in (watermark_value(r.get(WATERMARK_COLUMN)) for r in records) if w),
+            default=None,
+        )
+        send = tg.upsert_vertices if "vertices" in payload else tg.upsert_edges
+        if commit_log is None:
+            send(payload)
+        elif streaming:
+            send(payload, on_done=partial(acknowledged, start, stop, chunk_watermark))
+        else:
+            send(payload)
+            commit_log.record(start, stop, chunk_watermark)
+        timings["upsert"] += time.perf_counter() - transformed
+
+        stats["rows"] += len(records)
+        stats["chunks"] += 1
+        stats["max_chunk_rows"] = max(stats["max_chunk_rows"], len(records))
+
+        if chunk_watermark and (stats["high_watermark"] is None or chunk_watermark > stats["high_watermark"]):
+            stats["high_watermark"] = chunk_watermark
+
+        report()
+
+    flush = getattr(tg, "flush", None)
+    if flush is not None:
+        started = time.perf_counter()
+        flush()
+        timings["upsert"] += time.perf_counter() - started
+
+    if commit_log is not None:
+        stats["rows_committed"] = commit_log.rows_committed
+    stats["rows_dropped"] = mapper.dropped_rows[table] - dropped_before
+    stats["rows_merged"] = mapper.merged_rows[table] - merged_before
+    record_table_metrics(metrics, table, stats)
+    return stats
+
+def record_table_metrics(metrics, table, stats):
+    metrics.counter("sync_rows_read_total", "Rows read from the catalog").inc(stats["rows"], table=table)
+    metrics.counter("sync_rows_dropped_total", "Rows dropped by mapping conversion errors").inc(
+        stats["rows_dropped"], table=table
+    )
+    metrics.counter("sync_rows_merged_total", "Edge rows merged into another row of their chunk").inc(
+        stats["rows_merged"], table=table
+    )
+    metrics.counter("sync_bytes_sent_total", "JSON bytes of upserted payloads").inc(
+        stats["bytes_sent"], table=table
+    )
+    metrics.counter("sync_chunks_total", "Chunks transformed and upserted").inc(stats["chunks"], table=table)
+
+    stage_seconds = metrics.counter("sync_stage_seconds_total", "Seconds spent per sync stage")
+    for stage, seconds in stats["timings"].items():
+        stage_seconds.inc(seconds, table=table, stage=stage)
+
+def sync_table_snapshot(spark_service, previous_id, previous_keys, mapper, source_table, table, tg,
+                        chunk_size=DEFAULT_CHUNK_SIZE, metrics=None, progress=None,
+                        transform_pool=None):
+    """
+    Syncs the difference between the keys and row hashes stored for
+    snapshot previous_id (CheckpointStore.get_snapshot_keys) and the table's
+    current snapshot of the mapped fields.
+
+    Without stored keys (first run, or a checkpoint written before keys
+    were stored) every row is upserted and nothing is deleted: the table
+    cannot tell which vertices or edges it wrote earlier, and other tables
+    or micro-batches may write the same types.
+
+    The caller checkpoints stats["snapshot_id"] together with
+    stats["snapshot_keys"] (None when unchanged) once this returns.
+    """
+    snapshot = spark_service.current_snapshot(source_table, mapper.plans[table].fields)
+    diff = None
+
+    if previous_keys and previous_id == snapshot.snapshot_id:
+        upserts, removed = [], []
+    else:
+        diff = diff_snapshots(previous_keys, snapshot, key_columns(mapper, table), previous_id)
+        upserts, removed = diff.upserts, diff.removed
+        if not previous_keys and previous_id is not None:
+            logger.warning(
+                "[Snapshot] No keys stored for %s snapshot %s; resending every row without deletes",
+                source_table, previous_id,
+            )
+
+    stats = sync_table(
+        mapper, table, spark_service.dataframe(upserts), tg, chunk_size, metrics, progress, transform_pool
+    )
+    stats["removed"] = delete_rows(mapper, table, removed, tg)
+    stats["snapshot_id"] = snapshot.snapshot_id
+    stats["previous_snapshot_id"] = previous_id
+    stats["snapshot_keys"] = diff.keys if diff else None
+    if diff:
+        stats["added"] = len(diff.added)
+        stats["changed"] = len(diff.changed)
+
+    return stats
+
+def affected_types(mapper, table, removed=False):
+    """Vertex/edge types a sync of table writes to."""
+    kind, mapping = mapper.mappings[table]
+    if kind == "edge":
+        return {mapping.edge_type}
+
+    types = {mapping.vertex_type}
+    if removed:
+        # Deleting a vertex also deletes its edges
+        types |= {
+            m.edge_type for k, m in mapper.mappings.values()
+            if k == "edge" and mapping.vertex_type in (m.from_vertex_type, m.to_vertex_type)
+        }
+    return types
 
-    
-    user_records = dataframe_to_records(users)
-    product_records = dataframe_to_records(products)
-    purchase_records = dataframe_to_records(purchases)
+def key_columns(mapper, table):
+    plan = mapper.plans[table]
+    return [name for name, _ in plan.id_fields]
 
-    print("RAW", user_records)
-    
-    mapper = MappingEngine()
+def delete_rows(mapper, table, records, tg):
+    if not records:
+        return 0
 
-    mapper.add_vertex_mapping(USER_VERTEX)
-    mapper.add_vertex_mapping(PRODUCT_VERTEX)
-    mapper.add_edge_mapping(PURCHASE_EDGE)
+    # Run removed rows through the mapping so ids match what was upserted
+    payload = mapper.transform_records(table, records)
+    deleted = 0
 
-    users_payload = mapper.transform_records("users", user_records)
-    products_payload = mapper.transform_records("products", product_records)
-    purchases_payload = mapper.transform_records("purchases", purchase_records)
+    for v_type, vertices in payload.get("vertices", {}).items():
+        deleted += tg.delete_vertices(v_type, list(vertices))["count"]
 
-    print("Transformed", users_payload)
+    for e_type, edges in payload.get("edges", {}).items():
+        deleted += tg.delete_edges(e_type, edges)["count"]
 
-    tg.upsert_vertices(users_payload)
-    tg.upsert_vertices(products_payload)
-    tg.upsert_edges(purchases_payload)
+    return deleted
 
-    spark_service.stop_service()
+def iter_chunk_ranges(dataframe, chunk_size=DEFAULT_CHUNK_SIZE, offset=0):
+    """(start, stop, records) per chunk, by row offset in the dataframe, from row `offset` on."""
+    start = offset
+    batches = dataframe.iter_batches(chunk_size, offset) if offset else dataframe.iter_batches(chunk_size)
+    for batch in batches:
+        stop = start + len(batch)
+        records = [row for row in batch if isinstance(row, dict)]
+        if records:
+            yield start, stop, records
+        start = stop
 
 def dataframe_to_records(dataframe):
     records = []
@@ -0,0 +1,95 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional, Sequence, Set
+
+# Tables synced at the same time when run_sync is not told otherwise
+DEFAULT_TABLE_WORKERS = 4
+
+
+def table_dependencies(mapper, tables: Sequence[str]) -> Dict[str, Set[str]]:
+    """
+    Edge tables depend on the tables that load their from/to vertex types;
+    vertex tables depend on nothing. Only tables in `tables` are considered.
+    """
+    vertex_tables: Dict[str, Set[str]] = {}
+    for table in tables:
+        kind, mapping = mapper.mappings[table]
+        if kind == "vertex":
+            vertex_tables.setdefault(mapping.vertex_type, set()).add(table)
+
+    deps: Dict[str, Set[str]] = {}
+    for table in tables:
+        kind, mapping = mapper.mappings[table]
+        deps[table] = set()
+        if kind == "edge":
+            for vtype in (mapping.from_vertex_type, mapping.to_vertex_type):
+                deps[table] |= vertex_tables.get(vtype, set())
+    return deps
+
+
+def run_in_dependency_order(deps: Dict[str, Set[str]], run: Callable[[str], object],
+                            max_workers: int = DEFAULT_TABLE_WORKERS,
+                            on_done: Optional[Callable[[str, object], None]] = None,
+                            on_tick: Optional[Callable[[], None]] = None,
+                            tick_seconds: Optional[float] = None) -> Dict[str, object]:
+    """
+    Runs run(table) on a thread pool as soon as all of a table's dependencies
+    finished, so independent tables overlap. on_done(table, result) is called
+    on the calling thread as each table completes, before its dependents
+    start. on_tick() is called on the calling thread at least every
+    tick_seconds while tables run, and before each batch of on_done calls.
+
+    Once a table fails no further tables are started, as in a sequential
+    run; the first error is re-raised after the running ones have finished.
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be positive, got {max_workers}")
+    _check_acyclic(deps)
+
+    results: Dict[str, object] = {}
+    pending = {table: set(d) & deps.keys() for table, d in deps.items()}
+    error: Optional[BaseException] = None
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sync-table") as pool:
+        running = {}
+
+        def start_ready():
+            for table in [t for t, d in pending.items() if not d]:
+                del pending[table]
+                running[pool.submit(run, table)] = table
+
+        start_ready()
+        while running:
+            done, _ = wait(running, timeout=tick_seconds if on_tick else None, return_when=FIRST_COMPLETED)
+            if on_tick:
+                on_tick()
+            for future in done:
+                table = running.pop(future)
+                try:
+                    results[table] = future.result()
+                    if on_done:
+                        on_done(table, results[table])
+                except BaseException as e:
+                    error = error or e
+                    continue
+
+                for waiting in pending.values():
+                    waiting.discard(table)
+
+            if error is None:
+                start_ready()
+
+    if error is not None:
+        raise error
+    return results
+
+
+def _check_acyclic(deps: Dict[str, Iterable[str]]):
+    remaining = {table: set(d) & deps.keys() for table, d in deps.items()}
+    while remaining:
+        ready = [t for t, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f"Circular table dependencies: {sorted(remaining)}")
+        for table in ready:
+            del remaining[table]
+        for d in remaining.values():
+            d.difference_update(ready)
@@ -1,28 +1,182 @@
-from typing import Dict, List
-import pyTigerGraph as tg
+import logging
+import re
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import log_payload
+from ..helpers.tigergraph_models import as_edge_batch, as_vertex_batch
+
+logger = logging.getLogger(__name__)
+
+# Requested token lifetime, and how long before expiry a new one is fetched
+TOKEN_LIFETIME = 24 * 60 * 60
+TOKEN_REFRESH_MARGIN = 5 * 60
+
+# Keep-alive connections shared by all threads using one service
+DEFAULT_POOL_SIZE = 16
+
+# Ids that can go into a REST++ filter unquoted by the URL builder
+_FILTER_SAFE_ID = re.compile(r"[\w.@-]+")
+
+
+def build_pooled_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@lru_cache(maxsize=None)
+def pooled_connection_class():
+    """
+    TigerGraphConnection subclass whose requests all go through one shared
+    session. pyTigerGraph otherwise opens a single-socket session per thread,
+    so upload worker threads could not reuse each other's keep-alive sockets.
+    pyTigerGraph is imported here, not at module import, so loading the views
+    stays cheap.
+    """
+    import pyTigerGraph as tg
+
+    class PooledTigerGraphConnection(tg.TigerGraphConnection):
+        shared_session: Optional[requests.Session] = None
+
+        @property
+        def _session(self) -> requests.Session:
+            return self.shared_session
+
+    return PooledTigerGraphConnection
+
+
+def token_expiry(token, lifetime: int = TOKEN_LIFETIME) -> float:
+    """
+    Unix time a getToken() result expires. TigerGraph 3.x returns
+    (token, epoch, iso), 4.x (token, "YYYY-MM-DD HH:MM:SS"); anything
+    unparseable is assumed to live for the requested lifetime.
+    """
+    fallback = time.time() + lifetime
+    if not isinstance(token, (tuple, list)) or len(token) < 2:
+        return fallback
+
+    expires = token[1]
+    try:
+        if isinstance(expires, (int, float)) or str(expires).isdigit():
+            return min(float(expires), fallback)
+        return min(datetime.fromisoformat(str(expires)).timestamp(), fallback)
+    except ValueError:
+        return fallback
+
+
+def loaded_lines(result) -> int:
+    # runLoadingJobWithFile returns [{"statistics": {"validLine": n, ...}}, ...]
+    # (shape varies across TigerGraph versions); 0 when it can't be read
+    items = result if isinstance(result, list) else [result]
+    total = 0
+    for item in items:
+        stats = item.get("statistics", item) if isinstance(item, dict) else {}
+        if isinstance(stats, dict):
+            total += int(stats.get("validLine", 0) or 0)
+    return total
+
 
 class TigerGraphService:
+    """
+    REST++ client. Nothing touches the network until the first call: the
+    connection is built on first use, the secret is created once and tokens
+    are cached until shortly before they expire.
+
+    REST++ cannot list edges (or vertices whose id is not an attribute) from
+    a cursor, so scan_edges / scan_vertices sort one export per type and
+    keep it until the type changes: a write through this client, or a new
+    listing_version(type), e.g. the response cache generation that run_sync
+    bumps from any process.
+    """
+
     def __init__(self, host="http://localhost", graphname="EcommerceGraph",
-                 username="tigergraph", password="tigergraph"):
+                 username="tigergraph", password="tigergraph",
+                 connection=None, authenticate=True, pool_size=DEFAULT_POOL_SIZE,
+                 listing_version: Optional[Callable[[str], Optional[str]]] = None):
+        self.host = host
+        self.graphname = graphname
+        self.username = username
+        self.password = password
+        self.authenticate = authenticate
+        self.pool_size = pool_size
+
+        self.token = None
+        self._conn = connection
+        self._session: Optional[requests.Session] = None
+        self._secret = None
+        self._token_expires_at = 0.0
+        self._lock = threading.Lock()
+        # Loading jobs (re)created by this process
+        self._loading_jobs = set()
+        # Vertex type -> primary id attribute name, or None if not an attribute
+        self._id_attributes: Dict[str, Optional[str]] = {}
+        self.listing_version = listing_version
+        # Writes through this client per type, and sorted exports per
+        # ("vertex" | "edge", type) -> (version they were taken at, items)
+        self._generations: Dict[str, int] = {}
+        self._listings: Dict[Tuple[str, str], Tuple[Tuple, List[Dict]]] = {}
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    self._conn = self._connect()
+
+        if self.authenticate and time.time() >= self._token_expires_at - TOKEN_REFRESH_MARGIN:
+            self._refresh_token()
 
-        self.conn = tg.TigerGraphConnection(
-            host=host,
-            graphname=graphname,
-            username=username,
-            password=password
+        return self._conn
+
+    def _connect(self):
+        self._session = build_pooled_session(self.pool_size)
+        conn = pooled_connection_class()(
+            host=self.host,
+            graphname=self.graphname,
+            username=self.username,
+            password=self.password
         )
+        self._session.verify = conn.verify
+        conn.shared_session = self._session
+        return conn
+
+    def _refresh_token(self):
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if time.time() < self._token_expires_at - TOKEN_REFRESH_MARGIN:
+                return
+
+            if self._secret is None:
+                self._secret = self._conn.createSecret()
 
-        secret = self.conn.createSecret()
-        self.token = self.conn.getToken(secret)
+            self.token = self._conn.getToken(self._secret, lifetime=TOKEN_LIFETIME)
+            self._token_expires_at = token_expiry(self.token)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
 
     def upsert_vertices(self, payload: Dict):
         vertices_payload = payload.get("vertices", {})
 
         total_count = 0
-        print("Payload", vertices_payload)
+        log_payload(logger, "Vertex payload", vertices_payload)
         for v_type, vertices in vertices_payload.items():
-            print("THESE are vertices", v_type)
-            self.conn.upsertVertices(v_type, vertices)
+            # upsertVertices takes (id, attributes) pairs
+            self.conn.upsertVertices(v_type, list(as_vertex_batch(v_type, vertices).items()))
+            self._changed(v_type)
             total_count += len(vertices)
 
         return {
@@ -36,17 +190,13 @@ class TigerGraphService:
 
         total_count = 0
         for etype, edges in edges_payload.items():
-            formatted_edges = [
-                (e["from_id"], e["to_id"], e.get("attributes", {}))
-                for e in edges
-            ]
-            print("Formatted_Edges", formatted_edges)
-            # Get the source/target types from first edge
-            if edges:
-                src_type = edges[0]["from_type"]
-                tgt_type = edges[0]["to_type"]
-                self.conn.upsertEdges(src_type, etype, tgt_type, formatted_edges)
-                total_count += len(edges)
+            batch = as_edge_batch(etype, edges)
+            if not batch:
+                continue
+            log_payload(logger, f"{etype} edges", batch)
+            self.conn.upsertEdges(batch.from_type, etype, batch.to_type, list(batch.triples()))
+            self._changed(etype)
+            total_count += len(batch)
 
         return {
             "status": "OK",
@@ -54,19 +204,131 @@ class TigerGraphService:
             "count": total_count,
         }
 
+    def delete_vertices(self, vtype: str, v_ids: List[str]):
+        count = self.conn.delVerticesById(vtype, list(v_ids)) if v_ids else 0
+        # Deleting a vertex also deletes its edges, of any type
+        self._changed(vtype, edges=True)
+        return {"status": "OK", "vertex_type": vtype, "count": count}
+
+    def delete_edges(self, etype: str, edges: List[Dict]):
+        # REST++ deletes edges one (source, target) pair at a time
+        count = 0
+        for e in edges:
+            self.conn.delEdges(
+                e["from_type"], e["from_id"], etype, e["to_type"], e["to_id"]
+            )
+            count += 1
+        self._changed(etype)
+        return {"status": "OK", "edge_type": etype, "count": count}
+
     def fetch_vertices(self, vtype: str):
-        vertices =  self.conn.getVertices(vtype)
-        print("returned vertices", vertices)
+        vertices = self.conn.getVertices(vtype)
+        log_payload(logger, f"Fetched {vtype} vertices", vertices)
         return vertices
 
-    def fetch_edges(self, etype: str):
- 
-        all_edges = []
-        for vtype in self.conn.getVertexTypes():
-            print("vertice Type", vtype)
-            vertices = self.conn.getVertices(vtype)
-            print("Formatted_Edges", vertices)
-            for vid in vertices:
-                edges = self.conn.getEdges(vtype, vid['v_id'], etype)
-                all_edges.extend(edges)
-        return all_edges
+    def iter_edges(self, etype: str, offset: int = 0, limit: Optional[int] = None):
+        """
+        Streams the edges of one type, ordered as scan_edges orders them,
+        from a single bulk export query (getEdgesByType) rather than one
+        getEdges round trip per vertex. REST++ takes no offset for the
+        export, so offset / limit page client-side over the cached listing:
+        paging through a type fetches it once, not once per page.
+        """
+        if limit == 0:
+            return
+
+        order = itemgetter("from_id", "to_id")
+        edges = self._sorted_listing("edge", etype, lambda: self.conn.getEdgesByType(etype), order)
+        stop = offset + limit if limit is not None else None
+        yield from islice(edges, offset, stop)
+
+    def fetch_edges(self, etype: str, offset: int = 0, limit: Optional[int] = None):
+        return list(self.iter_edges(etype, offset, limit))
+
+    def _changed(self, type_name: str, edges: bool = False):
+        with self._lock:
+            self._generations[type_name] = self._generations.get(type_name, 0) + 1
+            if edges:
+                self._listings = {k: v for k, v in self._listings.items() if k[0] != "edge"}
+
+    def _sorted_listing(self, kind: str, type_name: str, export: Callable[[], List[Dict]], order) -> List[Dict]:
+        """export() sorted by order, reused until the type changes (see the class docstring)."""
+        external = self.listing_version(type_name) if self.listing_version is not None else ""
+        version = (self._generations.get(type_name, 0), external)
+        cached = self._listings.get((kind, type_name))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        items = sorted(export(), key=order)
+        # A listing_version of None means the version is unknown: don't keep it
+        if external is not None:
+            with self._lock:
+                self._listings[(kind, type_name)] = (version, items)
+        return items
+
+    def _id_attribute(self, vtype: str) -> Optional[str]:
+        if vtype not in self._id_attributes:
+            info = self.conn.getVertexType(vtype) or {}
+            as_attribute = str(info.get("Config", {}).get("PRIMARY_ID_AS_ATTRIBUTE", "")).lower() == "true"
+            self._id_attributes[vtype] = info.get("PrimaryId", {}).get("AttributeName") if as_attribute else None
+        return self._id_attributes[vtype]
+
+    def scan_vertices(self, vtype: str, after: Optional[str] = None, limit: Optional[int] = None):
+        """
+        Vertices of one type in ascending id order, starting after the id
+        `after`. When the primary id is also an attribute REST++ filters,
+        sorts and limits on the server, so a page costs one small request;
+        otherwise pages are cut from the cached sorted listing.
+        """
+        if limit == 0:
+            return
+
+        id_attribute = self._id_attribute(vtype)
+        if id_attribute and (after is None or _FILTER_SAFE_ID.fullmatch(after)):
+            where = f'{id_attribute}>"{after}"' if after is not None else ""
+            yield from self.conn.getVertices(vtype, where=where, sort=id_attribute, limit=limit)
+            return
+
+        order = itemgetter("v_id")
+        vertices = self._sorted_listing("vertex", vtype, lambda: self.conn.getVertices(vtype), order)
+        start = bisect_right(vertices, after, key=order) if after is not None else 0
+        stop = start + limit if limit is not None else None
+        yield from islice(vertices, start, stop)
+
+    def scan_edges(self, etype: str, after: Optional[Tuple[str, str]] = None,
+                   limit: Optional[int] = None):
+        """
+        Edges of one type in ascending (from_id, to_id) order, starting after
+        the edge `after` = (from_id, to_id). REST++ has no keyed edge listing,
+        so pages are cut from a cached sorted getEdgesByType export: a page
+        costs a binary search, not a fetch and sort of the whole type.
+        """
+        if limit == 0:
+            return
+
+        order = itemgetter("from_id", "to_id")
+        edges = self._sorted_listing("edge", etype, lambda: self.conn.getEdgesByType(etype), order)
+        start = bisect_right(edges, tuple(after), key=order) if after is not None else 0
+        stop = start + limit if limit is not None else None
+        yield from islice(edges, start, stop)
+
+    def create_loading_job(self, job):
+        """
+        Installs a LoadingJob once per process. The job is dropped first so a
+        changed mapping replaces the old definition; on a fresh graph the DROP
+        only prints an error and the script carries on.
+        """
+        if job.name in self._loading_jobs:
+            return
+
+        self.conn.gsql(
+            f"USE GRAPH {self.graphname}\n"
+            f"DROP JOB {job.name}\n"
+            f"{job.gsql(self.graphname)}"
+        )
+        self._loading_jobs.add(job.name)
+
+    def run_loading_job(self, job, path: str):
+        result = self.conn.runLoadingJobWithFile(path, job.file_tag, job.name, sep=",", eol="\n")
+        self._changed(job.type_name, edges=job.kind == "vertex")
+        return {"status": "OK", "job": job.name, "count": loaded_lines(result)}
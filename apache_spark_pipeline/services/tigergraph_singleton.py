@@ -1,3 +1,46 @@
+import os
+import threading
+
+from .response_cache import RESPONSE_CACHE
 from .tigergraph_service import TigerGraphService
 
-TIGERGRAPH_CLIENT = TigerGraphService()
+
+class LazyClient:
+    """
+    Stands in for a client and builds it on first attribute access, so
+    importing this module (and the views) never blocks on the network.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def create_client():
+    # TIGERGRAPH_BACKEND=mock serves the in-memory stand-in (local runs, tests)
+    if os.environ.get("TIGERGRAPH_BACKEND", "rest") == "mock":
+        from .mock_tigergraph_service import TigerGraphService as MockTigerGraphService
+        return MockTigerGraphService()
+
+    return TigerGraphService(
+        host=os.environ.get("TIGERGRAPH_HOST", "http://localhost"),
+        graphname=os.environ.get("TIGERGRAPH_GRAPH_NAME", "EcommerceGraph"),
+        username=os.environ.get("TIGERGRAPH_USERNAME", "tigergraph"),
+        password=os.environ.get("TIGERGRAPH_PASSWORD", "tigergraph"),
+        # Sorted listings are reused until run_sync invalidates their type
+        listing_version=lambda type_name: RESPONSE_CACHE.version([type_name]),
+    )
+
+
+TIGERGRAPH_CLIENT = LazyClient(create_client)
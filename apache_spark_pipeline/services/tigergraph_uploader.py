@@ -0,0 +1,502 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .metrics import METRICS, MetricsRegistry
+from ..helpers.tigergraph_models import EdgeBatch, VertexBatch, as_edge_batch, as_vertex_batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 0.2
+
+# Adaptive batch sizing: requests are kept under DEFAULT_MAX_BATCH_BYTES of
+# JSON and DEFAULT_MAX_BATCH_SIZE items; the item count grows while requests
+# are acknowledged within DEFAULT_TARGET_LATENCY seconds and halves after a
+# slower or failed one.
+DEFAULT_MAX_BATCH_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_BATCH_SIZE = 10_000
+DEFAULT_TARGET_LATENCY = 2.0
+
+# Batches an UploadStream keeps in flight before upserts block the caller
+DEFAULT_MAX_PENDING = 8
+
+# Upper bounds (items) of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10_000)
+
+
+# Items per vertex/edge type serialized when estimating a payload's size
+PAYLOAD_BYTES_SAMPLE = 64
+
+
+def _json_default(value):
+    if isinstance(value, VertexBatch):
+        return value.to_dict()
+    if isinstance(value, EdgeBatch):
+        return value.to_list()
+    return str(value)
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, separators=(",", ":"), default=_json_default))
+
+
+def payload_bytes(payload: Dict) -> int:
+    """
+    Approximate size of the payload as a compact JSON request body. Groups
+    larger than PAYLOAD_BYTES_SAMPLE items are extrapolated from their first
+    items, since encoding every chunk in full costs as much as transforming it.
+    """
+    total = 2
+    for key, groups in payload.items():
+        total += len(key) + 5
+        for name, items in groups.items():
+            total += len(name) + 4
+            count = len(items)
+            if count <= PAYLOAD_BYTES_SAMPLE:
+                total += _json_size(items)
+                continue
+
+            if isinstance(items, (VertexBatch, EdgeBatch)):
+                sample = items.slice(0, PAYLOAD_BYTES_SAMPLE)
+            elif isinstance(items, dict):
+                sample = dict(islice(items.items(), PAYLOAD_BYTES_SAMPLE))
+            else:
+                sample = items[:PAYLOAD_BYTES_SAMPLE]
+            total += _json_size(sample) * count // PAYLOAD_BYTES_SAMPLE
+    return total
+
+
+def split_vertices(payload: Dict, batch_size):
+    """
+    Splits {"vertices": {type: VertexBatch or {id: attrs}}} into single-type
+    payloads of at most batch_size vertices each. batch_size may also be a
+    callable taking the type's estimated JSON bytes per vertex.
+    """
+    for v_type, vertices in payload.get("vertices", {}).items():
+        batch = as_vertex_batch(v_type, vertices)
+        size = _batch_size(batch_size, "vertices", v_type, batch)
+        for start in range(0, len(batch), size):
+            yield {"vertices": {v_type: batch.slice(start, start + size)}}
+
+
+def split_edges(payload: Dict, batch_size):
+    for e_type, edges in payload.get("edges", {}).items():
+        batch = as_edge_batch(e_type, edges)
+        size = _batch_size(batch_size, "edges", e_type, batch)
+        for start in range(0, len(batch), size):
+            yield {"edges": {e_type: batch.slice(start, start + size)}}
+
+
+def _batch_size(batch_size, key: str, name: str, batch) -> int:
+    if not callable(batch_size):
+        return batch_size
+    if not len(batch):
+        return 1
+    return batch_size(payload_bytes({key: {name: batch}}) / len(batch))
+
+
+def _split_request(batch, size: int) -> List:
+    # A delete batch (list) or a single-type upsert payload, in requests of
+    # at most size items
+    if isinstance(batch, list):
+        return [batch[start:start + size] for start in range(0, len(batch), size)]
+    if "vertices" in batch:
+        return list(split_vertices(batch, size))
+    return list(split_edges(batch, size))
+
+
+def _request_items(batch) -> int:
+    if isinstance(batch, list):
+        return len(batch)
+    groups = batch.get("vertices") or batch.get("edges") or {}
+    return sum(len(v) for v in groups.values())
+
+
+class AdaptiveBatchSize:
+    """
+    Items per TigerGraph request, tuned AIMD style from the requests sent:
+    each full batch acknowledged within target_latency adds `increase`
+    items, a slower or failed request multiplies the size by `decrease`.
+    The size stays within [min_size, max_size], and rows() also caps it so
+    a request stays under max_bytes of JSON.
+    """
+
+    def __init__(self, initial: int, min_size: int = 1, max_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_bytes: int = DEFAULT_MAX_BATCH_BYTES, target_latency: float = DEFAULT_TARGET_LATENCY,
+                 increase: Optional[int] = None, decrease: float = 0.5):
+        if not 1 <= min_size <= initial <= max_size:
+            raise ValueError(f"Expected 1 <= min_size <= initial <= max_size, got {min_size}, {initial}, {max_size}")
+        if not 0 < decrease < 1:
+            raise ValueError(f"decrease must be between 0 and 1, got {decrease}")
+
+        self.size = initial
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.increase = increase or max(1, initial // 10)
+        self.decrease = decrease
+        self._lock = threading.Lock()
+
+    def rows(self, bytes_per_row: float = 0) -> int:
+        """Items for the next request, given the estimated JSON bytes per item."""
+        size = self.size
+        if bytes_per_row > 0:
+            size = min(size, int(self.max_bytes // bytes_per_row))
+        return max(size, 1)
+
+    def record(self, items: int, seconds: float, ok: bool = True):
+        with self._lock:
+            if not ok or seconds > self.target_latency:
+                self.size = max(self.min_size, int(self.size * self.decrease))
+            elif items >= self.size:
+                # Only full requests say the size is not too small
+                self.size = min(self.max_size, self.size + self.increase)
+
+
+class ConcurrentUploader:
+    """
+    Sends upserts to a TigerGraph client in size-bounded batches over a
+    thread pool.
+
+    Works with both the pyTigerGraph-backed and the mock TigerGraphService,
+    and exposes the same upsert_vertices / upsert_edges interface so it can
+    be used wherever a client is expected. Every call returns only after all
+    of its batches were acknowledged, and upload() waits for all vertex
+    batches before sending any edge, so edges never reach TigerGraph ahead of
+    their endpoint vertices.
+    """
+
+    def __init__(self, client, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+                 metrics: Optional[MetricsRegistry] = None,
+                 sizer: Optional[AdaptiveBatchSize] = None):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be positive, got {max_workers}")
+
+        self.client = client
+        self.batch_size = batch_size
+        # batch_size is where the adaptive size starts
+        self.sizer = sizer or AdaptiveBatchSize(batch_size, max_size=max(batch_size, DEFAULT_MAX_BATCH_SIZE))
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.metrics = metrics or METRICS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Several table threads may share one uploader
+        self._executor_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self, cancel: bool = False):
+        """Waits for the batches being sent; with cancel, drops those still queued."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=cancel)
+            self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="tigergraph-upsert",
+                )
+            return self._executor
+
+    def upsert_vertices(self, payload: Dict):
+        return self.upload(vertex_payloads=[payload])
+
+    def upsert_edges(self, payload: Dict):
+        return self.upload(edge_payloads=[payload])
+
+    def delete_vertices(self, vtype: str, v_ids: List[str]):
+        return self._send_with_retry(lambda ids: self.client.delete_vertices(vtype, ids), list(v_ids))
+
+    def delete_edges(self, etype: str, edges: List[Dict]):
+        return self._send_with_retry(lambda batch: self.client.delete_edges(etype, batch), list(edges))
+
+    def stream(self, max_pending: int = DEFAULT_MAX_PENDING) -> "UploadStream":
+        return UploadStream(self, max_pending)
+
+    def upload(self, vertex_payloads: Iterable[Dict] = (), edge_payloads: Iterable[Dict] = ()):
+        vertex_batches = [
+            batch
+            for payload in vertex_payloads
+            for batch in split_vertices(payload, self.sizer.rows)
+        ]
+        edge_batches = [
+            batch
+            for payload in edge_payloads
+            for batch in split_edges(payload, self.sizer.rows)
+        ]
+
+        vertex_results = self._send_all(self.client.upsert_vertices, vertex_batches)
+        # Only reached once every vertex batch was acknowledged
+        edge_results = self._send_all(self.client.upsert_edges, edge_batches)
+
+        result = {
+            "status": "OK",
+            "count": sum(r["count"] for r in vertex_results + edge_results),
+            "batches": len(vertex_batches) + len(edge_batches),
+        }
+        if vertex_batches:
+            result["vertex_types"] = _unique(b["vertices"] for b in vertex_batches)
+        if edge_batches:
+            result["edge_types"] = _unique(b["edges"] for b in edge_batches)
+        return result
+
+    def _send_all(self, send: Callable[[Dict], Dict], batches: List[Dict]) -> List[Dict]:
+        if not batches:
+            return []
+
+        if len(batches) == 1:
+            return [self._send_with_retry(send, batches[0])]
+
+        futures = [
+            self.executor.submit(self._send_with_retry, send, batch)
+            for batch in batches
+        ]
+        # result() re-raises the first batch that exhausted its retries
+        return [f.result() for f in futures]
+
+    def _send_with_retry(self, send: Callable, batch, attempt: int = 0) -> Dict:
+        operation = getattr(send, "__name__", "send")
+        latency = self.metrics.histogram(
+            "tigergraph_request_seconds", "Latency of one TigerGraph request, per attempt"
+        )
+        sizes = self.metrics.histogram(
+            "tigergraph_batch_items", "Vertices/edges per TigerGraph request", BATCH_SIZE_BUCKETS
+        )
+        items = _request_items(batch)
+        while True:
+            started = time.perf_counter()
+            try:
+                response = send(batch)
+            except Exception as e:
+                elapsed = time.perf_counter() - started
+                latency.observe(elapsed, operation=operation, outcome="error")
+                self.sizer.record(items, elapsed, ok=False)
+                if attempt >= self.max_retries:
+                    self.metrics.counter(
+                        "tigergraph_request_failures_total", "Batches that exhausted their retries"
+                    ).inc(operation=operation)
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                self.metrics.counter(
+                    "tigergraph_request_retries_total", "Requests retried after an error"
+                ).inc(operation=operation)
+                logger.warning("[Upsert Retry] attempt %d/%d in %.2fs: %s", attempt, self.max_retries, delay, e)
+                time.sleep(delay)
+
+                # The request may have been too large: resend it in pieces
+                # of the reduced size, each with the retries left
+                size = self.sizer.rows()
+                if items > size:
+                    parts = [self._send_with_retry(send, part, attempt) for part in _split_request(batch, size)]
+                    return {"status": "OK", "count": sum(p["count"] for p in parts)}
+                continue
+
+            elapsed = time.perf_counter() - started
+            latency.observe(elapsed, operation=operation, outcome="ok")
+            sizes.observe(items, operation=operation)
+            self.sizer.record(items, elapsed)
+            return _as_result(response, batch)
+
+
+class UploadStream:
+    """
+    Upserts of one table through a ConcurrentUploader, without waiting for
+    each call's batches: upsert_vertices / upsert_edges return once the
+    batches are queued, and block while max_pending batches are in flight.
+    That keeps the reader from running ahead of a slow TigerGraph while
+    still overlapping reads and transforms with the requests.
+
+    Only one payload's batches are in flight per vertex/edge type: an
+    upsert first waits for the previous payload of the same types, so a
+    later chunk always lands after an earlier one (latest row wins, as in
+    a synchronous sync) while reading and transforming still overlap.
+
+    flush() waits for everything queued and re-raises the first failure;
+    a failure also surfaces on the next upsert. Deletes flush first.
+    cancel() drops what is still queued, for a caller that gave up.
+    on_done, if given to an upsert, is called on an upload thread once all
+    of that payload's batches were acknowledged.
+    """
+
+    def __init__(self, uploader: ConcurrentUploader, max_pending: int = DEFAULT_MAX_PENDING):
+        if max_pending < 1:
+            raise ValueError(f"max_pending must be positive, got {max_pending}")
+
+        self.uploader = uploader
+        self.max_pending = max_pending
+        self.count = 0
+        self.batches = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending: Deque[Future] = deque()
+        # ("vertex" | "edge", type) -> batches of the last payload of that type
+        self._in_flight: Dict[Tuple[str, str], List[Future]] = {}
+        self._blocked = uploader.metrics.counter(
+            "tigergraph_backpressure_seconds_total", "Seconds upserts waited for a free upload slot"
+        )
+
+    def upsert_vertices(self, payload: Dict, on_done: Optional[Callable[[], None]] = None):
+        self._submit(
+            self.uploader.client.upsert_vertices, split_vertices(payload, self.uploader.sizer.rows), on_done,
+            [("vertex", t) for t in payload.get("vertices", {})],
+        )
+
+    def upsert_edges(self, payload: Dict, on_done: Optional[Callable[[], None]] = None):
+        self._submit(
+            self.uploader.client.upsert_edges, split_edges(payload, self.uploader.sizer.rows), on_done,
+            [("edge", t) for t in payload.get("edges", {})],
+        )
+
+    def delete_vertices(self, vtype: str, v_ids: List[str]):
+        self.flush()
+        return self.uploader.delete_vertices(vtype, v_ids)
+
+    def delete_edges(self, etype: str, edges: List[Dict]):
+        self.flush()
+        return self.uploader.delete_edges(etype, edges)
+
+    def _wait_for_types(self, types: Sequence[Tuple[str, str]]):
+        previous = [f for t in types for f in self._in_flight.pop(t, ())]
+        if previous and not all(f.done() for f in previous):
+            started = time.perf_counter()
+            wait(previous)
+            self._blocked.inc(time.perf_counter() - started)
+        for future in previous:
+            # An earlier chunk failed: don't send later ones past it
+            if not future.cancelled():
+                future.result()
+
+    def _submit(self, send: Callable[[Dict], Dict], batches: Iterable[Dict],
+                on_done: Optional[Callable[[], None]] = None, types: Sequence[Tuple[str, str]] = ()):
+        self._wait_for_types(types)
+        futures = []
+        # Counted inside the upload task, so the callback has run by the time
+        # flush() sees the batch finished
+        acknowledged = _Countdown(on_done) if on_done is not None else None
+        for batch in batches:
+            self._collect(wait=False)
+            if not self._slots.acquire(blocking=False):
+                started = time.perf_counter()
+                self._slots.acquire()
+                self._blocked.inc(time.perf_counter() - started)
+
+            try:
+                future = self.uploader.executor.submit(self._send, send, batch, acknowledged)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+            self._pending.append(future)
+            futures.append(future)
+            if acknowledged is not None:
+                acknowledged.add()
+
+        if acknowledged is not None:
+            acknowledged.seal()
+        for t in types:
+            self._in_flight[t] = futures
+
+    def _send(self, send: Callable[[Dict], Dict], batch: Dict, acknowledged: Optional["_Countdown"]) -> Dict:
+        result = self.uploader._send_with_retry(send, batch)
+        if acknowledged is not None:
+            acknowledged.done()
+        return result
+
+    def _collect(self, wait: bool):
+        # Counts finished batches in submission order; raises the first error
+        while self._pending and (wait or self._pending[0].done()):
+            future = self._pending.popleft()
+            result = future.result()
+            self.count += result["count"]
+            self.batches += 1
+
+    def flush(self) -> Dict:
+        try:
+            self._collect(wait=True)
+        finally:
+            # After a failure, don't leave requests running behind the caller
+            self.cancel()
+        return {"status": "OK", "count": self.count, "batches": self.batches}
+
+    def cancel(self):
+        """
+        Drops the batches not sent yet and waits for those being sent, so no
+        request or on_done callback runs after this returns. Their errors
+        are not raised.
+        """
+        for future in self._pending:
+            future.cancel()
+        wait(self._pending)
+        self._pending.clear()
+        self._in_flight.clear()
+
+
+class _Countdown:
+    """Calls callback once every added batch is done and no more will be added."""
+
+    def __init__(self, callback: Callable[[], None]):
+        self.callback = callback
+        self._remaining = 0
+        self._sealed = False
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self._remaining += 1
+
+    def done(self):
+        with self._lock:
+            self._remaining -= 1
+            fire = self._sealed and self._remaining == 0
+        if fire:
+            self.callback()
+
+    def seal(self):
+        with self._lock:
+            self._sealed = True
+            fire = self._remaining == 0
+        if fire:
+            self.callback()
+
+
+def _as_result(response, batch) -> Dict:
+    # Clients are expected to return {"status", "count", ...}; fall back to
+    # counting the batch for sinks that return nothing.
+    if isinstance(response, dict) and "count" in response:
+        return response
+
+    if isinstance(batch, list):
+        return {"status": "OK", "count": len(batch)}
+
+    groups = batch.get("vertices") or batch.get("edges") or {}
+    return {"status": "OK", "count": sum(len(v) for v in groups.values())}
+
+
+def _unique(groups) -> List[str]:
+    seen: Dict[str, None] = {}
+    for group in groups:
+        for name in group:
+            seen.setdefault(name, None)
+    return list(seen)
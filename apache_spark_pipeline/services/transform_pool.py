@@ -0,0 +1,127 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .mapping_service import CompiledMapping, MappingEngine, _default_converter
+from ..helpers.time_utils import parse_timestamp
+
+# Chunks are split into shards of at least this many rows. A chunk too
+# small for two shards is transformed in-process, where it costs less
+# than pickling it to a worker and back. Kept well below run_sync's
+# default chunk_size (1000), which is cut into up to 4 shards.
+DEFAULT_MIN_SHARD_ROWS = 250
+
+# Converters that give the same result for a datetime and for its
+# isoformat() string. Fields converted only by these are shipped as
+# strings, which pickle about three times faster than datetime objects.
+_ISO_SAFE_CONVERTERS = {_default_converter, parse_timestamp}
+
+# Workers start on the first submit, while uploader and table threads are
+# running; forking a threaded process can copy locks other threads hold,
+# so workers come from a fresh server process instead (spawn on Windows)
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# The worker process's engine, compiled once by _init_worker
+_worker_engine: Optional[MappingEngine] = None
+
+
+def _init_worker(mappings):
+    global _worker_engine
+    _worker_engine = MappingEngine()
+    for kind, mapping in mappings:
+        if kind == "vertex":
+            _worker_engine.add_vertex_mapping(mapping)
+        else:
+            _worker_engine.add_edge_mapping(mapping)
+
+
+def _transform_shard(table: str, columns: Dict[str, List]) -> Tuple[Dict, int, int]:
+    # Runs in a worker. The worker's counters are not shared, so the rows
+    # this shard dropped and merged are returned with the payload.
+    engine = _worker_engine
+    dropped, merged = engine.dropped_rows[table], engine.merged_rows[table]
+    payload = engine.transform_columns(table, columns)
+    return payload, engine.dropped_rows[table] - dropped, engine.merged_rows[table] - merged
+
+
+def _shard_columns(plan: CompiledMapping, records: List[Dict]) -> Dict[str, List]:
+    converters: Dict[str, set] = {}
+    for name, converter in plan.id_fields + plan.attributes:
+        converters.setdefault(name, set()).add(converter)
+
+    columns = {}
+    for name in plan.fields:
+        column = [r.get(name) for r in records]
+        if converters[name] <= _ISO_SAFE_CONVERTERS:
+            column = [v.isoformat() if isinstance(v, datetime) else v for v in column]
+        columns[name] = column
+    return columns
+
+
+def shard_bounds(num_rows: int, shards: int) -> List[Tuple[int, int]]:
+    """(start, stop) of `shards` contiguous slices whose sizes differ by at most one."""
+    size, extra = divmod(num_rows, shards)
+    bounds = []
+    start = 0
+    for i in range(shards):
+        stop = start + size + (1 if i < extra else 0)
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+class TransformPool:
+    """
+    Runs MappingEngine transforms on a process pool, so CPU-bound mapping
+    uses more than the one core the GIL allows.
+
+    Every worker compiles the engine's mappings once, when it starts; after
+    that only data crosses the process boundary. A chunk is cut into one
+    contiguous shard per worker. Each shard is sent as columns of the fields
+    its mapping reads, which pickles far smaller than a list of dicts
+    (datetimes go as ISO strings where the result is the same), and is
+    converted with transform_columns. The shard payloads come back in
+    submission order and are recombined by MappingEngine.combine_payloads,
+    so the result does not depend on which worker finished first.
+    """
+
+    def __init__(self, engine: MappingEngine, max_workers: int,
+                 min_shard_rows: int = DEFAULT_MIN_SHARD_ROWS):
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be positive, got {max_workers}")
+        if min_shard_rows < 1:
+            raise ValueError(f"min_shard_rows must be positive, got {min_shard_rows}")
+
+        self.engine = engine
+        self.max_workers = max_workers
+        self.min_shard_rows = min_shard_rows
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(_START_METHOD),
+            initializer=_init_worker,
+            initargs=(list(engine.mappings.values()),),
+        )
+
+    def transform(self, table: str, records: List[Dict]) -> Dict:
+        """Same payload and counters as engine.transform_records(table, records)."""
+        shards = min(self.max_workers, len(records) // self.min_shard_rows)
+        if shards < 2:
+            return self.engine.transform_records(table, records)
+
+        plan = self.engine.plans[table]
+        futures = [
+            self.executor.submit(_transform_shard, table, _shard_columns(plan, records[start:stop]))
+            for start, stop in shard_bounds(len(records), shards)
+        ]
+
+        payloads = []
+        for future in futures:
+            payload, dropped, merged = future.result()
+            self.engine.dropped_rows[table] += dropped
+            self.engine.merged_rows[table] += merged
+            payloads.append(payload)
+        return self.engine.combine_payloads(table, payloads)
+
+    def shutdown(self):
+        self.executor.shutdown()
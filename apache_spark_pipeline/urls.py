@@ -2,16 +2,23 @@ from django.urls import path
 from .views import (
     sync_batch,
     sync_micro,
+    sync_snapshot,
+    sync_job,
     users,
     products,
     purchases,
+    metrics,
 )
 
 urlpatterns = [
     path("sync/batch/", sync_batch),
     path("sync/micro/", sync_micro),
+    path("sync/snapshot/", sync_snapshot),
+    path("sync/jobs/<str:job_id>/", sync_job),
 
     path("graph/users/", users),
     path("graph/products/", products),
     path("graph/purchases/", purchases),
+
+    path("metrics/", metrics),
 ]
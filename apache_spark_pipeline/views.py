@@ -1,41 +1,234 @@
-from django.http import JsonResponse
-from .services.sync_service import run_sync
+import base64
+import binascii
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from .services.job_service import JOB_QUEUE
+from .services.metrics import METRICS
+from .services.response_cache import RESPONSE_CACHE, etag_matches
 from .services.tigergraph_singleton import TIGERGRAPH_CLIENT
-from datetime import datetime
+from .helpers.time_utils import parse_timestamp
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# Largest `limit` the graph endpoints accept. Pages are built in memory;
+# listings without a limit are streamed instead.
+MAX_PAGE_LIMIT = 10_000
+
+# Vertices/edges serialized into each chunk of a streamed response
+STREAM_CHUNK_ITEMS = 500
 
 def sync_batch(request):
-    run_sync("batch")
-    return JsonResponse({"status": "Batch sync completed"})
+    return _enqueue_sync("batch")
 
 def sync_micro(request):
+    # Without last_timestamp each table resumes from its stored watermark.
+    # ISO 8601 (optionally with an offset) or epoch seconds/milliseconds.
     raw_ts = request.GET.get("last_timestamp")
+    last_ts = None
+
+    if raw_ts:
+        try:
+            last_ts = parse_timestamp(raw_ts)
+        except ValueError as e:
+            return JsonResponse(
+                {"error": str(e)},
+                status=400
+            )
 
-    if not raw_ts:
+    return _enqueue_sync("micro", last_ts=last_ts)
+
+def sync_snapshot(request):
+    return _enqueue_sync("snapshot")
+
+def sync_job(request, job_id):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
         return JsonResponse(
-            {"error": "No Timestamp specified"},
-            status=400
+            {"error": f"Sync job not found: {job_id}"},
+            status=404
         )
 
+    return JsonResponse(job.to_dict())
+
+def _enqueue_sync(mode, **params):
+    # Runs on the job queue; an identical queued/running job is reused
+    job, created = JOB_QUEUE.submit(mode, **params)
+
+    response = JsonResponse(
+        {
+            "status": job.status,
+            "job_id": job.job_id,
+            "coalesced": not created,
+            "status_url": f"/api/sync/jobs/{job.job_id}/",
+        },
+        status=202
+    )
+    response["Location"] = f"/api/sync/jobs/{job.job_id}/"
+    return response
+
+def metrics(request):
+    return HttpResponse(METRICS.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+def users(request):
+    return _vertex_listing(request, "users", "User")
+
+def products(request):
+    return _vertex_listing(request, "products", "Product")
+
+def purchases(request):
+    tg = TIGERGRAPH_CLIENT
+    raw_after = request.GET.get("after") or None
+
     try:
-        last_ts = datetime.fromisoformat(raw_ts).isoformat()
+        offset = _non_negative_int(request.GET.get("offset"), "offset", default=0)
+        limit = _page_limit(request)
+        after = _decode_edge_cursor(raw_after) if raw_after else None
+        ndjson = _wants_ndjson(request)
     except ValueError as e:
         return JsonResponse(
             {"error": str(e)},
             status=400
         )
 
-    run_sync("micro", last_ts)
+    def scan(n):
+        stop = offset + n if n is not None else None
+        return islice(tg.scan_edges("Purchased", after=after, limit=stop), offset, None)
 
-    return JsonResponse({"status": "Micro-batch sync completed"})
+    return _graph_listing(
+        request, "purchases", {"offset": offset, "after": raw_after, "limit": limit}, ["Purchased"],
+        scan, limit, ndjson, lambda edge: _encode_edge_cursor(edge["from_id"], edge["to_id"])
+    )
 
-def users(request):
+def _vertex_listing(request, endpoint, vtype):
     tg = TIGERGRAPH_CLIENT
-    return JsonResponse(tg.fetch_vertices("User"), safe=False)
+    after = request.GET.get("after") or None
 
-def products(request):
-    tg = TIGERGRAPH_CLIENT
-    return JsonResponse(tg.fetch_vertices("Product"), safe=False)
+    try:
+        limit = _page_limit(request)
+        ndjson = _wants_ndjson(request)
+    except ValueError as e:
+        return JsonResponse(
+            {"error": str(e)},
+            status=400
+        )
 
-def purchases(request):
-    tg = TIGERGRAPH_CLIENT
-    return JsonResponse(tg.fetch_edges("Purchased"), safe=False)
+    return _graph_listing(
+        request, endpoint, {"after": after, "limit": limit}, [vtype],
+        lambda n: tg.scan_vertices(vtype, after=after, limit=n),
+        limit, ndjson, lambda vertex: vertex["v_id"]
+    )
+
+def _graph_listing(request, endpoint, params, types, scan, limit, ndjson, cursor_of):
+    # scan(n) yields up to n items (all when n is None) in cursor order;
+    # cursor_of(item) is the `after` value that resumes behind that item.
+    # Graph data only changes when a sync writes it, so responses are cached
+    # per generation of the types they read (see response_cache).
+    if ndjson:
+        params = dict(params, format="ndjson")
+    content_type = NDJSON_CONTENT_TYPE if ndjson else "application/json"
+    etag = RESPONSE_CACHE.etag(endpoint, params, types)
+    next_cursor = None
+
+    if etag and etag_matches(request.headers.get("If-None-Match"), etag):
+        RESPONSE_CACHE.not_modified(endpoint)
+        response = HttpResponseNotModified()
+    elif limit is None:
+        # The whole listing: streamed straight from the TigerGraph scan, so
+        # memory stays flat however large the graph is
+        body = RESPONSE_CACHE.lookup(endpoint, etag)
+        if body is not None:
+            response = HttpResponse(body, content_type=content_type)
+        else:
+            chunks = _json_chunks(scan(None), ndjson)
+            response = StreamingHttpResponse(RESPONSE_CACHE.stream_through(etag, chunks), content_type=content_type)
+    else:
+        def build_page():
+            # One item past the page tells whether another page follows.
+            # The cursor is cached with the page, as a JSON first line.
+            page = list(scan(limit + 1))
+            cursor = cursor_of(page[limit - 1]) if len(page) > limit else None
+            return json.dumps(cursor).encode() + b"\n" + b"".join(_json_chunks(page[:limit], ndjson))
+
+        cursor_line, _, body = RESPONSE_CACHE.get_or_build(endpoint, etag, build_page).partition(b"\n")
+        next_cursor = json.loads(cursor_line)
+        response = HttpResponse(body, content_type=content_type)
+
+    if next_cursor is not None:
+        query = request.GET.copy()
+        query.pop("offset", None)
+        query["after"] = next_cursor
+        response["X-Next-Cursor"] = next_cursor
+        response["Link"] = f'<{request.path}?{query.urlencode()}>; rel="next"'
+    if etag:
+        response["ETag"] = etag
+        # Clients may store the body but must revalidate before reusing it
+        response["Cache-Control"] = "no-cache"
+    return response
+
+def _json_chunks(items, ndjson):
+    # A JSON array, or one JSON document per line, STREAM_CHUNK_ITEMS at a time
+    encode = DjangoJSONEncoder().encode
+    items = iter(items)
+    separator = b"" if ndjson else b"["
+
+    while True:
+        batch = list(islice(items, STREAM_CHUNK_ITEMS))
+        if not batch:
+            break
+        if ndjson:
+            yield "".join(encode(item) + "\n" for item in batch).encode()
+        else:
+            yield separator + ", ".join(map(encode, batch)).encode()
+            separator = b", "
+
+    if not ndjson:
+        yield b"[]" if separator == b"[" else b"]"
+
+def _wants_ndjson(request):
+    fmt = request.GET.get("format")
+    if fmt:
+        if fmt not in ("json", "ndjson"):
+            raise ValueError("'format' must be 'json' or 'ndjson'")
+        return fmt == "ndjson"
+    return NDJSON_CONTENT_TYPE in request.headers.get("Accept", "")
+
+def _page_limit(request):
+    limit = _non_negative_int(request.GET.get("limit"), "limit")
+    # An empty page would have no item to put the next cursor behind
+    if limit == 0:
+        raise ValueError("'limit' must be at least 1")
+    if limit is not None and limit > MAX_PAGE_LIMIT:
+        raise ValueError(f"'limit' must be at most {MAX_PAGE_LIMIT}")
+    return limit
+
+def _encode_edge_cursor(from_id, to_id):
+    raw = json.dumps([from_id, to_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_edge_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        from_id, to_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("'after' is not a valid purchases cursor")
+    return str(from_id), str(to_id)
+
+def _non_negative_int(raw, name, default=None):
+    if raw is None or raw == "":
+        return default
+
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+
+    if value < 0:
+        raise ValueError(f"'{name}' must not be negative")
+
+    return value
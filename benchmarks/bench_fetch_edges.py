@@ -0,0 +1,80 @@
+"""
+Edge export cost: one bulk export vs one round trip per vertex.
+
+Loads synthetic purchases into the mock TigerGraph with a per-call latency
+and compares the old per-vertex getEdges pattern with iter_edges paging.
+
+    python -m benchmarks.bench_fetch_edges --users 500 --edges 5000 --latency 0.001
+"""
+import argparse
+import time
+
+from apache_spark_pipeline.services.mock_tigergraph_service import TigerGraphService
+
+
+def load_graph(tg: TigerGraphService, num_users: int, num_edges: int):
+    tg.upsert_vertices({
+        "vertices": {"User": {f"u{i}": {"name": f"User-{i}"} for i in range(num_users)}}
+    })
+    tg.upsert_edges({
+        "edges": {
+            "Purchased": [
+                {
+                    "from_type": "User",
+                    "from_id": f"u{i % num_users}",
+                    "to_type": "Product",
+                    "to_id": f"p{i % 50}",
+                    "attributes": {"amount": float(i)},
+                }
+                for i in range(num_edges)
+            ]
+        }
+    })
+
+
+def per_vertex_export(tg: TigerGraphService, etype: str):
+    edges = []
+    for vertex in tg.fetch_vertices("User"):
+        edges.extend(tg.get_edges("User", vertex["v_id"], etype))
+    return edges
+
+
+def paged_export(tg: TigerGraphService, etype: str, page_size: int):
+    edges, offset = [], 0
+    while True:
+        page = tg.fetch_edges(etype, offset=offset, limit=page_size)
+        edges.extend(page)
+        if len(page) < page_size:
+            return edges
+        offset += page_size
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--edges", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.001)
+    args = parser.parse_args()
+
+    tg = TigerGraphService()
+    load_graph(tg, args.users, args.edges)
+    tg.latency = args.latency
+
+    print(f"{'export':<14}{'seconds':>10}{'edges':>10}")
+    for name, fn in [
+        ("per vertex", lambda: per_vertex_export(tg, "Purchased")),
+        ("bulk paged", lambda: paged_export(tg, "Purchased", args.page_size)),
+    ]:
+        elapsed, count = timed(fn)
+        print(f"{name:<14}{elapsed:>10.3f}{count:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Rows/sec for the MappingEngine transform paths.
+
+Compares a naive per-row path (a converter call and a dict per field per
+row), the compiled per-row path and the column-at-a-time path on
+synthetic purchase rows, then the memory held per edge by an EdgeBatch
+against the list of per-edge dicts it replaced. With --workers N the
+compiled path is also timed on a TransformPool of N processes.
+
+    python -m benchmarks.bench_mapping_engine --rows 200000 --workers 4
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from apache_spark_pipeline.helpers.mappers import PURCHASE_EDGE
+from apache_spark_pipeline.services.mapping_service import MappingEngine
+from apache_spark_pipeline.services.transform_pool import TransformPool
+
+
+def make_purchases(num_rows: int, seed: int = 7):
+    rng = random.Random(seed)
+    base_time = datetime(2026, 1, 1, 11, 0, 0)
+
+    return [
+        {
+            "user_id": f"u{rng.randint(1, 10_000)}",
+            "product_id": f"p{rng.randint(1, 1_000)}",
+            "amount": round(rng.uniform(5, 500), 2),
+            "updated_at": (base_time + timedelta(minutes=i)).isoformat(),
+            "ordered_at": base_time + timedelta(minutes=i),
+        }
+        for i in range(num_rows)
+    ]
+
+
+def interpreted_transform_edges(engine: MappingEngine, mapping, records):
+    # The per-row, per-dict path the engine replaced, kept here as the
+    # reference point; it uses the compiled plan's converters.
+    plan = engine.plans[mapping.table]
+    (from_field, from_conv), (to_field, to_conv) = plan.id_fields
+    edges = []
+    for rec in records:
+        if rec.get(from_field) is None or rec.get(to_field) is None:
+            continue
+        from_id = from_conv(rec[from_field])
+        to_id = to_conv(rec[to_field])
+        attrs = {
+            attr: conv(rec[attr])
+            for attr, conv in plan.attributes
+            if rec.get(attr) is not None
+        }
+        edges.append({
+            "from_type": mapping.from_vertex_type,
+            "from_id": str(from_id),
+            "to_type": mapping.to_vertex_type,
+            "to_id": str(to_id),
+            "attributes": attrs,
+        })
+    return {"edges": {mapping.edge_type: edges}}
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained_bytes(build) -> int:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        # The result is kept alive until measured
+        result = build()
+        retained = tracemalloc.get_traced_memory()[0] - before
+        del result
+        return retained
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=0, help="also time a TransformPool of this size")
+    args = parser.parse_args()
+
+    engine = MappingEngine()
+    engine.add_edge_mapping(PURCHASE_EDGE)
+
+    records = make_purchases(args.rows)
+    columns = {key: [r[key] for r in records] for key in records[0]}
+
+    paths = {
+        "interpreted rows": lambda: interpreted_transform_edges(engine, PURCHASE_EDGE, records),
+        "compiled rows": lambda: engine.transform_records("purchases", records),
+        "columnar": lambda: engine.transform_columns("purchases", columns),
+    }
+    pool = TransformPool(engine, args.workers) if args.workers else None
+    if pool is not None:
+        pool.transform("purchases", records)  # start the workers outside the timing
+        paths[f"pool ({args.workers})"] = lambda: pool.transform("purchases", records)
+
+    baseline = None
+    print(f"{'path':<18}{'seconds':>10}{'rows/sec':>14}{'speedup':>10}")
+    for name, fn in paths.items():
+        elapsed = best_of(fn, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:<18}{elapsed:>10.3f}{args.rows / elapsed:>14,.0f}{baseline / elapsed:>9.2f}x")
+    if pool is not None:
+        pool.shutdown()
+
+    # The batch figure includes the converted values; the dict form reuses
+    # them, so its figure is container overhead alone
+    batch = engine.transform_records("purchases", records)["edges"][PURCHASE_EDGE.edge_type]
+    batch_bytes = retained_bytes(lambda: engine.transform_records("purchases", records))
+    dict_bytes = retained_bytes(batch.to_list)
+    print(f"\nbytes/edge: EdgeBatch {batch_bytes / args.rows:.0f}, "
+          f"list of dicts {dict_bytes / args.rows:.0f} ({dict_bytes / batch_bytes:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
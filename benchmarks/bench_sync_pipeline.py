@@ -0,0 +1,305 @@
+"""
+End-to-end rows/sec for run_sync against the mock TigerGraph.
+
+Generates synthetic users/products/purchases tables, registers them in the
+mock catalog and runs a batch sync followed by a micro-batch over the rows
+touched since. Reports per-stage seconds (read, transform, upsert), rows/sec
+and tracemalloc peak per mode, and can compare against a stored baseline.
+
+    python -m benchmarks.bench_sync_pipeline --rows 100000 --latency 0.0005
+    python -m benchmarks.bench_sync_pipeline --rows 10000 --save-baseline benchmarks/baseline_sync.json
+    python -m benchmarks.bench_sync_pipeline --rows 10000 --baseline benchmarks/baseline_sync.json
+
+--rows is the purchases row count (1e3 to 1e7); users and products are
+scaled from it. --skew is the Zipf exponent used to pick the user/product of
+each purchase (0 is uniform) and --null-ratio the share of nullable
+attributes (name, email, price, amount, ordered_at) left empty.
+--bulk-load-threshold N sends full-table batches of at least N rows through
+a GSQL loading job; it defaults to 0 (REST++ only) because the mock parses
+the loading-job CSV in-process, which says little about server-side loads.
+--warehouse DIR writes the tables as Parquet files under DIR and reads them
+from there (needs pyarrow) instead of from in-memory lists.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from apache_spark_pipeline.helpers.mock_iceberg_data import MOCK_ICEBERG_DATA
+from apache_spark_pipeline.services.checkpoint_service import InMemoryCheckpointStore
+from apache_spark_pipeline.services.mock_tigergraph_service import TigerGraphService
+from apache_spark_pipeline.services.sync_service import run_sync
+
+STAGES = ("read", "transform", "upsert")
+BASE_TIME = datetime(2026, 1, 1)
+
+
+def _maybe_null(rng, ratio, value):
+    return None if ratio and rng.random() < ratio else value
+
+
+def _zipf_weights(n, skew):
+    # Rank r gets weight 1 / r**skew; cumulative so rng.choices bisects
+    return list(accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def make_tables(num_rows, skew=1.0, null_ratio=0.0, seed=7):
+    rng = random.Random(seed)
+    num_users = max(num_rows // 10, 10)
+    num_products = max(num_rows // 100, 10)
+
+    users = [
+        {
+            "user_id": f"u{i}",
+            "name": _maybe_null(rng, null_ratio, f"User-{i}"),
+            "email": _maybe_null(rng, null_ratio, f"user{i}@example.com"),
+            "updated_at": (BASE_TIME + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(num_users)
+    ]
+    products = [
+        {
+            "product_id": f"p{i}",
+            "name": _maybe_null(rng, null_ratio, f"Product-{i}"),
+            "price": _maybe_null(rng, null_ratio, round(rng.uniform(1, 1000), 2)),
+            "updated_at": (BASE_TIME + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(num_products)
+    ]
+
+    user_ids = rng.choices(range(num_users), cum_weights=_zipf_weights(num_users, skew), k=num_rows)
+    product_ids = rng.choices(range(num_products), cum_weights=_zipf_weights(num_products, skew), k=num_rows)
+    purchases = [
+        {
+            "user_id": f"u{u}",
+            "product_id": f"p{p}",
+            "amount": _maybe_null(rng, null_ratio, round(rng.uniform(5, 500), 2)),
+            "updated_at": (BASE_TIME + timedelta(seconds=i)).isoformat(),
+            "ordered_at": _maybe_null(rng, null_ratio, (BASE_TIME + timedelta(seconds=i)).isoformat()),
+        }
+        for i, (u, p) in enumerate(zip(user_ids, product_ids))
+    ]
+
+    return {
+        "main.sales.users": users,
+        "main.sales.products": products,
+        "main.sales.purchases": purchases,
+    }
+
+
+def touch_rows(tables, ratio, seed=11):
+    """
+    New table lists where a share of the rows got a later updated_at, as
+    if they were rewritten after the batch run.
+    """
+    rng = random.Random(seed)
+    touched_at = (BASE_TIME + timedelta(days=3650)).isoformat()
+    touched = {}
+
+    for name, records in tables.items():
+        rows = list(records)
+        for i in rng.sample(range(len(rows)), int(len(rows) * ratio)):
+            rows[i] = dict(rows[i], updated_at=touched_at)
+        touched[name] = rows
+
+    return touched
+
+
+@contextmanager
+def registered_tables(tables, warehouse=None):
+    if warehouse:
+        from apache_spark_pipeline.helpers.arrow_catalog import write_table
+
+        for name, records in tables.items():
+            write_table(warehouse, name, records, rows_per_file=100_000)
+        previous_warehouse = os.environ.get("UNITY_CATALOG_WAREHOUSE")
+        os.environ["UNITY_CATALOG_WAREHOUSE"] = warehouse
+        try:
+            yield
+        finally:
+            if previous_warehouse is None:
+                os.environ.pop("UNITY_CATALOG_WAREHOUSE", None)
+            else:
+                os.environ["UNITY_CATALOG_WAREHOUSE"] = previous_warehouse
+        return
+
+    previous = {name: MOCK_ICEBERG_DATA.get(name) for name in tables}
+    MOCK_ICEBERG_DATA.update(tables)
+    try:
+        yield
+    finally:
+        for name, records in previous.items():
+            if records is None:
+                MOCK_ICEBERG_DATA.pop(name, None)
+            else:
+                MOCK_ICEBERG_DATA[name] = records
+
+
+def run_mode(mode, tables, checkpoints, tg, args, trace_memory=False):
+    if trace_memory:
+        tracemalloc.start()
+
+    with registered_tables(tables, args.warehouse):
+        # Writing the warehouse files is not part of the sync
+        started = time.perf_counter()
+        summary = run_sync(
+            mode,
+            chunk_size=args.chunk_size,
+            tg=tg,
+            upload_batch_size=args.upload_batch_size,
+            upload_concurrency=args.upload_concurrency,
+            upload_queue_size=args.upload_queue_size,
+            checkpoints=checkpoints,
+            table_workers=args.table_workers,
+            transform_workers=args.transform_workers,
+            bulk_load_threshold=args.bulk_load_threshold or None,
+        )
+    elapsed = time.perf_counter() - started
+
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    rows = sum(stats["rows"] for stats in summary.values())
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else 0.0,
+        "stages": {
+            stage: sum(stats["timings"][stage] for stats in summary.values())
+            for stage in STAGES
+        },
+        "peak_memory_mb": peak / 2 ** 20 if peak is not None else None,
+    }
+
+
+def run_benchmark(args):
+    tables = make_tables(args.rows, args.skew, args.null_ratio, args.seed)
+    touched = touch_rows(tables, args.update_ratio)
+    results = {}
+
+    # Timing passes first, keeping the fastest of --repeat runs per mode;
+    # tracemalloc slows allocation-heavy code a lot, so memory is measured
+    # in one more, identical pass.
+    passes = [False] * args.repeat + ([] if args.no_memory else [True])
+    for trace_memory in passes:
+        checkpoints = InMemoryCheckpointStore()
+        tg = TigerGraphService(latency=args.latency)
+
+        for mode, data in (("batch", tables), ("micro", touched)):
+            result = run_mode(mode, data, checkpoints, tg, args, trace_memory)
+            if trace_memory:
+                results[mode]["peak_memory_mb"] = result["peak_memory_mb"]
+            elif mode not in results or result["seconds"] < results[mode]["seconds"]:
+                results[mode] = result
+
+    return results
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares rows/sec per mode and seconds per stage with the baseline;
+    anything worse by more than tolerance (0.25 = 25%) is reported.
+    """
+    regressions = []
+
+    for mode, result in results.items():
+        expected = baseline.get("results", {}).get(mode)
+        if not expected:
+            continue
+
+        if result["rows_per_sec"] < expected["rows_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{mode}: {result['rows_per_sec']:.0f} rows/s vs baseline {expected['rows_per_sec']:.0f}"
+            )
+
+        for stage in STAGES:
+            seconds, before = result["stages"][stage], expected["stages"].get(stage)
+            # Ignore stages too short to time reliably
+            if before and before > 0.01 and seconds > before * (1 + tolerance):
+                regressions.append(f"{mode}/{stage}: {seconds:.3f}s vs baseline {before:.3f}s")
+
+        peak, before = result.get("peak_memory_mb"), expected.get("peak_memory_mb")
+        if peak is not None and before and peak > before * (1 + tolerance):
+            regressions.append(f"{mode}/memory: {peak:.1f} MiB vs baseline {before:.1f} MiB")
+
+    return regressions
+
+
+def print_results(results):
+    print(f"{'mode':<8}{'rows':>10}{'seconds':>10}{'rows/s':>12}"
+          + "".join(f"{stage:>11}" for stage in STAGES) + f"{'peak MiB':>10}")
+    for mode, r in results.items():
+        peak = f"{r['peak_memory_mb']:.1f}" if r["peak_memory_mb"] is not None else "-"
+        print(f"{mode:<8}{r['rows']:>10}{r['seconds']:>10.3f}{r['rows_per_sec']:>12.0f}"
+              + "".join(f"{r['stages'][stage]:>11.3f}" for stage in STAGES) + f"{peak:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--null-ratio", type=float, default=0.05)
+    parser.add_argument("--update-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--upload-batch-size", type=int, default=500)
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--upload-queue-size", type=int, default=8)
+    parser.add_argument("--table-workers", type=int, default=4)
+    parser.add_argument("--transform-workers", type=int, default=0)
+    parser.add_argument("--bulk-load-threshold", type=int, default=0)
+    parser.add_argument("--warehouse", help="directory to write and read the tables as Parquet")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--baseline", help="JSON written by --save-baseline to compare against")
+    parser.add_argument("--save-baseline", help="write this run's results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if not 1_000 <= args.rows <= 10_000_000:
+        parser.error("--rows must be between 1e3 and 1e7")
+    if args.repeat < 1:
+        parser.error("--repeat must be positive")
+
+    results = run_benchmark(args)
+    print_results(results)
+
+    params = {
+        name: getattr(args, name)
+        for name in ("rows", "skew", "null_ratio", "update_ratio", "seed", "latency",
+                     "chunk_size", "upload_batch_size", "upload_concurrency", "upload_queue_size",
+                     "table_workers", "transform_workers", "bulk_load_threshold")
+    }
+    params["catalog"] = "parquet" if args.warehouse else "memory"
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"params": params, "results": results}, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        if baseline.get("params") != params:
+            print(f"Warning: baseline was recorded with {baseline.get('params')}")
+
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Values/sec for timestamp normalization.
+
+Compares the original parser (strptime over each supported format until
+one fits), parse_timestamp per value and parse_timestamps per column on
+columns of one format each.
+
+    python -m benchmarks.bench_time_utils --rows 100000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from apache_spark_pipeline.helpers.time_utils import parse_timestamp, parse_timestamps
+
+LEGACY_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+]
+
+
+def legacy_parse_timestamp(value):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value)).isoformat()
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid timestamp format: {value}")
+
+
+def make_columns(num_rows: int, seed: int = 7):
+    rng = random.Random(seed)
+    stamps = [
+        datetime(2026, 1, 1) + timedelta(seconds=rng.randint(0, 365 * 86400))
+        for _ in range(num_rows)
+    ]
+    return {
+        "iso T seconds": [s.isoformat() for s in stamps],
+        "iso space minutes": [s.strftime("%Y-%m-%d %H:%M") for s in stamps],
+        "epoch seconds": [str(int((s - datetime(1970, 1, 1)).total_seconds())) for s in stamps],
+    }
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'column':<20}{'path':<14}{'seconds':>10}{'values/sec':>14}{'speedup':>10}")
+    for column, values in make_columns(args.rows).items():
+        baseline = None
+        for name, fn in [
+            ("legacy", lambda: [legacy_parse_timestamp(v) for v in values]),
+            ("per value", lambda: [parse_timestamp(v) for v in values]),
+            ("column", lambda: parse_timestamps(values)),
+        ]:
+            elapsed = best_of(fn, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{column:<20}{name:<14}{elapsed:>10.3f}{args.rows / elapsed:>14,.0f}{baseline / elapsed:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# The singleton client is built lazily, so this takes effect before first use
+os.environ.setdefault("TIGERGRAPH_BACKEND", "mock")
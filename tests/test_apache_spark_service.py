@@ -1,4 +1,12 @@
-from apache_spark_pipeline.services.apache_spark_service import SparkService
+import pytest
+
+from apache_spark_pipeline.helpers.mock_iceberg_data import MOCK_ICEBERG_DATA
+from apache_spark_pipeline.helpers.mappers import PURCHASE_EDGE
+from apache_spark_pipeline.helpers.predicates import Between, Comparison, IsNotNull
+from apache_spark_pipeline.helpers.snapshots import diff_snapshots
+from apache_spark_pipeline.helpers.spark_data_frame import SparkDataFrame
+from apache_spark_pipeline.services.apache_spark_service import ReadPlan, SparkService
+from apache_spark_pipeline.services.mapping_service import compile_mapping
 
 def test_read_batch_returns_dataframe():
     spark = SparkService()
@@ -28,3 +36,153 @@ def test_read_microbatch_filters_by_timestamp():
 def test_stop_service_does_not_crash():
     spark = SparkService()
     spark.stop_service()
+
+def test_iter_batches_yields_bounded_slices():
+    spark = SparkService()
+    df = spark.read_batch("main.sales.users")
+
+    batches = list(df.iter_batches(64))
+
+    assert all(len(b) <= 64 for b in batches)
+    assert sum(len(b) for b in batches) == df.count()
+
+
+def make_frame():
+    return SparkDataFrame([
+        {"id": 3, "updated_at": "2026-01-03T00:00:00"},
+        {"id": 1, "updated_at": "2026-01-01T00:00:00"},
+        {"id": 0},
+        {"id": 2, "updated_at": "2026-01-02T00:00:00"},
+        {"id": 4, "updated_at": "2026-01-04T00:00:00"},
+    ])
+
+
+def ids(df):
+    return [r["id"] for r in df.collect()]
+
+
+def test_filter_supports_comparisons_and_ranges():
+    df = make_frame()
+
+    assert ids(df.filter(Comparison("updated_at", ">", "2026-01-02T00:00:00"))) == [3, 4]
+    assert ids(df.filter(Comparison("updated_at", ">=", "2026-01-02T00:00:00"))) == [2, 3, 4]
+    assert ids(df.filter(Comparison("updated_at", "<", "2026-01-02T00:00:00"))) == [1]
+    assert ids(df.filter(Between("updated_at", "2026-01-02", "2026-01-04"))) == [2, 3]
+
+
+def test_filter_parses_string_expressions():
+    df = make_frame()
+
+    assert ids(df.filter("updated_at > '2026-01-03T00:00:00'")) == [4]
+    assert ids(df.filter("id >= 3")) == [3, 4]
+
+    with pytest.raises(ValueError):
+        df.filter("updated_at between yesterday and today")
+
+
+def test_sorted_index_is_built_once_and_refreshed_on_append():
+    df = make_frame()
+
+    df.filter(Comparison("updated_at", ">", "2026-01-01"))
+    index = df.index("updated_at")
+    df.filter(Comparison("updated_at", ">", "2026-01-02"))
+    assert df.index("updated_at") is index
+
+    df.append({"id": 5, "updated_at": "2026-01-05T00:00:00"})
+    assert ids(df.filter(Comparison("updated_at", ">", "2026-01-04T00:00:00"))) == [5]
+
+
+def test_sorted_index_is_refreshed_on_in_place_edits():
+    df = make_frame()
+    after = Comparison("updated_at", ">", "2026-01-03T00:00:00")
+    assert ids(df.filter(after)) == [4]
+
+    # Same row count: an edited value, then a replaced row
+    df.update(0, {"updated_at": "2026-01-09T00:00:00"})
+    assert ids(df.filter(after)) == [4, 3]
+
+    df.replace(1, {"id": 7, "updated_at": "2026-01-02T00:00:00"})
+    df.update(0, {"name": "renamed"})
+    assert df.filter(after).collect()[1] is df.records[0]
+    assert ids(df.filter(Comparison("updated_at", "==", "2026-01-02T00:00:00"))) == [7, 2]
+
+
+def test_catalog_reuses_table_frames_between_reads():
+    first = SparkService().read_batch("main.sales.users")
+    second = SparkService().read_batch("main.sales.users")
+
+    assert first is second
+
+
+def test_snapshot_id_only_changes_with_content(monkeypatch):
+    rows = [{"sku": "a", "price": 1.0}, {"sku": "b", "price": 2.0}]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.test.skus", rows)
+    spark = SparkService()
+
+    first = spark.current_snapshot("main.test.skus")
+    assert spark.current_snapshot("main.test.skus").snapshot_id == first.snapshot_id
+
+    rows[0]["price"] = 1.5
+    assert spark.current_snapshot("main.test.skus").snapshot_id != first.snapshot_id
+
+
+def test_snapshot_diff_reports_added_removed_and_changed(monkeypatch):
+    rows = [
+        {"sku": "a", "price": 1.0},
+        {"sku": "b", "price": 2.0},
+        {"sku": "c", "price": 3.0},
+    ]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.test.skus", rows)
+    spark = SparkService()
+    # Only keys and row hashes of the previous snapshot are kept
+    before = diff_snapshots({}, spark.current_snapshot("main.test.skus"), ["sku"]).keys
+    assert sorted(before) == ['["a"]', '["b"]', '["c"]']
+
+    rows[1]["price"] = 2.5
+    del rows[2]
+    rows.append({"sku": "d", "price": 4.0})
+
+    diff = diff_snapshots(before, spark.current_snapshot("main.test.skus"), ["sku"])
+
+    assert [r["sku"] for r in diff.added] == ["d"]
+    assert [r["sku"] for r in diff.changed] == ["b"]
+    assert diff.removed == [{"sku": "c"}]
+    assert sorted(diff.keys) == ['["a"]', '["b"]', '["d"]']
+
+
+def test_snapshot_diff_resends_every_row_of_a_changed_key(monkeypatch):
+    rows = [
+        {"user_id": "u1", "product_id": "p1", "amount": 1.0},
+        {"user_id": "u1", "product_id": "p1", "amount": 2.0},
+        {"user_id": "u2", "product_id": "p1", "amount": 3.0},
+    ]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.test.edges", rows)
+    spark = SparkService()
+    key_columns = ["user_id", "product_id"]
+
+    before = diff_snapshots({}, spark.current_snapshot("main.test.edges"), key_columns).keys
+    rows[0]["amount"] = 1.5
+    diff = diff_snapshots(before, spark.current_snapshot("main.test.edges"), key_columns)
+
+    assert len(before) == 2
+    assert [r["amount"] for r in diff.changed] == [1.5, 2.0]
+    assert diff.added == diff.removed == []
+
+
+def test_read_plan_projects_mapped_fields_and_skips_rows_without_ids(monkeypatch):
+    plan = ReadPlan.for_mapping(compile_mapping("edge", PURCHASE_EDGE), keep=("updated_at",))
+
+    assert plan.columns == ("user_id", "product_id", "amount", "updated_at", "ordered_at")
+    assert plan.predicates == (IsNotNull("user_id"), IsNotNull("product_id"))
+
+    rows = [
+        {"user_id": "u1", "product_id": "p1", "updated_at": "2026-01-01T00:00:00"},
+        {"user_id": None, "product_id": "p1", "updated_at": "2026-01-02T00:00:00"},
+        {"user_id": "u2", "updated_at": "2026-01-03T00:00:00"},
+        {"user_id": "u3", "product_id": "p3", "updated_at": "2026-01-04T00:00:00"},
+    ]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.test.purchases", rows)
+    spark = SparkService()
+
+    assert [r["user_id"] for r in spark.read_batch("main.test.purchases", plan).collect()] == ["u1", "u3"]
+    assert [r["user_id"] for r in spark.read_microbatch("main.test.purchases", "2026-01-01T00:00:00", plan).collect()] == ["u3"]
@@ -0,0 +1,184 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from apache_spark_pipeline.helpers import arrow_catalog
+from apache_spark_pipeline.helpers.arrow_catalog import ArrowWarehouse, write_table
+from apache_spark_pipeline.helpers.mock_iceberg_data import MOCK_ICEBERG_DATA
+from apache_spark_pipeline.helpers.predicates import Between, Comparison, IsNotNull
+from apache_spark_pipeline.services.apache_spark_service import SparkService
+from apache_spark_pipeline.services.checkpoint_service import InMemoryCheckpointStore
+from apache_spark_pipeline.services.mock_tigergraph_service import TigerGraphService
+from apache_spark_pipeline.services.sync_service import run_sync
+
+ROWS = [
+    {"id": i, "name": f"n{i}" if i % 4 else None, "updated_at": f"2026-01-{i + 1:02d}T00:00:00",
+     "ordered_at": datetime(2026, 1, i + 1, 12)}
+    for i in range(10)
+]
+
+
+@pytest.fixture(params=["parquet", "arrow"])
+def warehouse(tmp_path, request):
+    write_table(tmp_path, "main.test.rows", ROWS, rows_per_file=4, file_format=request.param)
+    return ArrowWarehouse(tmp_path)
+
+
+def ids(df):
+    return [r["id"] for r in df.collect()]
+
+
+def test_tables_are_read_from_iceberg_style_directories(warehouse, tmp_path):
+    assert len(warehouse.data_files("main.test.rows")) == 3
+    assert (tmp_path / "main" / "test" / "rows" / "data").is_dir()
+
+    df = warehouse.table("main.test.rows")
+    assert df.count() == 10
+    assert df.collect() == ROWS
+
+    with pytest.raises(ValueError):
+        warehouse.table("main.test.missing")
+    with pytest.raises(ValueError):
+        warehouse.table("main.../secrets")
+
+
+def test_projection_reads_only_the_given_columns(warehouse):
+    df = warehouse.table("main.test.rows", columns=["id", "name"])
+
+    assert df.collect()[1] == {"id": 1, "name": "n1"}
+
+    # Columns the table lacks are left out, unless required
+    assert warehouse.table("main.test.rows", columns=["id", "price"]).collect()[1] == {"id": 1}
+    with pytest.raises(ValueError):
+        warehouse.table("main.test.rows", columns=["id", "price"], required=["price"])
+
+
+def test_batches_are_full_across_files_and_filters(warehouse):
+    df = warehouse.table("main.test.rows")
+
+    assert [len(b) for b in df.iter_batches(3)] == [3, 3, 3, 1]
+
+    filtered = df.filter(Comparison("updated_at", ">=", "2026-01-03T00:00:00"))
+    assert [len(b) for b in filtered.iter_batches(3)] == [3, 3, 2]
+    assert filtered.count() == 8
+
+
+def test_filters_match_spark_dataframe(warehouse):
+    df = warehouse.table("main.test.rows", columns=["id"])
+    frame = SparkService().dataframe(ROWS)
+
+    for predicate in (
+        Comparison("updated_at", ">", "2026-01-08T00:00:00"),
+        Between("updated_at", "2026-01-02", "2026-01-05"),
+        Comparison("name", "==", "n6"),
+        IsNotNull("name"),
+        Comparison("ordered_at", "<", "2026-01-03"),
+        "id >= 7",
+    ):
+        assert ids(df.filter(predicate)) == ids(frame.filter(predicate))
+
+
+def test_batch_sync_from_a_warehouse(tmp_path, monkeypatch):
+    for name, records in MOCK_ICEBERG_DATA.items():
+        write_table(tmp_path, name, records, rows_per_file=64)
+    monkeypatch.setenv("UNITY_CATALOG_WAREHOUSE", str(tmp_path))
+
+    tg = TigerGraphService()
+    summary = run_sync("batch", tg=tg, checkpoints=InMemoryCheckpointStore(), chunk_size=50)
+
+    assert summary["users"]["rows"] == len(MOCK_ICEBERG_DATA["main.sales.users"])
+    assert len(tg.fetch_vertices("User")) == len(MOCK_ICEBERG_DATA["main.sales.users"])
+
+
+def test_sync_reads_only_mapped_columns_and_rows_with_ids(tmp_path, monkeypatch):
+    purchases = [
+        dict(p, note="x" * 100, product_id=None if i % 10 == 0 else p["product_id"])
+        for i, p in enumerate(MOCK_ICEBERG_DATA["main.sales.purchases"])
+    ]
+    for name, records in dict(MOCK_ICEBERG_DATA, **{"main.sales.purchases": purchases}).items():
+        write_table(tmp_path, name, records)
+    monkeypatch.setenv("UNITY_CATALOG_WAREHOUSE", str(tmp_path))
+    read_columns = []
+    original = ArrowWarehouse.table
+
+    def table(self, table_name, columns=None, required=()):
+        read_columns.append(columns)
+        return original(self, table_name, columns, required)
+
+    monkeypatch.setattr(ArrowWarehouse, "table", table)
+
+    summary = run_sync("batch", tg=TigerGraphService(), checkpoints=InMemoryCheckpointStore())
+
+    assert all("note" not in columns for columns in read_columns)
+    assert summary["purchases"]["rows"] == len(purchases) - 10
+    assert summary["purchases"]["rows_dropped"] == 0
+
+
+def test_sync_reads_tables_without_optional_columns(tmp_path, monkeypatch):
+    # No updated_at watermark and no email attribute
+    users = [{"user_id": u["user_id"], "name": u["name"]} for u in MOCK_ICEBERG_DATA["main.sales.users"]]
+    for name, records in dict(MOCK_ICEBERG_DATA, **{"main.sales.users": users}).items():
+        write_table(tmp_path, name, records)
+    monkeypatch.setenv("UNITY_CATALOG_WAREHOUSE", str(tmp_path))
+    tg = TigerGraphService()
+
+    summary = run_sync("batch", tg=tg, checkpoints=InMemoryCheckpointStore())
+
+    assert summary["users"]["rows"] == len(users)
+    assert summary["users"]["high_watermark"] is None
+    assert tg.get_vertex("User", users[0]["user_id"])["attributes"]["name"] == users[0]["name"]
+
+
+def test_tables_without_an_id_column_are_rejected(tmp_path):
+    write_table(tmp_path, "main.sales.users", [{"name": "Alice"}])
+    warehouse = ArrowWarehouse(tmp_path)
+
+    assert warehouse.table("main.sales.users", ["user_id", "name"]).columns == ["name"]
+    with pytest.raises(ValueError, match=r"missing columns \['user_id'\]"):
+        warehouse.table("main.sales.users", ["user_id", "name"], required=["user_id"])
+
+
+def test_batches_start_at_an_offset(warehouse):
+    df = warehouse.table("main.test.rows")
+
+    # Skips the first file from its footer and part of the second
+    assert [[r["id"] for r in b] for b in df.iter_batches(3, offset=5)] == [[5, 6, 7], [8, 9]]
+    assert list(df.iter_batches(3, offset=10)) == []
+
+    filtered = df.filter(IsNotNull("name"))
+    assert [r["id"] for b in filtered.iter_batches(4, offset=2) for r in b] == [3, 5, 6, 7, 9]
+
+
+def test_table_version_changes_with_the_data(tmp_path):
+    write_table(tmp_path, "main.test.rows", ROWS)
+    warehouse = ArrowWarehouse(tmp_path)
+    version = warehouse.table_version("main.test.rows")
+
+    assert warehouse.table_version("main.test.rows") == version
+    write_table(tmp_path, "main.test.rows", ROWS[:5])
+    assert warehouse.table_version("main.test.rows") != version
+
+
+def test_filtered_count_and_offsets_read_only_filter_columns(warehouse, monkeypatch):
+    reads = []
+    original = arrow_catalog._read_file
+
+    def read_file(path, columns, batch_size):
+        reads.append((path.name, columns))
+        return original(path, columns, batch_size)
+
+    monkeypatch.setattr(arrow_catalog, "_read_file", read_file)
+    df = warehouse.table("main.test.rows", columns=["id", "updated_at"]).filter(IsNotNull("name"))
+    first, second, last = (p.name for p in warehouse.data_files("main.test.rows"))
+
+    assert df.count() == 7
+    assert reads == [(first, ["name"]), (second, ["name"]), (last, ["name"])]
+
+    # The first file keeps 3 rows: it is counted from its filter column
+    # and skipped, not converted
+    reads.clear()
+    assert [r["id"] for b in df.iter_batches(2, offset=4) for r in b] == [6, 7, 9]
+    assert (first, ["name"]) in reads
+    assert (first, ["id", "updated_at", "name"]) not in reads
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from apache_spark_pipeline.services.job_service import FAILED, SUCCEEDED, SyncJobQueue
+
+
+class BlockingRunner:
+    """run_sync stand-in that reports progress and waits until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, mode, progress=None, **params):
+        self.calls.append((mode, params))
+        progress("users", {"rows": 10, "chunks": 1})
+        self.release.wait(5)
+        return {"users": {"rows": 10}}
+
+
+def test_job_runs_in_background_and_reports_progress():
+    runner = BlockingRunner()
+    queue = SyncJobQueue(runner=runner)
+
+    job, created = queue.submit("batch")
+    assert created
+    assert queue.get(job.job_id) is job
+
+    runner.release.set()
+    queue.wait(job.job_id, timeout=5)
+
+    status = job.to_dict()
+    assert status["status"] == SUCCEEDED
+    assert status["progress"] == {"users": {"rows": 10, "chunks": 1}}
+    assert status["tables"] == {"users": {"rows": 10}}
+    assert status["duration_seconds"] >= 0
+    queue.shutdown()
+
+
+def test_overlapping_triggers_coalesce_into_one_job():
+    runner = BlockingRunner()
+    queue = SyncJobQueue(runner=runner)
+
+    first, _ = queue.submit("micro", last_ts="2026-01-01T00:00:00")
+    second, created = queue.submit("micro", last_ts="2026-01-01T00:00:00")
+    other, other_created = queue.submit("micro", last_ts="2026-02-01T00:00:00")
+
+    assert second is first and not created
+    assert other is not first and other_created
+
+    runner.release.set()
+    queue.wait(first.job_id, timeout=5)
+    queue.wait(other.job_id, timeout=5)
+    assert len(runner.calls) == 2
+
+    # Finished jobs no longer absorb new triggers
+    again, created = queue.submit("micro", last_ts="2026-01-01T00:00:00")
+    assert created and again is not first
+    queue.wait(again.job_id, timeout=5)
+    queue.shutdown()
+
+
+def test_failed_job_records_error():
+    def failing(mode, progress=None, **params):
+        raise ValueError("catalog unavailable")
+
+    queue = SyncJobQueue(runner=failing)
+    job, _ = queue.submit("batch")
+    queue.wait(job.job_id, timeout=5)
+
+    assert job.status == FAILED
+    assert job.error == "catalog unavailable"
+    assert job.finished_at is not None
+    queue.shutdown()
+
+
+def test_wait_rejects_unknown_job():
+    with pytest.raises(ValueError):
+        SyncJobQueue().wait("missing")
+
+
+def test_progress_reports_resumed_rows():
+    def runner(mode, progress=None, **params):
+        progress("purchases", {"rows": 60, "chunks": 6, "resumed_from": 40, "rows_committed": 100})
+        return {}
+
+    queue = SyncJobQueue(runner=runner)
+    job, _ = queue.submit("batch")
+    queue.wait(job.job_id, timeout=5)
+
+    assert job.to_dict()["progress"]["purchases"] == {
+        "rows": 60, "chunks": 6, "resumed_from": 40, "rows_committed": 100,
+    }
+    queue.shutdown()
@@ -0,0 +1,92 @@
+import csv
+
+from apache_spark_pipeline.helpers.mappers import PURCHASE_EDGE, USER_VERTEX
+from apache_spark_pipeline.services.checkpoint_service import InMemoryCheckpointStore
+from apache_spark_pipeline.services.loading_job_sink import LoadingJobSink, build_loading_job
+from apache_spark_pipeline.services.mapping_registry import MAPPING_REGISTRY
+from apache_spark_pipeline.services.mapping_service import MappingEngine
+from apache_spark_pipeline.services.mock_tigergraph_service import TigerGraphService
+from apache_spark_pipeline.services.sync_service import run_sync
+
+SCHEMA = MAPPING_REGISTRY.current().schema
+
+
+def test_loading_job_values_follow_schema_attribute_order():
+    job = build_loading_job("edge", PURCHASE_EDGE, SCHEMA)
+
+    assert job.columns == ("user_id", "product_id", "amount", "updated_at", "ordered_at")
+    # Schema order is amount, ordered_at, updated_at
+    assert job.values == ('$"user_id"', '$"product_id"', '$"amount"', '$"ordered_at"', '$"updated_at"')
+    gsql = job.gsql("EcommerceGraph")
+    assert gsql.startswith("CREATE LOADING JOB load_purchases FOR GRAPH EcommerceGraph {")
+    assert "LOAD f TO EDGE Purchased VALUES (" in gsql
+    assert 'USING SEPARATOR=",", HEADER="true", EOL="\\n", QUOTE="double";' in gsql
+
+
+def test_sink_streams_csv_files_and_rotates(tmp_path):
+    job = build_loading_job("vertex", USER_VERTEX, SCHEMA)
+    sink = LoadingJobSink(TigerGraphService(), job, max_file_bytes=1, directory=str(tmp_path))
+
+    sink.upsert_vertices({"vertices": {"User": {"u1": {"name": "Alice"}, "u2": {"email": "b@x.io"}}}})
+    sink.upsert_vertices({"vertices": {"User": {"u3": {"name": "Carol"}}}})
+    sink.commit()
+
+    assert len(sink.files) == 2
+    with open(sink.files[0], newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ["user_id", "name", "email", "updated_at"],
+        ["u1", "Alice", "", ""],
+        ["u2", "", "b@x.io", ""],
+    ]
+
+    sink.close()
+    assert not list(tmp_path.iterdir())
+
+
+def test_mock_loading_job_matches_rest_upserts():
+    mapper = MappingEngine()
+    mapper.add_edge_mapping(PURCHASE_EDGE)
+    records = [
+        {"user_id": "u1", "product_id": "p1", "amount": 12.5, "updated_at": "2026-01-01T00:00:00"},
+        {"user_id": "u2", "product_id": "p1", "amount": None, "ordered_at": "2026-01-02T00:00:00"},
+    ]
+    payload = mapper.transform_records("purchases", records)
+
+    rest, bulk = TigerGraphService(), TigerGraphService()
+    rest.upsert_edges(payload)
+    with LoadingJobSink(bulk, build_loading_job("edge", PURCHASE_EDGE, SCHEMA)) as sink:
+        sink.upsert_edges(payload)
+        assert sink.commit()["loaded"] == 2
+
+    assert bulk.edges == rest.edges
+
+
+def test_loading_job_keeps_commas_in_string_attributes():
+    payload = {"vertices": {"User": {"u1": {"name": "Smith, J", "email": "j@x.io"}}}}
+
+    rest, bulk = TigerGraphService(), TigerGraphService()
+    rest.upsert_vertices(payload)
+    with LoadingJobSink(bulk, build_loading_job("vertex", USER_VERTEX, SCHEMA)) as sink:
+        sink.upsert_vertices(payload)
+        sink.commit()
+
+    assert bulk.get_vertex("User", "u1")["attributes"]["name"] == "Smith, J"
+    assert bulk.vertices == rest.vertices
+
+
+def test_run_sync_uses_loading_jobs_above_threshold():
+    rest, bulk = TigerGraphService(), TigerGraphService()
+
+    run_sync("batch", tg=rest, checkpoints=InMemoryCheckpointStore(), bulk_load_threshold=None)
+    summary = run_sync("batch", tg=bulk, checkpoints=InMemoryCheckpointStore(), bulk_load_threshold=60)
+
+    # 200 users and 100 purchases cross the threshold, 50 products do not
+    assert summary["users"]["sink"] == "loading_job"
+    # Repeated (user, product) rows are merged into one edge before loading
+    purchases = summary["purchases"]
+    assert purchases["loaded"] == purchases["rows"] - purchases["rows_merged"]
+    assert "sink" not in summary["products"]
+    assert set(bulk.loading_jobs) == {"load_users", "load_purchases"}
+    assert bulk.vertices == rest.vertices
+    assert bulk.edges == rest.edges
@@ -0,0 +1,165 @@
+import os
+
+import pytest
+
+from apache_spark_pipeline.services.mapping_registry import (
+    DEFAULT_SCHEMA_PATH,
+    MAPPING_REGISTRY,
+    MappingRegistry,
+    load_mappings,
+    parse_gsql_schema,
+)
+
+USERS_ONLY = """
+version: "1.0"
+mappings:
+  - table: users
+    source: main.sales.users
+    type: vertex
+    vertex_type: User
+    primary_id: user_id
+    attributes: [name, email]
+    type_conversions:
+      user_id: string
+      name: string
+"""
+
+
+def write(path, text, mtime=None):
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def test_parse_gsql_schema_reads_vertices_and_edges():
+    with open(DEFAULT_SCHEMA_PATH) as f:
+        schema = parse_gsql_schema(f.read())
+
+    assert schema.vertices["User"].primary_id == ("user_id", "STRING")
+    assert schema.vertices["Product"].attributes["price"] == "DOUBLE"
+    assert schema.edges["Purchased"].from_types == ["User"]
+    assert schema.edges["Purchased"].to_types == ["Product"]
+    assert schema.edges["Purchased"].attributes["ordered_at"] == "DATETIME"
+
+
+def test_shipped_mappings_load_in_dependency_order():
+    loaded = MAPPING_REGISTRY.current()
+
+    assert loaded.sync_tables == (
+        ("main.sales.users", "users"),
+        ("main.sales.products", "products"),
+        ("main.sales.purchases", "purchases"),
+    )
+    assert set(loaded.engine.plans) == {"users", "products", "purchases"}
+    # Cached: no reload while the files are unchanged
+    assert MAPPING_REGISTRY.current() is loaded
+
+
+def test_validation_reports_every_problem(tmp_path):
+    mappings = write(tmp_path / "mappings.yaml", """
+mappings:
+  - table: users
+    source: main.sales.users
+    type: vertex
+    vertex_type: User
+    primary_id: user_id
+    attributes: [name, nickname]
+    type_conversions:
+      name: double
+  - table: orders
+    source: main.sales.orders
+    type: edge
+    edge_type: Purchased
+    from_vertex_type: Product
+    to_vertex_type: Product
+    from_id: product_id
+    to_id: product_id
+    attributes: [amount]
+  - table: users
+    source: main.sales.customers
+    type: vertex
+    vertex_type: Customer
+    primary_id: customer_id
+    attributes: []
+""")
+
+    with pytest.raises(ValueError) as excinfo:
+        load_mappings(mappings, DEFAULT_SCHEMA_PATH)
+
+    message = str(excinfo.value)
+    assert "attribute 'nickname' is not defined on User" in message
+    assert "'name' converts to double but the schema type is STRING" in message
+    assert "does not start at 'Product'" in message
+    assert "vertex type 'Customer' is not in the schema" in message
+    assert "duplicate table 'users'" in message
+
+
+def test_shipped_purchases_mapping_merges_repeated_edges():
+    _, mapping = MAPPING_REGISTRY.current().engine.mappings["purchases"]
+
+    assert mapping.latest_by == "updated_at"
+    assert mapping.aggregations == {}
+
+
+def test_merge_settings_are_validated(tmp_path):
+    mappings = write(tmp_path / "mappings.yaml", """
+mappings:
+  - table: purchases
+    source: main.sales.purchases
+    type: edge
+    edge_type: Purchased
+    from_vertex_type: User
+    to_vertex_type: Product
+    from_id: user_id
+    to_id: product_id
+    attributes: [amount, ordered_at]
+    merge:
+      discriminator: amount
+      latest_by: updated_at
+      aggregate:
+        amount: avg
+        ordered_at: sum
+        updated_at: max
+""")
+
+    with pytest.raises(ValueError) as excinfo:
+        load_mappings(mappings, DEFAULT_SCHEMA_PATH)
+
+    message = str(excinfo.value)
+    assert "merge discriminator is not supported" in message
+    assert "unknown merge key" not in message
+    assert "merge latest_by 'updated_at' is not a mapped attribute" in message
+    assert "unknown merge policy 'avg' for 'amount'" in message
+    assert "unknown merge policy 'sum' for 'ordered_at'" in message
+    assert "merge aggregate 'updated_at' is not a mapped attribute" in message
+
+
+def test_registry_reloads_changed_file_and_keeps_last_good(tmp_path):
+    mappings = write(tmp_path / "mappings.yaml", USERS_ONLY, mtime=1_000_000_000)
+    registry = MappingRegistry(mappings, DEFAULT_SCHEMA_PATH)
+    first = registry.current()
+    assert first.sync_tables == (("main.sales.users", "users"),)
+
+    with_products = USERS_ONLY + """
+  - table: products
+    source: main.sales.products
+    type: vertex
+    vertex_type: Product
+    primary_id: product_id
+    attributes: [price]
+"""
+    write(mappings, with_products, mtime=2_000_000_000)
+    second = registry.current()
+    assert second is not first
+    assert [table for _, table in second.sync_tables] == ["users", "products"]
+
+    write(mappings, "mappings: [{table: broken}]", mtime=3_000_000_000)
+    assert registry.current() is second
+
+
+def test_registry_raises_when_first_load_is_invalid(tmp_path):
+    mappings = write(tmp_path / "mappings.yaml", "mappings: {}")
+
+    with pytest.raises(ValueError):
+        MappingRegistry(mappings, DEFAULT_SCHEMA_PATH).current()
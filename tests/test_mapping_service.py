@@ -1,7 +1,7 @@
 import pytest
 from datetime import datetime
 
-from apache_spark_pipeline.services.mapping_service import MappingEngine
+from apache_spark_pipeline.services.mapping_service import MappingEngine, compile_mapping
 from apache_spark_pipeline.helpers.tigergraph_models import (
     VertexMapping,
     EdgeMapping,
@@ -61,14 +61,123 @@ def test_edge_mapping_success(engine):
     assert edges[0]["attributes"]["amount"] == 10.0
 
 
-def test_convert_all_types(engine):
-    assert engine._convert("1", {"a": "int"}, "a") == 1
-    assert engine._convert("1.5", {"a": "double"}, "a") == 1.5
-    assert engine._convert("x", {"a": "string"}, "a") == "x"
-    assert engine._convert(True, {"a": "bool"}, "a") is True
-    assert engine._convert(datetime(2024, 1, 1), {}, "a").startswith("2024")
+def test_compiled_converters_cover_all_types():
+    mapping = VertexMapping(
+        table="t",
+        vertex_type="T",
+        primary_id="id",
+        attributes=["i", "d", "s", "b", "t"],
+        type_conversions={"i": "int", "d": "double", "s": "string", "b": "bool"},
+    )
+    convert = dict(compile_mapping("vertex", mapping).attributes)
+
+    assert convert["i"]("1") == 1
+    assert convert["d"]("1.5") == 1.5
+    assert convert["s"]("x") == "x"
+    assert convert["b"](True) is True
+    assert convert["t"](datetime(2024, 1, 1)).startswith("2024")
 
 
 def test_missing_mapping_raises(engine):
     with pytest.raises(ValueError):
         engine.transform_records("unknown", [])
+
+
+def test_transform_columns_matches_row_path(engine):
+    mapping = EdgeMapping(
+        table="purchases",
+        edge_type="PURCHASED",
+        from_vertex_type="User",
+        to_vertex_type="Product",
+        from_id="user_id",
+        to_id="product_id",
+        attributes=["amount", "ordered_at"],
+        type_conversions={"amount": "double", "ordered_at": "datetime"},
+    )
+    engine.add_edge_mapping(mapping)
+
+    records = [
+        {"user_id": "u1", "product_id": "p1", "amount": 10, "ordered_at": datetime(2024, 1, 1)},
+        {"user_id": None, "product_id": "p2", "amount": 3},
+        {"user_id": "u3", "product_id": "p3", "amount": None},
+    ]
+    columns = {
+        key: [r.get(key) for r in records]
+        for key in ("user_id", "product_id", "amount", "ordered_at")
+    }
+
+    assert engine.transform_columns("purchases", columns) == \
+        engine.transform_records("purchases", records)
+
+
+def test_repeated_edges_are_merged_before_send(engine):
+    mapping = EdgeMapping(
+        table="purchases",
+        edge_type="PURCHASED",
+        from_vertex_type="User",
+        to_vertex_type="Product",
+        from_id="user_id",
+        to_id="product_id",
+        attributes=["amount", "updated_at"],
+        type_conversions={"amount": "double", "updated_at": "datetime"},
+        latest_by="updated_at",
+        aggregations={"amount": "max"},
+    )
+    engine.add_edge_mapping(mapping)
+
+    records = [
+        {"user_id": "u1", "product_id": "p1", "amount": 10, "updated_at": "2024-01-02"},
+        {"user_id": "u1", "product_id": "p1", "amount": 5, "updated_at": "2024-01-01"},
+        {"user_id": "u2", "product_id": "p1", "amount": 1, "updated_at": "2024-01-01"},
+    ]
+    columns = {key: [r[key] for r in records] for key in records[0]}
+
+    edges = engine.transform_records("purchases", records)["edges"]["PURCHASED"]
+    assert [(e["from_id"], e["attributes"]["amount"], e["attributes"]["updated_at"]) for e in edges] == [
+        ("u1", 10.0, "2024-01-02T00:00:00"),
+        ("u2", 1.0, "2024-01-01T00:00:00"),
+    ]
+    assert engine.transform_columns("purchases", columns)["edges"]["PURCHASED"] == edges
+    assert engine.merged_rows["purchases"] == 2
+
+
+def test_transform_columns_drops_only_bad_rows(engine):
+    mapping = VertexMapping(
+        table="products",
+        vertex_type="Product",
+        primary_id="id",
+        attributes=["price"],
+        type_conversions={"price": "double"},
+    )
+    engine.add_vertex_mapping(mapping)
+
+    payload = engine.transform_columns(
+        "products",
+        {"id": ["p1", "p2", "p3"], "price": ["1.5", "oops", "2"]},
+    )
+
+    assert payload["vertices"]["Product"] == {
+        "p1": {"price": 1.5},
+        "p3": {"price": 2.0},
+    }
+
+
+def test_transform_columns_accepts_numpy_arrays(engine):
+    np = pytest.importorskip("numpy")
+
+    mapping = VertexMapping(
+        table="products",
+        vertex_type="Product",
+        primary_id="id",
+        attributes=["price"],
+        type_conversions={"id": "string", "price": "double"},
+    )
+    engine.add_vertex_mapping(mapping)
+
+    payload = engine.transform_columns(
+        "products",
+        {"id": np.array(["p1", "p2"]), "price": np.array([1, 2])},
+    )
+
+    assert payload["vertices"]["Product"]["p2"] == {"price": 2.0}
+    assert isinstance(payload["vertices"]["Product"]["p2"]["price"], float)
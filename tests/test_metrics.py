@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+
+from apache_spark_pipeline.services.metrics import MetricsRegistry, log_payload
+
+
+def test_counter_accumulates_per_label_set():
+    registry = MetricsRegistry()
+    rows = registry.counter("sync_rows_read_total", "Rows read")
+
+    rows.inc(10, table="users")
+    rows.inc(5, table="users")
+    rows.inc(3, table="products")
+
+    assert rows.value(table="users") == 15
+    assert rows.value(table="products") == 3
+    assert registry.counter("sync_rows_read_total") is rows
+
+
+def test_render_uses_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("sync_rows_read_total", "Rows read").inc(2, table="users")
+    registry.histogram("request_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5, operation="upsert_edges")
+
+    text = registry.render()
+
+    assert "# TYPE sync_rows_read_total counter" in text
+    assert 'sync_rows_read_total{table="users"} 2' in text
+    assert 'request_seconds_bucket{operation="upsert_edges",le="0.1"} 0' in text
+    assert 'request_seconds_bucket{operation="upsert_edges",le="1.0"} 1' in text
+    assert 'request_seconds_bucket{operation="upsert_edges",le="+Inf"} 1' in text
+    assert 'request_seconds_count{operation="upsert_edges"} 1' in text
+
+
+def test_metric_name_cannot_change_kind():
+    registry = MetricsRegistry()
+    registry.counter("sync_runs_total")
+
+    with pytest.raises(ValueError):
+        registry.histogram("sync_runs_total")
+
+
+def test_timer_observes_block_duration():
+    registry = MetricsRegistry()
+
+    with registry.timer("stage_seconds", stage="transform"):
+        pass
+
+    assert registry.histogram("stage_seconds").count(stage="transform") == 1
+
+
+def test_log_payload_only_formats_sampled_debug_payloads(caplog):
+    logger = logging.getLogger("tests.payloads")
+
+    with caplog.at_level(logging.INFO, logger="tests.payloads"):
+        log_payload(logger, "Payload", {"vertices": {}}, rate=1.0)
+    assert not caplog.records
+
+    with caplog.at_level(logging.DEBUG, logger="tests.payloads"):
+        log_payload(logger, "Payload", {"vertices": {}}, rate=0.0)
+        log_payload(logger, "Payload", {"vertices": {}}, rate=1.0)
+    assert len(caplog.records) == 1
@@ -0,0 +1,117 @@
+from apache_spark_pipeline.services.mock_tigergraph_service import TigerGraphService
+
+
+def load_purchases(tg, n):
+    tg.upsert_edges({
+        "edges": {
+            "Purchased": [
+                {
+                    "from_type": "User",
+                    "from_id": f"u{i}",
+                    "to_type": "Product",
+                    "to_id": f"p{i % 3}",
+                    "attributes": {"amount": float(i)},
+                }
+                for i in range(n)
+            ]
+        }
+    })
+
+
+def test_iter_edges_pages_through_one_type():
+    tg = TigerGraphService()
+    load_purchases(tg, 10)
+
+    page = tg.fetch_edges("Purchased", offset=8, limit=5)
+
+    assert [e["from_id"] for e in page] == ["u8", "u9"]
+    assert len(tg.fetch_edges("Purchased")) == 10
+    assert tg.fetch_edges("Unknown") == []
+
+
+def test_scans_resume_after_a_key():
+    tg = TigerGraphService()
+    tg.upsert_vertices({"vertices": {"User": {"u3": {}, "u1": {}, "u2": {}}}})
+    load_purchases(tg, 6)
+
+    assert [v["v_id"] for v in tg.scan_vertices("User")] == ["u1", "u2", "u3"]
+    assert [v["v_id"] for v in tg.scan_vertices("User", after="u1", limit=1)] == ["u2"]
+    assert list(tg.scan_vertices("Unknown")) == []
+
+    edges = tg.scan_edges("Purchased", after=("u2", "p2"), limit=2)
+    assert [(e["from_id"], e["to_id"]) for e in edges] == [("u3", "p0"), ("u4", "p1")]
+
+
+def test_get_edges_returns_edges_of_one_vertex():
+    tg = TigerGraphService()
+    load_purchases(tg, 6)
+
+    edges = tg.get_edges("User", "u4", "Purchased")
+
+    assert [(e["from_id"], e["to_id"]) for e in edges] == [("u4", "p1")]
+
+
+def test_vertex_upsert_is_keyed_by_id():
+    tg = TigerGraphService()
+
+    tg.upsert_vertices({"vertices": {"User": {"u1": {"name": "Alice", "email": "a@x"}}}})
+    tg.upsert_vertices({"vertices": {"User": {"u1": {"name": "Alicia"}}}})
+
+    assert tg.vertex_count("User") == 1
+    assert tg.get_vertex("User", "u1")["attributes"] == {"name": "Alicia", "email": "a@x"}
+    assert tg.get_vertex("User", "missing") is None
+
+
+def test_resync_does_not_duplicate_edges():
+    tg = TigerGraphService()
+
+    load_purchases(tg, 9)
+    load_purchases(tg, 9)
+
+    assert tg.edge_count("Purchased") == 9
+    assert len(tg.fetch_edges("Purchased")) == 9
+
+
+def test_adjacency_indexes_answer_neighbor_queries():
+    tg = TigerGraphService()
+    load_purchases(tg, 9)
+
+    assert tg.get_neighbors("User", "u4", "Purchased") == [("Product", "p1")]
+    assert tg.get_neighbors("Product", "p1", "Purchased", direction="in") == [
+        ("User", "u1"), ("User", "u4"), ("User", "u7"),
+    ]
+
+
+def test_clear_resets_store_and_indexes():
+    tg = TigerGraphService()
+    load_purchases(tg, 3)
+
+    tg.clear()
+
+    assert tg.edge_count("Purchased") == 0
+    assert tg.get_edges("User", "u1", "Purchased") == []
+
+
+def test_deleting_a_vertex_drops_its_edges():
+    tg = TigerGraphService()
+    tg.upsert_vertices({"vertices": {"Product": {"p1": {}, "p2": {}}}})
+    load_purchases(tg, 6)
+
+    tg.delete_vertices("Product", ["p1"])
+
+    assert tg.get_vertex("Product", "p1") is None
+    assert tg.edge_count("Purchased") == 4
+    assert tg.get_edges("User", "u1", "Purchased") == []
+
+
+def test_delete_edges_by_endpoints():
+    tg = TigerGraphService()
+    load_purchases(tg, 3)
+
+    result = tg.delete_edges("Purchased", [
+        {"from_type": "User", "from_id": "u0", "to_type": "Product", "to_id": "p0"},
+        {"from_type": "User", "from_id": "u9", "to_type": "Product", "to_id": "p9"},
+    ])
+
+    assert result["count"] == 1
+    assert tg.edge_count("Purchased") == 2
@@ -0,0 +1,188 @@
+import pytest
+from redis import ConnectionError as RedisConnectionError
+
+from apache_spark_pipeline.helpers.mock_iceberg_data import MOCK_ICEBERG_DATA
+from apache_spark_pipeline.services.checkpoint_service import InMemoryCheckpointStore
+from apache_spark_pipeline.services.metrics import MetricsRegistry
+from apache_spark_pipeline.services.mock_tigergraph_service import TigerGraphService
+from apache_spark_pipeline.services.response_cache import (
+    MemoryBackend,
+    RedisBackend,
+    ResponseCache,
+    etag_matches,
+)
+from apache_spark_pipeline.services.sync_service import run_sync
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2, max_bytes=10)
+    backend.set("a", b"1111")
+    backend.set("b", b"2222")
+    backend.get("a")
+    backend.set("c", b"3333")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1111"
+
+    # Over max_bytes: the oldest entries make room
+    backend.set("d", b"444444")
+    assert list(backend.entries) == ["a", "d"]
+    assert backend.size == 10
+
+
+def test_etag_escapes_parameter_values():
+    cache = ResponseCache(MemoryBackend(), metrics=MetricsRegistry())
+
+    # Joined unescaped, both read "after=u1&limit=5"
+    injected = cache.etag("users", {"after": "u1&limit=5"}, ["User"])
+    assert injected != cache.etag("users", {"after": "u1", "limit": 5}, ["User"])
+    assert cache.etag("users", {"limit": 5, "after": "u1"}, ["User"]) == cache.etag(
+        "users", {"after": "u1", "limit": 5}, ["User"]
+    )
+
+
+def test_cache_builds_once_per_generation():
+    cache = ResponseCache(MemoryBackend(), metrics=MetricsRegistry())
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b"[]"
+
+    etag = cache.etag("users", {}, ["User"])
+    assert cache.get_or_build("users", etag, build) == b"[]"
+    assert cache.get_or_build("users", cache.etag("users", {}, ["User"]), build) == b"[]"
+    assert len(builds) == 1
+
+    cache.invalidate(["Product"])
+    assert cache.etag("users", {}, ["User"]) == etag
+
+    cache.invalidate(["User"])
+    new_etag = cache.etag("users", {}, ["User"])
+    assert new_etag != etag
+    cache.get_or_build("users", new_etag, build)
+    assert len(builds) == 2
+
+    requests = cache.metrics.counter("response_cache_requests_total")
+    assert requests.value(endpoint="users", result="hit") == 1
+    assert requests.value(endpoint="users", result="miss") == 2
+
+
+def test_streamed_bodies_are_kept_only_when_small():
+    cache = ResponseCache(MemoryBackend(), metrics=MetricsRegistry(), max_streamed_bytes=8)
+
+    small = cache.etag("users", {}, ["User"])
+    assert cache.lookup("users", small) is None
+    assert b"".join(cache.stream_through(small, [b"[1, ", b"2]"])) == b"[1, 2]"
+    assert cache.lookup("users", small) == b"[1, 2]"
+
+    large = cache.etag("products", {}, ["Product"])
+    assert b"".join(cache.stream_through(large, [b"[1, ", b"2, ", b"3, 4]"])) == b"[1, 2, 3, 4]"
+    assert cache.lookup("products", large) is None
+
+    # A stream the client dropped halfway is not stored
+    partial = cache.etag("purchases", {}, ["Purchased"])
+    stream = cache.stream_through(partial, [b"[1, ", b"2]"])
+    next(stream)
+    stream.close()
+    assert cache.lookup("purchases", partial) is None
+
+
+def test_etag_depends_on_params_and_clear():
+    cache = ResponseCache(MemoryBackend())
+
+    first = cache.etag("purchases", {"offset": 0, "limit": 10}, ["Purchased"])
+    assert first != cache.etag("purchases", {"offset": 10, "limit": 10}, ["Purchased"])
+
+    # Generations restart from zero after a clear, ETags must not repeat
+    cache.clear()
+    assert first != cache.etag("purchases", {"offset": 0, "limit": 10}, ["Purchased"])
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"x"', False),
+    (None, False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+class FakeRedis:
+    """Just the commands RedisBackend uses."""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            raise RedisConnectionError("connection refused")
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value
+
+    def mget(self, keys):
+        self._check()
+        return [self.data.get(k) for k in keys]
+
+    def incr(self, key):
+        self._check()
+        self.data[key] = int(self.data.get(key, 0)) + 1
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+
+def test_redis_backend_shares_generations():
+    client = FakeRedis()
+    web_1 = ResponseCache(RedisBackend(client))
+    web_2 = ResponseCache(RedisBackend(client))
+
+    etag = web_1.etag("users", {}, ["User"])
+    web_1.get_or_build("users", etag, lambda: b"[1]")
+    assert web_2.get_or_build("users", etag, lambda: b"rebuilt") == b"[1]"
+
+    web_2.invalidate(["User"])
+    assert web_1.etag("users", {}, ["User"]) != etag
+
+
+def test_redis_errors_fall_back_to_uncached_responses():
+    cache = ResponseCache(RedisBackend(FakeRedis(fail=True)))
+
+    assert cache.etag("users", {}, ["User"]) is None
+    assert cache.get_or_build("users", None, lambda: b"[]") == b"[]"
+    cache.invalidate(["User"])
+
+
+def test_run_sync_invalidates_only_written_types(monkeypatch):
+    products = [dict(p) for p in MOCK_ICEBERG_DATA["main.sales.products"]]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.products", products)
+    cache = ResponseCache(MemoryBackend())
+    checkpoints = InMemoryCheckpointStore()
+    tg = TigerGraphService()
+
+    run_sync("snapshot", tg=tg, checkpoints=checkpoints, response_cache=cache)
+    before = {t: cache.etag("e", {}, [t]) for t in ("User", "Product", "Purchased")}
+
+    products[0]["price"] = 999.0
+    run_sync("snapshot", tg=tg, checkpoints=checkpoints, response_cache=cache)
+    after = {t: cache.etag("e", {}, [t]) for t in ("User", "Product", "Purchased")}
+    assert [t for t in before if before[t] != after[t]] == ["Product"]
+
+    # Deleting a product also drops its purchases
+    products.pop()
+    run_sync("snapshot", tg=tg, checkpoints=checkpoints, response_cache=cache)
+    final = {t: cache.etag("e", {}, [t]) for t in ("User", "Product", "Purchased")}
+    assert [t for t in after if after[t] != final[t]] == ["Product", "Purchased"]
@@ -1,6 +1,56 @@
-from apache_spark_pipeline.services.sync_service import run_sync
+import time
+import tracemalloc
+from functools import partial
+
+import pytest
+
+from apache_spark_pipeline.helpers.mappers import PURCHASE_EDGE
+from apache_spark_pipeline.helpers.mock_iceberg_data import MOCK_ICEBERG_DATA
+from apache_spark_pipeline.helpers.spark_data_frame import SparkDataFrame
+from apache_spark_pipeline.services.checkpoint_service import (
+    CheckpointStore,
+    InMemoryCheckpointStore,
+    resume_point,
+)
+from apache_spark_pipeline.services.job_service import FAILED, SyncJobQueue
+from apache_spark_pipeline.services.mapping_service import MappingEngine
+from apache_spark_pipeline.services.metrics import MetricsRegistry
+from apache_spark_pipeline.services.mock_tigergraph_service import TigerGraphService
+from apache_spark_pipeline.services import transform_pool
+from apache_spark_pipeline.services.sync_service import DEFAULT_CHUNK_SIZE, run_sync, sync_table
 from apache_spark_pipeline.services.tigergraph_singleton import TIGERGRAPH_CLIENT
 
+# run_sync persists watermarks through the Django database by default
+pytestmark = pytest.mark.django_db
+
+
+class RecordingClient:
+    """Sink that only remembers how many rows each upsert carried."""
+
+    def __init__(self):
+        self.vertex_calls = []
+        self.edge_calls = []
+
+    def upsert_vertices(self, payload):
+        self.vertex_calls.append(sum(len(v) for v in payload["vertices"].values()))
+
+    def upsert_edges(self, payload):
+        self.edge_calls.append(sum(len(e) for e in payload["edges"].values()))
+
+
+def make_purchases(n):
+    return [
+        {
+            "user_id": f"u{i}",
+            "product_id": f"p{i % 50}",
+            "amount": i * 1.5,
+            "updated_at": "2026-01-01T11:00:00",
+            "ordered_at": "2026-01-01T11:00:00",
+        }
+        for i in range(n)
+    ]
+
+
 def test_run_sync_batch_end_to_end():
     # Reset singleton state
     TIGERGRAPH_CLIENT.vertices.clear()
@@ -10,7 +60,7 @@ def test_run_sync_batch_end_to_end():
 
     users = TIGERGRAPH_CLIENT.fetch_vertices("User")
     products = TIGERGRAPH_CLIENT.fetch_vertices("Product")
-    purchases = TIGERGRAPH_CLIENT.fetch_edges("PURCHASED")
+    purchases = TIGERGRAPH_CLIENT.fetch_edges("Purchased")
 
     assert len(users) > 0
     assert len(products) > 0
@@ -29,6 +79,390 @@ def test_micro_sync_loads_only_new_data():
 
     assert users  # some data loaded
     assert all(
-        user["updated_at"] > "2024-01-20T00:00:00"
-        for user in users.values()
+        user["attributes"]["updated_at"] > "2024-01-20T00:00:00"
+        for user in users
+    )
+
+def test_run_sync_upserts_in_chunks():
+    client = RecordingClient()
+
+    summary = run_sync("batch", chunk_size=30, tg=client)
+
+    assert client.vertex_calls and client.edge_calls
+    assert max(client.vertex_calls + client.edge_calls) <= 30
+    assert summary["users"]["rows"] == 200
+    assert summary["users"]["chunks"] == 7
+    assert summary["purchases"]["max_chunk_rows"] <= 30
+
+
+def test_run_sync_reports_stage_timings():
+    summary = run_sync("batch", chunk_size=50, tg=RecordingClient())
+
+    for stats in summary.values():
+        assert set(stats["timings"]) == {"read", "transform", "upsert"}
+        assert all(seconds >= 0 for seconds in stats["timings"].values())
+    assert summary["users"]["timings"]["transform"] > 0
+
+
+def test_sync_table_counts_dropped_rows_and_bytes():
+    mapper = MappingEngine()
+    mapper.add_edge_mapping(PURCHASE_EDGE)
+    metrics = MetricsRegistry()
+    records = make_purchases(10)
+    records[3]["amount"] = "not a number"
+
+    stats = sync_table(mapper, "purchases", SparkDataFrame(records), RecordingClient(), 4, metrics)
+
+    assert stats["rows"] == 10
+    assert stats["rows_dropped"] == 1
+    assert stats["bytes_sent"] > 0
+    assert metrics.counter("sync_rows_read_total").value(table="purchases") == 10
+    assert metrics.counter("sync_rows_dropped_total").value(table="purchases") == 1
+    assert metrics.counter("sync_bytes_sent_total").value(table="purchases") == stats["bytes_sent"]
+
+
+def test_run_sync_records_request_latency():
+    metrics = MetricsRegistry()
+
+    run_sync("batch", tg=TigerGraphService(), metrics=metrics)
+
+    latency = metrics.histogram("tigergraph_request_seconds")
+    assert latency.count(operation="upsert_vertices", outcome="ok") > 0
+    assert latency.count(operation="upsert_edges", outcome="ok") > 0
+    assert metrics.counter("sync_runs_total").value(mode="batch") == 1
+
+
+def test_run_sync_rejects_bad_chunk_size():
+    with pytest.raises(ValueError):
+        run_sync("batch", chunk_size=0, tg=RecordingClient())
+
+
+def _peak_sync_memory(dataframe, chunk_size):
+    mapper = MappingEngine()
+    mapper.add_edge_mapping(PURCHASE_EDGE)
+
+    tracemalloc.start()
+    try:
+        sync_table(mapper, "purchases", dataframe, RecordingClient(), chunk_size)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_sync_bounds_peak_memory():
+    dataframe = SparkDataFrame(make_purchases(20_000))
+
+    streamed = _peak_sync_memory(dataframe, chunk_size=200)
+    materialized = _peak_sync_memory(dataframe, chunk_size=20_000)
+
+    # Peak is driven by one chunk's payload, not by the table size
+    assert streamed * 10 < materialized
+
+
+def test_batch_sync_records_watermarks():
+    checkpoints = InMemoryCheckpointStore()
+
+    summary = run_sync("batch", tg=RecordingClient(), checkpoints=checkpoints)
+
+    assert checkpoints.get_watermark("main.sales.users") == summary["users"]["high_watermark"]
+    assert summary["users"]["high_watermark"] == "2026-07-20T10:00:00"
+
+
+def test_micro_sync_resumes_from_watermark():
+    checkpoints = InMemoryCheckpointStore()
+    checkpoints.save_watermark("main.sales.users", "2026-07-10T10:00:00")
+
+    summary = run_sync("micro", tg=RecordingClient(), checkpoints=checkpoints)
+
+    # users u191..u200 are newer than the stored watermark
+    assert summary["users"]["since"] == "2026-07-10T10:00:00"
+    assert summary["users"]["rows"] == 10
+
+    # Nothing changed since, so the next poll reads nothing
+    summary = run_sync("micro", tg=RecordingClient(), checkpoints=checkpoints)
+    assert summary["users"]["rows"] == 0
+    assert summary["products"]["rows"] == 0
+
+
+def test_checkpoint_store_persists_and_never_rewinds():
+    store = CheckpointStore()
+
+    store.save_watermark("main.sales.users", "2026-01-05T00:00:00")
+    store.save_watermark("main.sales.users", "2026-01-01T00:00:00")
+
+    assert store.get_watermark("main.sales.users") == "2026-01-05T00:00:00"
+    assert store.get_watermark("main.sales.products") is None
+
+
+def test_snapshot_sync_sends_only_changes_and_deletes(monkeypatch):
+    products = [dict(p) for p in MOCK_ICEBERG_DATA["main.sales.products"]]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.products", products)
+    checkpoints = InMemoryCheckpointStore()
+    tg = TigerGraphService()
+
+    first = run_sync("snapshot", tg=tg, checkpoints=checkpoints)
+    assert first["products"]["rows"] == 50
+    assert tg.vertex_count("Product") == 50
+
+    # Unchanged tables send nothing on the next run
+    second = run_sync("snapshot", tg=tg, checkpoints=checkpoints)
+    assert second["products"]["rows"] == 0
+    assert second["users"]["rows"] == 0
+
+    products[0]["price"] = 999.0
+    removed = products.pop()
+    third = run_sync("snapshot", tg=tg, checkpoints=checkpoints)
+
+    assert third["products"]["rows"] == 1
+    assert third["products"]["changed"] == 1
+    assert third["products"]["removed"] == 1
+    assert tg.get_vertex("Product", "p1")["attributes"]["price"] == 999.0
+    assert tg.get_vertex("Product", removed["product_id"]) is None
+
+
+def test_snapshot_sync_diffs_against_keys_stored_in_the_database(monkeypatch):
+    products = [dict(p) for p in MOCK_ICEBERG_DATA["main.sales.products"]]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.products", products)
+    tg = TigerGraphService()
+
+    run_sync("snapshot", tg=tg, checkpoints=CheckpointStore())
+    assert len(CheckpointStore().get_snapshot_keys("main.sales.products")) == 50
+
+    # A new store (another process) only has what the database holds
+    products[1]["price"] = 5.0
+    removed = products.pop()
+    summary = run_sync("snapshot", tg=tg, checkpoints=CheckpointStore())
+
+    assert summary["products"]["changed"] == 1
+    assert summary["products"]["removed"] == 1
+    assert "snapshot_keys" not in summary["products"]
+    assert tg.get_vertex("Product", removed["product_id"]) is None
+    keys = CheckpointStore().get_snapshot_keys("main.sales.products")
+    assert len(keys) == 49
+    assert f'["{removed["product_id"]}"]' not in keys
+
+
+@pytest.mark.parametrize("previous_id", [None, 42])
+def test_snapshot_sync_without_stored_keys_deletes_nothing(previous_id):
+    checkpoints = InMemoryCheckpointStore()
+    if previous_id is not None:
+        # e.g. a checkpoint written before keys were stored
+        checkpoints.save_snapshot("main.sales.products", previous_id)
+    tg = TigerGraphService()
+    tg.upsert_vertices({"vertices": {"Product": {"gone": {"name": "Gone"}}}})
+    tg.upsert_edges({"edges": {"Purchased": [
+        {"from_type": "User", "from_id": "u1", "to_type": "Product", "to_id": "gone", "attributes": {}},
+        {"from_type": "User", "from_id": "nobody", "to_type": "Product", "to_id": "p1", "attributes": {}},
+    ]}})
+
+    summary = run_sync("snapshot", tg=tg, checkpoints=checkpoints)
+
+    # Other tables or earlier micro-batches may have written these
+    assert tg.get_vertex("Product", "gone") is not None
+    assert len(tg.get_edges("User", "nobody", "Purchased")) == 1
+    assert summary["products"]["removed"] == summary["purchases"]["removed"] == 0
+    assert summary["products"]["rows"] == 50
+    assert len(checkpoints.get_snapshot_keys("main.sales.products")) == 50
+
+
+def test_snapshot_sync_ignores_unmapped_columns(monkeypatch):
+    products = [dict(p, warehouse_bin=f"b{i}") for i, p in enumerate(MOCK_ICEBERG_DATA["main.sales.products"])]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.products", products)
+    checkpoints = InMemoryCheckpointStore()
+    tg = TigerGraphService()
+    run_sync("snapshot", tg=tg, checkpoints=checkpoints)
+
+    products[0]["warehouse_bin"] = "moved"
+    summary = run_sync("snapshot", tg=tg, checkpoints=checkpoints)
+
+    assert summary["products"]["rows"] == 0
+
+
+@pytest.mark.parametrize("mode", ["batch", "snapshot"])
+def test_stored_edges_do_not_depend_on_chunk_size(monkeypatch, mode):
+    # 8 (user, product) pairs, each repeated 5 times with rising updated_at,
+    # so every chunk size splits some of them across chunks
+    purchases = [
+        {"user_id": f"u{i % 4}", "product_id": f"p{i % 8}", "amount": float(i),
+         "updated_at": f"2026-01-{1 + i // 8:02d}T11:00:00", "ordered_at": "2026-01-01T11:00:00"}
+        for i in range(40)
+    ]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.purchases", purchases)
+
+    stored = []
+    for chunk_size in (40, 20, 10):
+        tg = TigerGraphService()
+        run_sync(mode, chunk_size=chunk_size, tg=tg, checkpoints=InMemoryCheckpointStore())
+        stored.append(sorted(
+            (e["from_id"], e["to_id"], e["attributes"]["amount"]) for e in tg.fetch_edges("Purchased")
+        ))
+
+    assert stored[0] == stored[1] == stored[2]
+    assert stored[0][0] == ("u0", "p0", 32.0)
+
+
+def test_independent_tables_sync_concurrently(monkeypatch):
+    # Two equally sized vertex tables against a slow sink: syncing them side
+    # by side should take about half as long as one after the other. Chunks
+    # are upserted synchronously so only tables overlap.
+    users = [{"user_id": f"u{i}", "name": f"User-{i}"} for i in range(100)]
+    products = [{"product_id": f"p{i}", "name": f"Product-{i}"} for i in range(100)]
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.users", users)
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.products", products)
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.purchases", [])
+
+    def timed_sync(table_workers):
+        started = time.perf_counter()
+        run_sync(
+            "batch", chunk_size=10, tg=TigerGraphService(latency=0.01),
+            checkpoints=InMemoryCheckpointStore(), table_workers=table_workers, upload_queue_size=0,
+        )
+        return time.perf_counter() - started
+
+    sequential = timed_sync(1)
+    concurrent = timed_sync(2)
+
+    assert concurrent < sequential * 0.75
+
+
+def test_process_pool_transform_matches_in_process(monkeypatch):
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.purchases", make_purchases(2000))
+    in_process, pooled = TigerGraphService(), TigerGraphService()
+    run_sync("batch", tg=in_process, checkpoints=InMemoryCheckpointStore())
+
+    shards = []
+    shard_columns = transform_pool._shard_columns
+    monkeypatch.setattr(transform_pool, "_shard_columns", lambda plan, records: (
+        shards.append(len(records)) or shard_columns(plan, records)
+    ))
+    summary = run_sync("batch", tg=pooled, checkpoints=InMemoryCheckpointStore(), transform_workers=2)
+
+    # Default-sized chunks of purchases are split across both workers
+    assert shards.count(DEFAULT_CHUNK_SIZE // 2) == 4
+    assert pooled.vertices == in_process.vertices
+    assert pooled.edges == in_process.edges
+    assert summary["purchases"]["rows_dropped"] == 0
+
+
+def test_sync_adapts_upload_batches_to_a_request_limit():
+    tg = TigerGraphService(max_request_items=40)
+
+    summary = run_sync(
+        "batch", chunk_size=100, tg=tg, checkpoints=InMemoryCheckpointStore(),
+        upload_batch_size=100, upload_queue_size=2,
+    )
+
+    assert tg.vertex_count("User") == summary["users"]["rows"]
+    assert len(tg.fetch_edges("Purchased")) == summary["purchases"]["rows"] - summary["purchases"]["rows_merged"]
+
+
+class FailingEdgesClient(TigerGraphService):
+    """Mock that rejects edge upserts once `edge_limit` edges were stored."""
+
+    def __init__(self, edge_limit):
+        super().__init__()
+        self.edge_limit = edge_limit
+
+    def upsert_edges(self, payload):
+        if self.edge_limit is not None and len(self.fetch_edges("Purchased")) >= self.edge_limit:
+            raise ConnectionError("TigerGraph unavailable")
+        return super().upsert_edges(payload)
+
+
+@pytest.mark.parametrize("upload_queue_size", [0, 2])
+def test_failed_batch_sync_resumes_from_committed_chunks(upload_queue_size):
+    checkpoints = InMemoryCheckpointStore()
+    tg = FailingEdgesClient(edge_limit=40)
+
+    with pytest.raises(ConnectionError):
+        run_sync("batch", chunk_size=10, tg=tg, checkpoints=checkpoints, upload_queue_size=upload_queue_size)
+
+    tg.edge_limit = None
+    summary = run_sync("batch", chunk_size=10, tg=tg, checkpoints=checkpoints, upload_queue_size=upload_queue_size)
+
+    purchases = summary["purchases"]
+    assert purchases["resumed_from"] >= 40
+    assert purchases["rows"] == 100 - purchases["resumed_from"]
+    assert purchases["rows_committed"] == 100
+    # Vertex tables finished on the first run: their rows are not sent again
+    users = summary["users"]
+    assert users["resumed_from"] == users["rows_committed"] == len(MOCK_ICEBERG_DATA["main.sales.users"])
+    assert users["rows"] == 0
+
+    clean = TigerGraphService()
+    run_sync("batch", chunk_size=10, tg=clean, checkpoints=InMemoryCheckpointStore())
+    assert tg.edges == clean.edges
+    assert checkpoints.get_watermark("main.sales.purchases") == purchases["high_watermark"]
+
+    # A finished table leaves no commits behind
+    assert run_sync("batch", chunk_size=10, tg=tg, checkpoints=checkpoints)["purchases"]["resumed_from"] == 0
+
+
+@pytest.mark.parametrize("upload_queue_size", [0, 2])
+def test_failed_job_reports_the_rows_it_committed(upload_queue_size):
+    runner = partial(
+        run_sync, tg=FailingEdgesClient(edge_limit=40), checkpoints=InMemoryCheckpointStore(),
+        chunk_size=10, upload_queue_size=upload_queue_size,
     )
+    queue = SyncJobQueue(runner=runner)
+    job, _ = queue.submit("batch")
+    queue.wait(job.job_id, timeout=30)
+
+    assert job.status == FAILED
+    progress = job.to_dict()["progress"]["purchases"]
+    assert progress["resumed_from"] == 0
+    assert 40 <= progress["rows_committed"] <= progress["rows"] < 100
+    queue.shutdown()
+
+
+def test_failed_table_drops_its_queued_batches():
+    tg = TigerGraphService(latency=0.02)
+
+    def progress(table, stats):
+        # Raised once the first chunk's ten single-row batches are queued
+        if table == "users":
+            raise RuntimeError("progress store unavailable")
+
+    with pytest.raises(RuntimeError):
+        run_sync(
+            "batch", chunk_size=10, tg=tg, checkpoints=InMemoryCheckpointStore(),
+            upload_batch_size=1, upload_concurrency=1, upload_queue_size=8, progress=progress,
+        )
+
+    assert tg.vertex_count("User") < 10
+
+
+def test_commits_of_another_table_version_are_ignored(monkeypatch):
+    checkpoints = InMemoryCheckpointStore()
+    tg = FailingEdgesClient(edge_limit=40)
+    with pytest.raises(ConnectionError):
+        run_sync("batch", chunk_size=10, tg=tg, checkpoints=checkpoints, upload_queue_size=0)
+
+    monkeypatch.setitem(MOCK_ICEBERG_DATA, "main.sales.purchases", make_purchases(100))
+    tg.edge_limit = None
+    summary = run_sync("batch", chunk_size=10, tg=tg, checkpoints=checkpoints, resume=True)
+
+    assert summary["purchases"]["resumed_from"] == 0
+    assert summary["purchases"]["rows"] == 100
+
+
+def test_resume_point_stops_at_the_first_gap():
+    chunks = [(0, 10, "2026-01-02"), (20, 30, "2026-01-09"), (10, 20, "2026-01-01"), (40, 50, None)]
+
+    assert resume_point(chunks) == (30, "2026-01-09")
+    assert resume_point([(10, 20, None)]) == (0, None)
+    assert resume_point([]) == (0, None)
+
+
+def test_checkpoint_store_persists_chunk_commits():
+    store = CheckpointStore()
+
+    store.commit_chunks("main.sales.users", "v1", [(10, 20, "2026-01-02"), (0, 10, None)])
+    # Chunks acknowledged twice are stored once
+    store.commit_chunks("main.sales.users", "v1", [(0, 10, None)])
+
+    assert store.committed_chunks("main.sales.users", "v1") == [(0, 10, None), (10, 20, "2026-01-02")]
+    assert store.committed_chunks("main.sales.users", "v2") == []
+
+    store.clear_chunks("main.sales.users")
+    assert store.committed_chunks("main.sales.users", "v1") == []
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from apache_spark_pipeline.helpers.mappers import PRODUCT_VERTEX, PURCHASE_EDGE, USER_VERTEX
+from apache_spark_pipeline.services.mapping_service import MappingEngine
+from apache_spark_pipeline.services.table_scheduler import (
+    run_in_dependency_order,
+    table_dependencies,
+)
+
+
+def make_engine():
+    engine = MappingEngine()
+    engine.add_vertex_mapping(USER_VERTEX)
+    engine.add_vertex_mapping(PRODUCT_VERTEX)
+    engine.add_edge_mapping(PURCHASE_EDGE)
+    return engine
+
+
+def test_edge_tables_depend_on_their_vertex_tables():
+    deps = table_dependencies(make_engine(), ["users", "products", "purchases"])
+
+    assert deps == {"users": set(), "products": set(), "purchases": {"users", "products"}}
+
+
+def test_dependencies_ignore_tables_not_being_synced():
+    deps = table_dependencies(make_engine(), ["products", "purchases"])
+
+    assert deps["purchases"] == {"products"}
+
+
+def test_independent_tables_overlap_and_dependents_wait():
+    deps = {"users": set(), "products": set(), "purchases": {"users", "products"}}
+    events = []
+    lock = threading.Lock()
+
+    def run(table):
+        with lock:
+            events.append(("start", table))
+        time.sleep(0.1)
+        with lock:
+            events.append(("end", table))
+        return table.upper()
+
+    done = []
+    started = time.perf_counter()
+    results = run_in_dependency_order(deps, run, max_workers=3, on_done=lambda t, r: done.append(t))
+    elapsed = time.perf_counter() - started
+
+    assert results == {"users": "USERS", "products": "PRODUCTS", "purchases": "PURCHASES"}
+    # Two vertex tables in parallel, then the edge table: ~0.2s, not 0.3s
+    assert elapsed < 0.28
+    assert events.index(("start", "purchases")) > events.index(("end", "users"))
+    assert events.index(("start", "purchases")) > events.index(("end", "products"))
+    assert done[-1] == "purchases"
+
+
+def test_failure_stops_scheduling_and_is_raised():
+    deps = {"users": set(), "purchases": {"users"}}
+    ran = []
+
+    def run(table):
+        ran.append(table)
+        if table == "users":
+            raise RuntimeError("upsert failed")
+
+    with pytest.raises(RuntimeError):
+        run_in_dependency_order(deps, run)
+    assert ran == ["users"]
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        run_in_dependency_order({"a": {"b"}, "b": {"a"}}, lambda table: None)
+
+
+def test_ticks_run_on_the_calling_thread_while_tables_run():
+    ticks = []
+
+    def run(table):
+        time.sleep(0.1)
+
+    run_in_dependency_order(
+        {"users": set()}, run, on_tick=lambda: ticks.append(threading.current_thread()), tick_seconds=0.02
+    )
+
+    assert len(ticks) >= 3
+    assert set(ticks) == {threading.current_thread()}
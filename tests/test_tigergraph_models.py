@@ -0,0 +1,142 @@
+import pickle
+import sys
+import tracemalloc
+
+import pytest
+
+from apache_spark_pipeline.helpers.mappers import PURCHASE_EDGE, USER_VERTEX
+from apache_spark_pipeline.helpers.tigergraph_models import EdgeBatch, VertexBatch
+from apache_spark_pipeline.services.mapping_service import MappingEngine
+from apache_spark_pipeline.services.tigergraph_service import TigerGraphService
+
+
+@pytest.fixture
+def engine():
+    engine = MappingEngine()
+    engine.add_vertex_mapping(USER_VERTEX)
+    engine.add_edge_mapping(PURCHASE_EDGE)
+    return engine
+
+
+def purchases(n):
+    return [
+        {"user_id": f"u{i}", "product_id": f"p{i % 7}", "amount": i * 1.5,
+         "updated_at": "2026-01-01T00:00:00", "ordered_at": "2026-01-01T00:00:00"}
+        for i in range(n)
+    ]
+
+
+def test_engine_emits_column_batches(engine):
+    payload = engine.transform_records("users", [
+        {"user_id": "u1", "name": "Alice"},
+        {"user_id": "u2", "email": "b@x.io"},
+        {"user_id": "u1", "name": "Alicia"},
+    ])
+
+    batch = payload["vertices"]["User"]
+    assert isinstance(batch, VertexBatch)
+    # Last row of a repeated id wins, as with the old {id: attrs} dict
+    assert batch.ids == ["u2", "u1"]
+    assert batch.columns["name"] == [None, "Alicia"]
+    assert batch == {"u1": {"name": "Alicia"}, "u2": {"email": "b@x.io"}}
+
+
+def test_edge_batch_keeps_one_copy_of_vertex_types(engine):
+    batch = engine.transform_records("purchases", purchases(3))["edges"]["Purchased"]
+
+    assert isinstance(batch, EdgeBatch)
+    assert (batch.from_type, batch.to_type) == ("User", "Product")
+    assert batch.from_ids == ["u0", "u1", "u2"]
+    assert batch[1] == {
+        "from_type": "User", "from_id": "u1", "to_type": "Product", "to_id": "p1",
+        "attributes": {"amount": 1.5, "updated_at": "2026-01-01T00:00:00",
+                       "ordered_at": "2026-01-01T00:00:00"},
+    }
+    assert batch.slice(1, 3).from_ids == ["u1", "u2"]
+
+
+def test_merged_keeps_latest_row_and_aggregates():
+    batch = EdgeBatch("Purchased", "User", "Product",
+                      ["u1", "u2", "u1", "u1"], ["p1", "p1", "p1", "p1"], {
+                          "amount": [10.0, 1.0, 5.0, None],
+                          "updated_at": ["2026-01-03", "2026-01-01", "2026-01-02", None],
+                          "channel": ["web", "web", "app", "web"],
+                      })
+
+    latest = batch.merged(latest_by="updated_at", aggregations={"amount": "min"})
+    assert latest.to_list() == [
+        {"from_type": "User", "from_id": "u1", "to_type": "Product", "to_id": "p1",
+         "attributes": {"amount": 5.0, "updated_at": "2026-01-03", "channel": "web"}},
+        {"from_type": "User", "from_id": "u2", "to_type": "Product", "to_id": "p1",
+         "attributes": {"amount": 1.0, "updated_at": "2026-01-01", "channel": "web"}},
+    ]
+
+    # Without latest_by the last row wins; a discriminator keeps parallel edges
+    assert batch.merged().columns["updated_at"] == [None, "2026-01-01"]
+    parallel = batch.merged(discriminator="channel", aggregations={"amount": "max"})
+    assert parallel.from_ids == ["u1", "u2", "u1"]
+    assert parallel.columns["amount"] == [10.0, 1.0, 5.0]
+
+    unique = batch.slice(0, 2)
+    assert unique.merged() is unique
+
+
+def test_edge_batch_from_dicts_rejects_mixed_vertex_types():
+    edges = [
+        {"from_type": "User", "from_id": "u1", "to_type": "Product", "to_id": "p1"},
+        {"from_type": "User", "from_id": "u1", "to_type": "User", "to_id": "u2"},
+    ]
+    with pytest.raises(ValueError, match="share vertex types"):
+        EdgeBatch.from_dicts("Purchased", edges)
+
+
+def test_batches_survive_pickling(engine):
+    # Transform workers send batches back to the parent process
+    payload = engine.transform_records("purchases", purchases(5))
+    restored = pickle.loads(pickle.dumps(payload))
+
+    assert restored == payload
+    assert restored["edges"]["Purchased"].from_type is sys.intern("User")
+
+
+def test_edge_batch_uses_less_memory_than_edge_dicts(engine):
+    records = purchases(5000)
+
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        batch = engine.transform_records("purchases", records)["edges"]["Purchased"]
+        batch_bytes = tracemalloc.get_traced_memory()[0] - start
+        edges = batch.to_list()
+        dict_bytes = tracemalloc.get_traced_memory()[0] - start - batch_bytes
+    finally:
+        tracemalloc.stop()
+
+    assert len(edges) == 5000
+    # The dicts reuse the batch's values, and still cost far more
+    assert dict_bytes > 2 * batch_bytes
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.calls = []
+
+    def upsertVertices(self, vertex_type, vertices):
+        self.calls.append(("vertices", vertex_type, vertices))
+
+    def upsertEdges(self, source_type, edge_type, target_type, edges):
+        self.calls.append(("edges", (source_type, edge_type, target_type), edges))
+
+
+def test_rest_client_sends_batches_in_pytigergraph_form(engine):
+    conn = RecordingConnection()
+    service = TigerGraphService(connection=conn, authenticate=False)
+
+    service.upsert_vertices(engine.transform_records("users", [{"user_id": "u1", "name": "Alice"}]))
+    service.upsert_edges(engine.transform_records("purchases", purchases(1)))
+
+    assert conn.calls[0] == ("vertices", "User", [("u1", {"name": "Alice"})])
+    kind, types, edges = conn.calls[1]
+    assert types == ("User", "Purchased", "Product")
+    assert edges == [("u0", "p0", {"amount": 0.0, "updated_at": "2026-01-01T00:00:00",
+                                   "ordered_at": "2026-01-01T00:00:00"})]
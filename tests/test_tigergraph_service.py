@@ -1,7 +1,23 @@
+import time
+
 from apache_spark_pipeline.services.tigergraph_service import TigerGraphService
+from apache_spark_pipeline.services.tigergraph_singleton import LazyClient
+
+class UpsertConnection:
+    """Connection double that records REST++ upserts."""
+
+    def __init__(self):
+        self.calls = []
+
+    def upsertVertices(self, vertexType, vertices):
+        self.calls.append(("vertices", vertexType, vertices))
 
-def test_load_and_fetch_vertices():
-    tg = TigerGraphService()
+    def upsertEdges(self, sourceVertexType, edgeType, targetVertexType, edges):
+        self.calls.append(("edges", sourceVertexType, edgeType, targetVertexType, edges))
+
+
+def test_upsert_vertices_sends_id_attribute_pairs():
+    tg = TigerGraphService(connection=UpsertConnection(), authenticate=False)
 
     payload = {
         "vertices": {
@@ -12,19 +28,18 @@ def test_load_and_fetch_vertices():
         }
     }
 
-    result = tg.load_vertices(payload)
+    result = tg.upsert_vertices(payload)
 
     assert result["count"] == 2
-    users = tg.fetch_vertices("User")
-    assert users["u1"]["name"] == "Alice"
+    assert tg.conn.calls == [("vertices", "User", [("u1", {"name": "Alice"}), ("u2", {"name": "Bob"})])]
 
 
-def test_load_and_fetch_edges():
-    tg = TigerGraphService()
+def test_upsert_edges_sends_one_request_per_type():
+    tg = TigerGraphService(connection=UpsertConnection(), authenticate=False)
 
     payload = {
         "edges": {
-            "PURCHASED": [
+            "Purchased": [
                 {
                     "from_type": "User",
                     "from_id": "u1",
@@ -36,8 +51,177 @@ def test_load_and_fetch_edges():
         }
     }
 
-    result = tg.load_edges(payload)
+    result = tg.upsert_edges(payload)
 
     assert result["count"] == 1
-    edges = tg.fetch_edges("PURCHASED")
-    assert edges[0]["from_id"] == "u1"
+    assert tg.conn.calls == [("edges", "User", "Purchased", "Product", [("u1", "p1", {"amount": 5})])]
+
+
+class BulkEdgeConnection:
+    """Connection double that only supports the bulk edge export."""
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.calls = []
+
+    def getEdgesByType(self, edgeType, limit=None):
+        self.calls.append((edgeType, limit))
+        return self.edges[:limit] if limit else list(self.edges)
+
+    def getEdges(self, *args, **kwargs):
+        raise AssertionError("fetch_edges must not query edges per vertex")
+
+
+def test_fetch_edges_uses_single_bulk_export():
+    tg = TigerGraphService(
+        connection=BulkEdgeConnection([{"from_id": f"u{i}", "to_id": "p1"} for i in range(10)]),
+        authenticate=False,
+    )
+
+    page = tg.fetch_edges("Purchased", offset=4, limit=3)
+    next_page = tg.fetch_edges("Purchased", offset=7, limit=3)
+
+    assert [e["from_id"] for e in page] == ["u4", "u5", "u6"]
+    assert [e["from_id"] for e in next_page] == ["u7", "u8", "u9"]
+    assert tg.conn.calls == [("Purchased", None)]
+
+
+class VertexListingConnection:
+    """Connection double for the REST++ vertex listing."""
+
+    def __init__(self, vertices, id_as_attribute):
+        self.vertices = vertices
+        self.id_as_attribute = id_as_attribute
+        self.calls = []
+
+    def getVertexType(self, vertexType):
+        return {
+            "PrimaryId": {"AttributeName": "user_id"},
+            "Config": {"PRIMARY_ID_AS_ATTRIBUTE": self.id_as_attribute},
+        }
+
+    def getVertices(self, vertexType, where="", sort="", limit=None):
+        self.calls.append((where, sort, limit))
+        return list(self.vertices)
+
+
+def test_scan_vertices_filters_on_the_server_when_the_id_is_an_attribute():
+    conn = VertexListingConnection([{"v_id": "u3"}], id_as_attribute=True)
+    tg = TigerGraphService(connection=conn, authenticate=False)
+
+    assert list(tg.scan_vertices("User", after="u2", limit=5)) == [{"v_id": "u3"}]
+    list(tg.scan_vertices("User"))
+
+    assert conn.calls == [('user_id>"u2"', "user_id", 5), ("", "user_id", None)]
+
+
+def test_scan_vertices_pages_locally_otherwise():
+    conn = VertexListingConnection([{"v_id": f"u{i}"} for i in (3, 1, 4, 2)], id_as_attribute=False)
+    tg = TigerGraphService(connection=conn, authenticate=False)
+
+    page = tg.scan_vertices("User", after="u1", limit=2)
+    next_page = tg.scan_vertices("User", after="u3", limit=2)
+
+    assert [v["v_id"] for v in page] == ["u2", "u3"]
+    assert [v["v_id"] for v in next_page] == ["u4"]
+    assert conn.calls == [("", "", None)]
+
+
+class EdgeListingConnection(BulkEdgeConnection):
+    def upsertEdges(self, sourceVertexType, edgeType, targetVertexType, edges):
+        self.edges = self.edges + [{"from_id": f, "to_id": t} for f, t, _ in edges]
+
+    def delVerticesById(self, vertexType, vertexIds):
+        return len(vertexIds)
+
+
+def test_scan_edges_sorts_the_export_once_per_version():
+    conn = EdgeListingConnection([{"from_id": f"u{i}", "to_id": "p1"} for i in (3, 1, 2)])
+    version = {"Purchased": "1"}
+    tg = TigerGraphService(connection=conn, authenticate=False, listing_version=version.get)
+
+    first = list(tg.scan_edges("Purchased", limit=2))
+    second = list(tg.scan_edges("Purchased", after=("u2", "p1"), limit=2))
+
+    assert [e["from_id"] for e in first + second] == ["u1", "u2", "u3"]
+    assert conn.calls == [("Purchased", None)]
+
+    # A write through this client, a deleted vertex or a new version re-lists
+    edge = {"from_type": "User", "from_id": "u0", "to_type": "Product", "to_id": "p1", "attributes": {}}
+    tg.upsert_edges({"edges": {"Purchased": [edge]}})
+    assert [e["from_id"] for e in tg.scan_edges("Purchased", limit=1)] == ["u0"]
+    tg.delete_vertices("User", ["u0"])
+    list(tg.scan_edges("Purchased"))
+    version["Purchased"] = "2"
+    list(tg.scan_edges("Purchased"))
+
+    assert len(conn.calls) == 4
+
+
+def test_scan_edges_lists_every_page_when_the_version_is_unknown():
+    conn = EdgeListingConnection([{"from_id": "u1", "to_id": "p1"}])
+    tg = TigerGraphService(connection=conn, authenticate=False, listing_version=lambda type_name: None)
+
+    list(tg.scan_edges("Purchased"))
+    list(tg.scan_edges("Purchased"))
+
+    assert len(conn.calls) == 2
+
+
+class TokenConnection:
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.secrets = 0
+        self.tokens = 0
+
+    def createSecret(self):
+        self.secrets += 1
+        return "secret"
+
+    def getToken(self, secret, lifetime=None):
+        self.tokens += 1
+        return (f"token-{self.tokens}", int(time.time() + self.lifetime), "")
+
+
+def test_token_is_cached_until_close_to_expiry():
+    conn = TokenConnection(lifetime=3600)
+    tg = TigerGraphService(connection=conn)
+
+    for _ in range(3):
+        tg.conn
+
+    assert (conn.secrets, conn.tokens) == (1, 1)
+    assert tg.token[0] == "token-1"
+
+
+def test_token_is_refreshed_before_it_expires():
+    # Expires inside the refresh margin, so every use fetches a new one
+    conn = TokenConnection(lifetime=60)
+    tg = TigerGraphService(connection=conn)
+
+    tg.conn
+    tg.conn
+
+    assert (conn.secrets, conn.tokens) == (1, 2)
+
+
+def test_service_construction_does_not_connect():
+    tg = TigerGraphService(host="http://tigergraph.invalid")
+
+    assert tg._conn is None
+    assert tg.token is None
+
+
+def test_lazy_client_builds_once_on_first_use():
+    built = []
+
+    def factory():
+        built.append(1)
+        return TigerGraphService(connection=BulkEdgeConnection([]), authenticate=False)
+
+    client = LazyClient(factory)
+    assert built == []
+
+    client.fetch_edges("Purchased")
+    client.fetch_edges("Purchased")
+    assert built == [1]
@@ -0,0 +1,283 @@
+import threading
+import time
+
+import pytest
+
+from apache_spark_pipeline.services.mock_tigergraph_service import TigerGraphService
+from apache_spark_pipeline.services.tigergraph_uploader import AdaptiveBatchSize, ConcurrentUploader
+
+
+def vertex_payload(n, v_type="User"):
+    return {"vertices": {v_type: {f"u{i}": {"name": f"User-{i}"} for i in range(n)}}}
+
+
+def edge_payload(n):
+    return {
+        "edges": {
+            "Purchased": [
+                {
+                    "from_type": "User",
+                    "from_id": f"u{i}",
+                    "to_type": "Product",
+                    "to_id": "p1",
+                    "attributes": {"amount": 1.0},
+                }
+                for i in range(n)
+            ]
+        }
+    }
+
+
+class TimelineService(TigerGraphService):
+    """Mock that records when each upsert started and finished."""
+
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.events = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._events_lock = threading.Lock()
+
+    def _track(self, kind, upsert, payload):
+        with self._events_lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.events.append((kind, "start", time.perf_counter()))
+        try:
+            return upsert(payload)
+        finally:
+            with self._events_lock:
+                self.in_flight -= 1
+                self.events.append((kind, "end", time.perf_counter()))
+
+    def upsert_vertices(self, payload):
+        return self._track("vertex", super().upsert_vertices, payload)
+
+    def upsert_edges(self, payload):
+        return self._track("edge", super().upsert_edges, payload)
+
+
+class FlakyService(TigerGraphService):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.attempts = 0
+
+    def upsert_vertices(self, payload):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("REST++ unavailable")
+        return super().upsert_vertices(payload)
+
+
+def test_splits_types_into_bounded_batches():
+    tg = TigerGraphService()
+
+    with ConcurrentUploader(tg, batch_size=40, max_workers=3) as uploader:
+        result = uploader.upsert_vertices(vertex_payload(100))
+
+    assert result["count"] == 100
+    assert result["batches"] == 3
+    assert len(tg.fetch_vertices("User")) == 100
+
+
+def test_batches_are_sent_concurrently():
+    tg = TimelineService(latency=0.05)
+
+    with ConcurrentUploader(tg, batch_size=10, max_workers=4) as uploader:
+        start = time.perf_counter()
+        uploader.upsert_vertices(vertex_payload(80))
+        elapsed = time.perf_counter() - start
+
+    # 8 batches x 50ms serially would take 400ms
+    assert tg.max_in_flight == 4
+    assert elapsed < 0.3
+
+
+def test_edges_wait_for_vertex_acknowledgement():
+    tg = TimelineService(latency=0.02)
+
+    with ConcurrentUploader(tg, batch_size=5, max_workers=4) as uploader:
+        uploader.upload(
+            vertex_payloads=[vertex_payload(20), vertex_payload(10, "Product")],
+            edge_payloads=[edge_payload(20)],
+        )
+
+    last_vertex_end = max(t for kind, ev, t in tg.events if kind == "vertex" and ev == "end")
+    first_edge_start = min(t for kind, ev, t in tg.events if kind == "edge" and ev == "start")
+    assert last_vertex_end <= first_edge_start
+    assert len(tg.fetch_edges("Purchased")) == 20
+
+
+def test_failed_batch_is_retried():
+    tg = FlakyService(failures=2)
+
+    uploader = ConcurrentUploader(tg, max_retries=3, retry_backoff=0)
+    result = uploader.upsert_vertices(vertex_payload(3))
+
+    assert result["count"] == 3
+    assert tg.attempts == 3
+
+
+def test_gives_up_after_max_retries():
+    tg = FlakyService(failures=5)
+
+    uploader = ConcurrentUploader(tg, max_retries=2, retry_backoff=0)
+    with pytest.raises(ConnectionError):
+        uploader.upsert_vertices(vertex_payload(3))
+
+    assert tg.attempts == 3
+
+
+def test_batch_size_grows_additively_and_halves_on_slow_or_failed_requests():
+    sizer = AdaptiveBatchSize(100, min_size=10, max_size=130, target_latency=1.0, increase=20)
+
+    sizer.record(100, 0.1)
+    assert sizer.size == 120
+    sizer.record(50, 0.1)  # not a full batch: says nothing about the size
+    assert sizer.size == 120
+    sizer.record(120, 0.1)
+    assert sizer.size == 130
+
+    sizer.record(130, 1.5)
+    assert sizer.size == 65
+    sizer.record(65, 0.1, ok=False)
+    assert sizer.size == 32
+    for _ in range(5):
+        sizer.record(1, 0.1, ok=False)
+    assert sizer.size == 10
+
+
+def test_batch_size_keeps_requests_under_max_bytes():
+    sizer = AdaptiveBatchSize(500, max_bytes=10_000)
+
+    assert sizer.rows(100) == 100
+    assert sizer.rows(10) == 500
+    assert sizer.rows(50_000) == 1
+
+
+def test_oversized_requests_are_split_after_an_error():
+    tg = TigerGraphService(max_request_items=30)
+
+    with ConcurrentUploader(tg, batch_size=100, retry_backoff=0) as uploader:
+        result = uploader.upsert_vertices(vertex_payload(100))
+
+    assert result["count"] == 100
+    assert len(tg.fetch_vertices("User")) == 100
+    assert uploader.sizer.size <= 30
+
+
+def test_batch_size_converges_below_target_latency():
+    # 1ms per vertex: requests over 50 vertices miss the 50ms target. The
+    # target leaves room for scheduler delays on a busy machine.
+    tg = TigerGraphService(latency_per_item=0.001)
+    sizer = AdaptiveBatchSize(100, target_latency=0.05, increase=5)
+
+    with ConcurrentUploader(tg, max_workers=1, sizer=sizer) as uploader:
+        for _ in range(10):
+            uploader.upsert_vertices(vertex_payload(100))
+
+    assert 12 <= sizer.size <= 55
+
+
+def test_stream_blocks_the_caller_while_the_queue_is_full():
+    tg = TimelineService(latency=0.05)
+
+    with ConcurrentUploader(tg, batch_size=10, max_workers=4) as uploader:
+        stream = uploader.stream(max_pending=2)
+        started = time.perf_counter()
+        for i in range(3):
+            stream.upsert_vertices(vertex_payload(20, f"T{i}"))
+        queued = time.perf_counter() - started
+        result = stream.flush()
+
+    # 6 batches through 2 slots: the last 2 could only be queued once 4 were done
+    assert tg.max_in_flight == 2
+    assert queued >= 0.1
+    assert result == {"status": "OK", "count": 60, "batches": 6}
+
+
+def test_stream_reports_failures_on_flush():
+    tg = FlakyService(failures=10)
+
+    with ConcurrentUploader(tg, max_retries=1, retry_backoff=0) as uploader:
+        stream = uploader.stream()
+        stream.upsert_vertices(vertex_payload(3))
+        with pytest.raises(ConnectionError):
+            stream.flush()
+
+
+def test_stream_cancel_drops_queued_batches():
+    tg = TimelineService(latency=0.05)
+    done = []
+
+    with ConcurrentUploader(tg, batch_size=1, max_workers=1) as uploader:
+        stream = uploader.stream(max_pending=8)
+        stream.upsert_vertices(vertex_payload(6), on_done=lambda: done.append("users"))
+        stream.cancel()
+        # Requests being sent finished; none started afterwards
+        assert tg.in_flight == 0
+        sent = len(tg.events)
+        time.sleep(0.1)
+
+    assert 0 < sent < 12
+    assert len(tg.events) == sent
+    assert done == []
+
+
+def test_stream_calls_on_done_once_a_payload_is_acknowledged():
+    done = []
+
+    with ConcurrentUploader(TigerGraphService(), batch_size=10) as uploader:
+        stream = uploader.stream()
+        stream.upsert_vertices(vertex_payload(25), on_done=lambda: done.append("users"))
+        stream.upsert_vertices({"vertices": {}}, on_done=lambda: done.append("empty"))
+        stream.flush()
+
+    assert sorted(done) == ["empty", "users"]
+
+    with ConcurrentUploader(FlakyService(failures=10), max_retries=0) as uploader:
+        stream = uploader.stream()
+        stream.upsert_vertices(vertex_payload(3), on_done=lambda: done.append("failed"))
+        with pytest.raises(ConnectionError):
+            stream.flush()
+
+    assert "failed" not in done
+
+
+class SlowFirstRequestService(TigerGraphService):
+    """Mock whose first edge upsert is slow, so a later one could overtake it."""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def upsert_edges(self, payload):
+        with self._calls_lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            time.sleep(self.delay)
+        return super().upsert_edges(payload)
+
+
+def test_stream_keeps_chunks_of_one_type_in_order():
+    tg = SlowFirstRequestService(delay=0.1)
+
+    def chunk(amount, updated_at):
+        edge = {"from_type": "User", "from_id": "u1", "to_type": "Product", "to_id": "p1",
+                "attributes": {"amount": amount, "updated_at": updated_at}}
+        return {"edges": {"Purchased": [edge]}}
+
+    with ConcurrentUploader(tg, max_workers=4) as uploader:
+        stream = uploader.stream(max_pending=8)
+        started = time.perf_counter()
+        stream.upsert_edges(chunk(1.0, "2026-01-01T00:00:00"))
+        # The first chunk is only queued: the reader moves on meanwhile
+        assert time.perf_counter() - started < 0.1
+        stream.upsert_edges(chunk(2.0, "2026-01-02T00:00:00"))
+        stream.flush()
+
+    assert tg.fetch_edges("Purchased")[0]["attributes"] == {"amount": 2.0, "updated_at": "2026-01-02T00:00:00"}
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from apache_spark_pipeline.helpers.mappers import PURCHASE_EDGE
+from apache_spark_pipeline.helpers.time_utils import parse_timestamp, parse_timestamps, timestamp_format
+from apache_spark_pipeline.services.mapping_service import MappingEngine
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-01-20", "2026-01-20T00:00:00"),
+    ("2026-01-20 11:30", "2026-01-20T11:30:00"),
+    (" 2026-01-20T11:30:05 ", "2026-01-20T11:30:05"),
+    ("2026-01-20T11:30:05.25", "2026-01-20T11:30:05.250000"),
+    ("2026-01-20T11:30:05Z", "2026-01-20T11:30:05"),
+    ("2026-01-20T13:30:05+02:00", "2026-01-20T11:30:05"),
+    ("1768908605", "2026-01-20T11:30:05"),
+    ("1768908605000", "2026-01-20T11:30:05"),
+    (1768908605.5, "2026-01-20T11:30:05.500000"),
+    (datetime(2026, 1, 20, 6, 30, 5, tzinfo=timezone(timedelta(hours=-5))), "2026-01-20T11:30:05"),
+    ("", None),
+    (None, None),
+])
+def test_parse_timestamp_normalizes_to_naive_utc_iso(value, expected):
+    assert parse_timestamp(value) == expected
+
+
+@pytest.mark.parametrize("value", ["yesterday", "now", "2026-13-01", "2026-01"])
+def test_parse_timestamp_rejects_unsupported_values(value):
+    with pytest.raises(ValueError, match="Invalid timestamp format"):
+        parse_timestamp(value)
+
+
+def test_timestamp_format_is_detected_by_digit_pattern():
+    assert timestamp_format("2026-01-20T11:30:05") == "iso"
+    assert timestamp_format("2026-01-20T11:30:05+0200") == "iso_tz"
+    assert timestamp_format("1768908605000") == "epoch"
+    assert timestamp_format("20/01/2026") is None
+
+
+@pytest.mark.parametrize("column", [
+    ["2026-01-20T11:30:05", None, "2026-02-01T00:00:00"],
+    ["2026-01-20 11:30", "2026-01-20", "2026-01-20T11:30:05.000001", ""],
+    ["1768908605", "1768908605123", None],
+    [1768908605, 1768908605123, None],
+    ["2026-01-20T11:30:05Z", "2026-01-20T13:30:05+02:00"],
+    [datetime(2026, 1, 20), None],
+    ["1768908605", "2026-01-20 11:30"],
+    # Same length as the canonical form, or behind a canonical first value
+    ["2026-01-01T10:00:00", "2026-01-01T10:00+01"],
+    ["2026-01-01T10:00:00", "2026-01-01T10:00:00.5", "2026-01-01T12:00:00-02:00", " 2026-01-02 "],
+    ["1768908605", "-5", "12.5", ""],
+])
+@pytest.mark.filterwarnings("error")
+def test_column_parse_matches_per_value_parse(column):
+    assert parse_timestamps(column) == [parse_timestamp(v) for v in column]
+    assert all(v is None or type(v) is str for v in parse_timestamps(column))
+
+
+def test_column_parse_records_invalid_values():
+    errors = {}
+    parsed = parse_timestamps(["2026-01-20T11:30:05", "2026-13-01T00:00:00", "now"], errors)
+
+    assert parsed == ["2026-01-20T11:30:05", None, None]
+    assert sorted(errors) == [1, 2]
+
+    with pytest.raises(ValueError):
+        parse_timestamps(["2026-01-20T11:30:05", "now"])
+
+
+@pytest.mark.parametrize("column", [
+    [1, 10 ** 20],
+    [1.0, float("inf")],
+    ["1", str(10 ** 20)],
+    [1, "1", 10 ** 20],
+])
+def test_out_of_range_epochs_are_recorded_on_both_paths(column):
+    with pytest.raises(ValueError):
+        parse_timestamp(column[-1])
+
+    errors = {}
+    assert parse_timestamps(column, errors) == ["1970-01-01T00:00:01"] * (len(column) - 1) + [None]
+    assert sorted(errors) == [len(column) - 1]
+
+
+def test_mapping_engine_drops_rows_with_out_of_range_epochs():
+    engine = MappingEngine()
+    engine.add_edge_mapping(PURCHASE_EDGE)
+    records = [
+        {"user_id": "u1", "product_id": "p1", "updated_at": 1768908605},
+        {"user_id": "u2", "product_id": "p1", "updated_at": 10 ** 20},
+    ]
+
+    batch = engine.transform_records("purchases", records)["edges"]["Purchased"]
+
+    assert batch.from_ids == ["u1"]
+    assert engine.dropped_rows["purchases"] == 1
+
+
+def test_mapping_engine_normalizes_datetime_fields_on_both_paths():
+    engine = MappingEngine()
+    engine.add_edge_mapping(PURCHASE_EDGE)
+    records = [
+        {"user_id": "u1", "product_id": "p1", "updated_at": "2026-01-20 11:30", "ordered_at": 1768908605},
+        {"user_id": "u2", "product_id": "p1", "updated_at": "not a date"},
+        {"user_id": "u3", "product_id": "p2", "updated_at": datetime(2026, 1, 20, 11, 30)},
+    ]
+    columns = {key: [r.get(key) for r in records] for key in ("user_id", "product_id", "updated_at", "ordered_at")}
+    columns["ordered_at"] = np.array(columns["ordered_at"], dtype=object)
+
+    by_rows = engine.transform_records("purchases", records)
+    by_columns = engine.transform_columns("purchases", columns)
+
+    assert by_rows == by_columns
+    batch = by_rows["edges"]["Purchased"]
+    assert batch.from_ids == ["u1", "u3"]
+    assert batch.columns["updated_at"] == ["2026-01-20T11:30:00", "2026-01-20T11:30:00"]
+    assert batch.columns["ordered_at"] == ["2026-01-20T11:30:05", None]
+    assert engine.dropped_rows["purchases"] == 2
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+
+from apache_spark_pipeline.helpers.mappers import USER_VERTEX
+from apache_spark_pipeline.helpers.tigergraph_models import EdgeMapping
+from apache_spark_pipeline.services.mapping_service import MappingEngine
+from apache_spark_pipeline.services.transform_pool import TransformPool, shard_bounds
+
+PURCHASES = EdgeMapping(
+    table="purchases",
+    edge_type="Purchased",
+    from_vertex_type="User",
+    to_vertex_type="Product",
+    from_id="user_id",
+    to_id="product_id",
+    attributes=["amount", "updated_at"],
+    type_conversions={"amount": "double", "updated_at": "datetime"},
+    latest_by="updated_at",
+    aggregations={"amount": "max"},
+)
+
+
+def make_engine():
+    engine = MappingEngine()
+    engine.add_vertex_mapping(USER_VERTEX)
+    engine.add_edge_mapping(PURCHASES)
+    return engine
+
+
+def purchases(n):
+    # Few distinct (user, product) pairs, so repeats straddle shard bounds;
+    # datetimes travel to the workers as ISO strings
+    return [
+        {"user_id": f"u{i % 13}", "product_id": f"p{i % 5}", "amount": i,
+         "updated_at": datetime(2026, 1, 1 + i % 28, i % 24) if i % 17 else "not a date"}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def pool():
+    pool = TransformPool(make_engine(), max_workers=3, min_shard_rows=10)
+    yield pool
+    pool.shutdown()
+
+
+def test_shard_bounds_cover_rows_evenly():
+    assert shard_bounds(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert shard_bounds(2, 2) == [(0, 1), (1, 2)]
+
+
+def test_sharded_transform_matches_in_process(pool):
+    in_process = make_engine()
+    records = purchases(200)
+    users = [{"user_id": f"u{i % 40}", "name": f"User-{i}"} for i in range(100)]
+
+    assert pool.transform("purchases", records) == in_process.transform_records("purchases", records)
+    assert pool.transform("users", users) == in_process.transform_records("users", users)
+    assert pool.engine.dropped_rows == in_process.dropped_rows
+    assert pool.engine.merged_rows["purchases"] == in_process.merged_rows["purchases"]
+
+
+def test_small_chunks_stay_in_process(pool, monkeypatch):
+    def no_ipc(*args, **kwargs):
+        raise AssertionError("a chunk below two shards must not be sent to a worker")
+
+    monkeypatch.setattr(pool.executor, "submit", no_ipc)
+
+    payload = pool.transform("purchases", purchases(19))
+
+    assert len(payload["edges"]["Purchased"]) > 0
+
+
+def test_workers_are_not_forked_from_the_threaded_parent(pool):
+    assert pool.executor._mp_context.get_start_method() != "fork"
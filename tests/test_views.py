@@ -1,33 +1,120 @@
+import json
+
 import pytest
 from django.test import Client
+from apache_spark_pipeline.services.job_service import JOB_QUEUE
+from apache_spark_pipeline.services.response_cache import RESPONSE_CACHE
 from apache_spark_pipeline.services.tigergraph_singleton import TIGERGRAPH_CLIENT
 
-pytestmark = pytest.mark.django_db
+# Sync jobs run on worker threads, which need committed checkpoint rows
+pytestmark = pytest.mark.django_db(transaction=True)
 
 @pytest.fixture(autouse=True)
 def reset_tigergraph():
     TIGERGRAPH_CLIENT.vertices.clear()
     TIGERGRAPH_CLIENT.edges.clear()
+    # The store was changed behind the cache's back
+    RESPONSE_CACHE.clear()
     yield
 
+def run_sync_job(client, url, params=None):
+    # Triggers a sync, waits for its job and returns the job status payload
+    response = client.get(url, params or {})
+    assert response.status_code == 202
+
+    job_id = response.json()["job_id"]
+    JOB_QUEUE.wait(job_id, timeout=30)
+    return client.get(f"/api/sync/jobs/{job_id}/").json()
+
+def read_json(response):
+    # Works for streamed and buffered responses alike
+    return json.loads(response.getvalue())
+
+def follow_pages(client, url, params):
+    # Follows X-Next-Cursor until the last page; returns every page's items
+    pages = []
+    while True:
+        response = client.get(url, params)
+        assert response.status_code == 200
+        pages.append(read_json(response))
+        if "X-Next-Cursor" not in response:
+            return pages
+        params = dict(params, after=response["X-Next-Cursor"])
+
 def test_sync_batch_view():
     client = Client()
 
     response = client.get("/api/sync/batch/")
 
+    assert response.status_code == 202
+    assert response["Location"] == response.json()["status_url"]
+
+    job = JOB_QUEUE.wait(response.json()["job_id"], timeout=30)
+    status = client.get(response.json()["status_url"]).json()
+    assert job.status == status["status"] == "succeeded"
+    assert status["tables"]["users"]["rows"] > 0
+    assert status["progress"]["users"]["rows"] == status["tables"]["users"]["rows"]
+    assert status["duration_seconds"] >= 0
+
+def test_sync_job_view_unknown_job():
+    client = Client()
+
+    response = client.get("/api/sync/jobs/missing/")
+
+    assert response.status_code == 404
+
+def test_metrics_view_exposes_prometheus_text():
+    client = Client()
+
+    run_sync_job(client, "/api/sync/batch/")
+    response = client.get("/api/metrics/")
+
     assert response.status_code == 200
-    assert response.json()["status"] == "Batch sync completed"
+    assert response["Content-Type"].startswith("text/plain")
+    assert 'sync_rows_read_total{table="users"}' in response.content.decode()
+
+def test_sync_snapshot_view():
+    client = Client()
+
+    status = run_sync_job(client, "/api/sync/snapshot/")
+
+    assert status["status"] == "succeeded"
+    assert status["mode"] == "snapshot"
 
 def test_sync_micro_view_filters_data():
     client = Client()
 
-    response = client.get(
+    status = run_sync_job(
+        client,
         "/api/sync/micro/",
         {"last_timestamp": "2024-01-20"}
     )
 
-    assert response.status_code == 200
-    assert response.json()["status"] == "Micro-batch sync completed"
+    assert status["status"] == "succeeded"
+    assert status["params"] == {"last_ts": "2024-01-20T00:00:00"}
+
+def test_sync_micro_normalizes_epoch_and_offset_timestamps():
+    client = Client()
+
+    for raw in ("1705708800000", "2024-01-20T02:00:00+02:00"):
+        status = run_sync_job(client, "/api/sync/micro/", {"last_timestamp": raw})
+        assert status["params"] == {"last_ts": "2024-01-20T00:00:00"}
+
+def test_sync_micro_without_timestamp_uses_watermark():
+    client = Client()
+
+    run_sync_job(client, "/api/sync/batch/")
+    status = run_sync_job(client, "/api/sync/micro/")
+
+    assert status["status"] == "succeeded"
+    assert status["tables"]["users"]["rows"] == 0
+
+def test_sync_micro_invalid_timestamp():
+    client = Client()
+
+    response = client.get("/api/sync/micro/", {"last_timestamp": "yesterday"})
+
+    assert response.status_code == 400
 
 def test_sync_micro_missing_timestamp():
     client = Client()
@@ -40,37 +127,157 @@ def test_users_view_returns_data():
     client = Client()
 
     # Load data first
-    client.get("/api/sync/batch/")
+    run_sync_job(client, "/api/sync/batch/")
     response = client.get("/api/graph/users/")
 
     assert response.status_code == 200
 
-    data = response.json()
-    assert isinstance(data, dict)
+    data = read_json(response)
+    assert isinstance(data, list)
     assert len(data) > 0
 
 def test_products_view_returns_data():
     client = Client()
 
-    client.get("/api/sync/batch/")
+    run_sync_job(client, "/api/sync/batch/")
     response = client.get("/api/graph/products/")
 
     assert response.status_code == 200
-    data = response.json()
+    data = read_json(response)
     assert len(data) > 0
 
 def test_purchases_view_returns_edges():
     client = Client()
 
-    client.get("/api/sync/batch/")
+    run_sync_job(client, "/api/sync/batch/")
     response = client.get("/api/graph/purchases/")
 
     assert response.status_code == 200
 
-    data = response.json()
+    data = read_json(response)
     assert isinstance(data, list)
     assert len(data) > 0
 
+def test_purchases_view_paginates():
+    client = Client()
+
+    run_sync_job(client, "/api/sync/batch/")
+    everything = read_json(client.get("/api/graph/purchases/"))
+    page = client.get("/api/graph/purchases/", {"offset": 2, "limit": 5}).json()
+
+    assert page == everything[2:7]
+
+def test_purchases_view_rejects_bad_limit():
+    client = Client()
+
+    response = client.get("/api/graph/purchases/", {"limit": "-1"})
+
+    assert response.status_code == 400
+    assert "limit" in response.json()["error"]
+
+def test_graph_views_are_cached_until_a_sync_writes(monkeypatch):
+    client = Client()
+    run_sync_job(client, "/api/sync/batch/")
+
+    calls = []
+    scan_vertices = TIGERGRAPH_CLIENT.scan_vertices
+    monkeypatch.setattr(
+        TIGERGRAPH_CLIENT.get(), "scan_vertices",
+        lambda vtype, **kwargs: calls.append(vtype) or scan_vertices(vtype, **kwargs)
+    )
+
+    first = client.get("/api/graph/users/")
+    # The streamed body is stored once it has been sent in full
+    first_body = first.getvalue()
+    second = client.get("/api/graph/users/")
+    assert calls == ["User"]
+    assert second.content == first_body
+    assert second["ETag"] == first["ETag"]
+    assert first["Cache-Control"] == "no-cache"
+
+    revalidated = client.get("/api/graph/users/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert revalidated.status_code == 304
+    assert calls == ["User"]
+
+    # A batch re-run upserts users again, so the cached body is dropped
+    run_sync_job(client, "/api/sync/batch/")
+    after_sync = client.get("/api/graph/users/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert after_sync.status_code == 200
+    assert after_sync["ETag"] != first["ETag"]
+    assert calls == ["User", "User"]
+
+def test_purchases_cache_is_keyed_by_page():
+    client = Client()
+    run_sync_job(client, "/api/sync/batch/")
+
+    first = client.get("/api/graph/purchases/", {"limit": 5})
+    second = client.get("/api/graph/purchases/", {"offset": 5, "limit": 5})
+
+    assert first["ETag"] != second["ETag"]
+    assert first.json() != second.json()
+
+def test_graph_listings_are_streamed():
+    client = Client()
+    run_sync_job(client, "/api/sync/batch/")
+
+    response = client.get("/api/graph/products/")
 
+    assert response.streaming
+    assert read_json(response) == list(TIGERGRAPH_CLIENT.scan_vertices("Product"))
 
+def test_users_view_pages_by_cursor():
+    client = Client()
+    run_sync_job(client, "/api/sync/batch/")
+
+    pages = follow_pages(client, "/api/graph/users/", {"limit": 3})
+    everything = read_json(client.get("/api/graph/users/"))
+    ids = [v["v_id"] for v in everything]
+
+    assert all(len(page) == 3 for page in pages[:-1])
+    assert [v for page in pages for v in page] == everything
+    assert ids == sorted(ids)
+
+def test_next_page_link_keeps_other_parameters():
+    client = Client()
+    run_sync_job(client, "/api/sync/batch/")
+
+    response = client.get("/api/graph/purchases/", {"offset": 1, "limit": 2, "format": "ndjson"})
+
+    cursor = response["X-Next-Cursor"]
+    assert response["Link"] == f'</api/graph/purchases/?limit=2&format=ndjson&after={cursor}>; rel="next"'
+
+def test_purchases_view_pages_by_cursor():
+    client = Client()
+    run_sync_job(client, "/api/sync/batch/")
+
+    pages = follow_pages(client, "/api/graph/purchases/", {"limit": 4})
+    everything = read_json(client.get("/api/graph/purchases/"))
+
+    assert [e for page in pages for e in page] == everything
+
+def test_graph_views_stream_ndjson():
+    client = Client()
+    run_sync_job(client, "/api/sync/batch/")
+
+    by_param = client.get("/api/graph/purchases/", {"format": "ndjson"})
+    body = by_param.getvalue()
+    by_header = client.get("/api/graph/purchases/", HTTP_ACCEPT="application/x-ndjson")
+    lines = body.decode().splitlines()
+
+    assert by_param["Content-Type"] == by_header["Content-Type"] == "application/x-ndjson"
+    assert by_header.getvalue() == body
+    assert [json.loads(line) for line in lines] == read_json(client.get("/api/graph/purchases/"))
+
+def test_graph_views_reject_bad_paging_parameters():
+    client = Client()
 
+    for url, params in (
+        ("/api/graph/users/", {"limit": "100001"}),
+        ("/api/graph/users/", {"limit": "0"}),
+        ("/api/graph/purchases/", {"limit": "0"}),
+        ("/api/graph/products/", {"format": "xml"}),
+        ("/api/graph/purchases/", {"after": "not-a-cursor"}),
+    ):
+        response = client.get(url, params)
+        assert response.status_code == 400
+        assert list(params)[0] in response.json()["error"]